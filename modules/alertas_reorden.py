@@ -0,0 +1,190 @@
+# modules/alertas_reorden.py
+
+import time
+from datetime import datetime
+from typing import Dict, Optional, Union
+import numpy as np
+import pandas as pd
+
+# Días hacia adelante en los que un pedido cuenta como alerta
+HORIZONTE_DIAS = 14
+# Los pedidos de una misma ventana (en días) se agrupan en una orden de compra
+VENTANA_CONSOLIDACION_DIAS = 1
+
+COLUMNAS_ALERTAS = [
+    'Producto', 'Categoría', 'Stock Actual', 'Punto de Reorden (PR)', 'demanda_diaria', 'stock_proyectado_lt',
+    'fecha_pedido', 'fecha_llegada', 'cantidad', 'costo', 'riesgo_quiebre', 'fecha_quiebre'
+]
+COLUMNAS_ORDENES = ['fecha_pedido', 'fecha_llegada', 'skus', 'unidades', 'costo_total', 'skus_con_riesgo']
+_FECHA = 'datetime64[ns]'
+
+# ============================================
+# MOTOR VECTORIZADO DE DISPAROS
+# ============================================
+
+def evaluar_disparos(
+    stock: np.ndarray,
+    punto_reorden: np.ndarray,
+    cantidad_a_ordenar: np.ndarray,
+    demanda_diaria: np.ndarray,
+    lead_time: Union[float, np.ndarray] = 7,
+    horizonte_dias: float = HORIZONTE_DIAS
+) -> Dict[str, np.ndarray]:
+    """
+    Disparos de reorden de todo el catálogo en una sola pasada vectorizada:
+
+    - Días hasta el pedido = días hasta que el stock proyectado (stock − μ · t)
+      toca el PR; 0 si ya está en o bajo el PR. Se dispara si cae en el horizonte.
+    - Stock proyectado al lead time = stock − μ · L.
+    - Cantidad = cantidad a ordenar más lo que falte para volver al PR el día del pedido.
+    - Riesgo de quiebre: el stock se agota antes de que llegue el pedido
+      (stock / μ < días hasta el pedido + L).
+
+    Los productos sin PR ni cantidad a ordenar no tienen política y no disparan.
+    """
+    stock = np.asarray(stock, dtype=float)
+    punto_reorden = np.asarray(punto_reorden, dtype=float)
+    cantidad_a_ordenar = np.clip(np.asarray(cantidad_a_ordenar, dtype=float), 0, None)
+    mu = np.clip(np.nan_to_num(np.asarray(demanda_diaria, dtype=float), nan=0.0), 0, None)
+    lead = np.broadcast_to(np.asarray(lead_time, dtype=float), stock.shape)
+
+    holgura = stock - punto_reorden
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dias_pedido = np.where(holgura <= 0, 0.0, np.where(mu > 0, np.ceil(holgura / mu), np.inf))
+        dias_cobertura = np.where(mu > 0, np.clip(stock, 0, None) / mu, np.inf)
+
+    disparo = (dias_pedido <= horizonte_dias) & ((punto_reorden > 0) | (cantidad_a_ordenar > 0))
+    stock_al_pedir = stock - mu * np.where(np.isfinite(dias_pedido), dias_pedido, 0.0)
+    cantidad = cantidad_a_ordenar + np.clip(punto_reorden - stock_al_pedir, 0, None)
+
+    return {
+        'disparo': disparo,
+        'dias_pedido': dias_pedido,
+        'stock_proyectado_lt': stock - mu * lead,
+        'cantidad': np.where(disparo, cantidad, 0.0),
+        'riesgo_quiebre': disparo & (dias_cobertura < dias_pedido + lead),
+        'dias_cobertura': dias_cobertura,
+    }
+
+
+# ============================================
+# ALERTAS Y ÓRDENES CONSOLIDADAS
+# ============================================
+
+def _numerica(df: pd.DataFrame, columna: str) -> np.ndarray:
+    if columna not in df.columns:
+        return np.zeros(len(df))
+    return pd.to_numeric(df[columna], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+
+def alertas_catalogo(
+    inventario_df: pd.DataFrame,
+    df_resultados: Optional[pd.DataFrame] = None,
+    lead_time: int = 7,
+    horizonte_dias: int = HORIZONTE_DIAS,
+    ventana_dias: int = VENTANA_CONSOLIDACION_DIAS,
+    hoy: Optional[pd.Timestamp] = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    Evalúa los disparos de reorden del inventario completo con la demanda
+    pronosticada (`pronostico_diario_promedio` de los resultados; 0 para los
+    productos sin pronóstico, que solo disparan si ya están bajo el PR) y
+    agrupa los pedidos en órdenes de compra por fecha de pedido. Con
+    `ventana_dias` > 1 los pedidos de cada ventana se adelantan a su primer día.
+    """
+    hoy = pd.Timestamp(hoy if hoy is not None else datetime.now().date()).normalize()
+    if inventario_df is None or inventario_df.empty:
+        return {'alertas': pd.DataFrame(columns=COLUMNAS_ALERTAS), 'ordenes': pd.DataFrame(columns=COLUMNAS_ORDENES)}
+
+    demanda = np.zeros(len(inventario_df))
+    if df_resultados is not None and not df_resultados.empty and 'pronostico_diario_promedio' in df_resultados.columns:
+        resultados = df_resultados.drop_duplicates('producto', keep='last')
+        posiciones = pd.Index(resultados['producto']).get_indexer(inventario_df['Producto'])
+        pronostico = pd.to_numeric(resultados['pronostico_diario_promedio'], errors='coerce').to_numpy(dtype=float)
+        encontrados = posiciones >= 0
+        demanda[encontrados] = pronostico[posiciones[encontrados]]
+
+    stock = _numerica(inventario_df, 'Stock Actual')
+    punto_reorden = _numerica(inventario_df, 'Punto de Reorden (PR)')
+    disparos = evaluar_disparos(
+        stock, punto_reorden, _numerica(inventario_df, 'Cantidad a Ordenar'), demanda, lead_time, horizonte_dias
+    )
+
+    filas = np.flatnonzero(disparos['disparo'])
+    ventana = max(int(ventana_dias), 1)
+    dias_pedido = (disparos['dias_pedido'][filas] // ventana * ventana).astype(np.int64)
+    costo = disparos['cantidad'][filas] * _numerica(inventario_df, 'Costo Unitario')[filas]
+    # Primero lo que hay que pedir antes y, dentro de cada fecha, lo que arriesga quiebre
+    orden = np.lexsort((-costo, ~disparos['riesgo_quiebre'][filas], dias_pedido))
+    filas, dias_pedido = filas[orden], dias_pedido[orden]
+
+    cantidad = np.round(disparos['cantidad'][filas], 2)
+    costo = np.round(costo[orden], 2)
+    riesgo = disparos['riesgo_quiebre'][filas]
+    cobertura = disparos['dias_cobertura'][filas]
+    un_dia = np.timedelta64(1, 'D')
+    fecha_pedido = np.datetime64(hoy.date(), 'D') + dias_pedido * un_dia
+
+    alertas = pd.DataFrame({
+        'Producto': inventario_df['Producto'].iloc[filas].array,
+        'Categoría': inventario_df['Categoría'].iloc[filas].array if 'Categoría' in inventario_df.columns else None,
+        'Stock Actual': stock[filas],
+        'Punto de Reorden (PR)': punto_reorden[filas],
+        'demanda_diaria': np.round(demanda[filas], 2),
+        'stock_proyectado_lt': np.round(disparos['stock_proyectado_lt'][filas], 2),
+        'fecha_pedido': fecha_pedido.astype(_FECHA),
+        'fecha_llegada': (fecha_pedido + int(lead_time) * un_dia).astype(_FECHA),
+        'cantidad': cantidad,
+        'costo': costo,
+        'riesgo_quiebre': riesgo,
+        'fecha_quiebre': np.where(
+            riesgo, np.datetime64(hoy.date(), 'D') + np.floor(np.where(np.isfinite(cobertura), cobertura, 0)).astype(np.int64) * un_dia,
+            np.datetime64('NaT')
+        ).astype(_FECHA),
+    }, columns=COLUMNAS_ALERTAS)
+
+    # Una orden de compra por fecha de pedido (sumas por grupo con bincount)
+    lotes, grupo = np.unique(dias_pedido, return_inverse=True)
+    fechas_lote = np.datetime64(hoy.date(), 'D') + lotes * un_dia
+    ordenes = pd.DataFrame({
+        'fecha_pedido': fechas_lote.astype(_FECHA),
+        'fecha_llegada': (fechas_lote + int(lead_time) * un_dia).astype(_FECHA),
+        'skus': np.bincount(grupo, minlength=len(lotes)),
+        'unidades': np.round(np.bincount(grupo, weights=cantidad, minlength=len(lotes)), 2),
+        'costo_total': np.round(np.bincount(grupo, weights=costo, minlength=len(lotes)), 2),
+        'skus_con_riesgo': np.bincount(grupo, weights=riesgo, minlength=len(lotes)).astype(int),
+    }, columns=COLUMNAS_ORDENES)
+    return {'alertas': alertas, 'ordenes': ordenes}
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def benchmark_alertas(n_skus: int = 10000, repeticiones: int = 20) -> Dict[str, float]:
+    """Tiempo medio (ms) de evaluar y consolidar un catálogo sintético."""
+    rng = np.random.default_rng(0)
+    mu = rng.gamma(2.0, 5.0, n_skus)
+    inventario = pd.DataFrame({
+        'Producto': [f'SKU{i}' for i in range(n_skus)],
+        'Categoría': rng.choice(['Insumo', 'Bebida', 'Empaque'], n_skus),
+        'Stock Actual': rng.uniform(0, 400, n_skus),
+        'Punto de Reorden (PR)': mu * 7 * rng.uniform(1.0, 1.5, n_skus),
+        'Cantidad a Ordenar': mu * rng.uniform(5, 20, n_skus),
+        'Costo Unitario': rng.uniform(0.5, 50, n_skus),
+    })
+    resultados = pd.DataFrame({'producto': inventario['Producto'], 'pronostico_diario_promedio': mu})
+    alertas_catalogo(inventario, resultados)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        evaluacion = alertas_catalogo(inventario, resultados, ventana_dias=7)
+    return {
+        'n_skus': n_skus,
+        'ms': (time.perf_counter() - inicio) / repeticiones * 1000,
+        'alertas': len(evaluacion['alertas']),
+        'ordenes': len(evaluacion['ordenes']),
+    }
+
+
+if __name__ == "__main__":
+    print(benchmark_alertas())
@@ -2,8 +2,10 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
 from datetime import timedelta
+from modules.reduccion_series import reducir_serie, reducir_dataframe, scatter_trace
+from modules.instrumentacion import medir
+from modules.fusion_cargas import rango_fechas
 
 # === PALETA AZUL ===
 COLOR_VENTAS = "#4361EE"
@@ -13,7 +15,10 @@ COLOR_STOCK_FUT = "#4CC9F0"
 COLOR_PR = "#FF6B6B"
 COLOR_ORDEN = "#2ECC71"
 
+@medir()
 def analytics_app():
+    import plotly.graph_objects as go
+
     st.title("Simulación Completa de Inventario")
     st.markdown("**Pasado + Futuro: ¿Cuándo habrías pedido?**")
 
@@ -54,7 +59,7 @@ def analytics_app():
     else:
         fecha_inicio = df_ventas['fecha'].min()
 
-    df_filtrado = df_ventas[df_ventas['fecha'] >= fecha_inicio].copy()
+    df_filtrado = rango_fechas(df_ventas, desde=fecha_inicio).copy()
     ventas_prod = df_filtrado[df_filtrado['producto'] == producto].copy()
     ventas_prod['dia_semana'] = ventas_prod['fecha'].dt.day_name()
 
@@ -86,7 +91,11 @@ def analytics_app():
     PR = max(PR, 1)
 
     # === 8. CANTIDAD A ORDENAR ===
-    cantidad_orden = max(PR * 2, 50)
+    # La del motor EOQ de la optimización; sin ella, la regla anterior
+    fila = ok[ok['producto'] == producto]
+    cantidad_orden = float(fila['cantidad_a_ordenar'].iloc[0]) if not fila.empty else 0.0
+    if cantidad_orden <= 0:
+        cantidad_orden = max(PR * 2, 50)
 
     # === 9. SIMULACIÓN CON ENTREGA REALISTA ===
     fechas = list(df_filtrado['fecha'].unique()) + list(pd.date_range(ultimo_dia + timedelta(days=1), periods=30))
@@ -130,16 +139,18 @@ def analytics_app():
 
     df_hist = df_sim[df_sim['fecha'] <= ultimo_dia]
     ventas_hist = ventas_prod.groupby('fecha')['cantidad_vendida'].sum().reindex(df_hist['fecha']).fillna(0)
-    fig.add_trace(go.Scatter(x=ventas_hist.index, y=ventas_hist.values, mode='lines', name='Ventas Reales',
-                             line=dict(color=COLOR_VENTAS, width=3), yaxis='y'))
+    ventas_hist_graf = reducir_serie(ventas_hist)
+    fig.add_trace(scatter_trace(ventas_hist_graf.index, ventas_hist_graf.values, n_original=len(ventas_hist), mode='lines', name='Ventas Reales',
+                                line=dict(color=COLOR_VENTAS, width=3), yaxis='y'))
 
     futuro = pd.date_range(ultimo_dia + timedelta(days=1), periods=30)
     prediccion = [venta_por_dia[f.day_name()] for f in futuro]
     fig.add_trace(go.Scatter(x=futuro, y=prediccion, mode='lines+markers', name='Predicción',
                              line=dict(color=COLOR_PREDICCION, width=3, dash='dot'), marker=dict(size=6), yaxis='y'))
 
-    fig.add_trace(go.Scatter(x=df_sim['fecha'], y=df_sim['stock'], mode='lines', name='Stock Simulado',
-                             line=dict(color=COLOR_STOCK_FUT, width=3), yaxis='y2'))
+    df_sim_graf = reducir_dataframe(df_sim, 'fecha', 'stock')
+    fig.add_trace(scatter_trace(df_sim_graf['fecha'], df_sim_graf['stock'], n_original=len(df_sim), mode='lines', name='Stock Simulado',
+                                line=dict(color=COLOR_STOCK_FUT, width=3), yaxis='y2'))
 
     fig.add_hline(y=PR, line_dash="dash", line_color=COLOR_PR,
                   annotation_text=f"PR = {PR:.0f} unidades", annotation_position="top left")
@@ -0,0 +1,468 @@
+# modules/api_lotes.py
+
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import sys
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+import pandas as pd
+from modules.carga_archivos import limpiar_movimientos
+from modules.core_analysis import procesar_multiple_productos
+from modules.metricas import cronometro, exportar_prometheus, histograma, registrar_cache
+from modules.modelo_global import procesar_modelo_global
+from modules.politica_inventario import aplicar_politica
+from modules.precalculo import MODELO_GLOBAL, MODELOS_PRONOSTICO, MODELO_POR_PRODUCTO, calcular_tenant, cargar_precalculo
+from modules.sincronizacion import ARCHIVO_SINCRONIZACION, AlmacenSincronizacion, parsear_peticion
+
+# Servicio HTTP local (sin Streamlit) que expone los motores en JSON para web_app
+PUERTO_API = int(os.getenv("STOCK_ZERO_API_PORT", "8502"))
+# Tokens por tenant, `<user_id>:<token>` separados por comas. Sin tokens la API rechaza todo
+TOKENS_API = os.getenv("STOCK_ZERO_API_TOKENS", "")
+# Origen permitido para CORS: el de la web estática (por defecto, `python -m http.server 8080` en web_app)
+ORIGEN_CORS = os.getenv("STOCK_ZERO_API_ORIGEN", "http://localhost:8080")
+
+MAX_ENTRADAS_CACHE = 64
+MAX_CUERPO_BYTES = 50 * 1024 * 1024
+# Tamaño de cada bloque al descomprimir un cuerpo gzip
+BLOQUE_GZIP = 1024 * 1024
+# Respuestas más chicas no se comprimen: gzip no compensa
+MIN_BYTES_GZIP = 1024
+
+API_SEGUNDOS = histograma(
+    'stockzero_api_request_seconds', 'Duración de las peticiones a la API de lotes', ('ruta',)
+)
+
+# ============================================
+# CACHE DE RESPUESTAS
+# ============================================
+
+class CacheRespuestas:
+    """LRU de respuestas JSON ya serializadas (y comprimidas) por hash de la petición."""
+
+    def __init__(self, max_entradas: int = MAX_ENTRADAS_CACHE):
+        self.max_entradas = max_entradas
+        self._entradas: 'OrderedDict[str, Dict[str, bytes]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: str) -> Optional[Dict[str, bytes]]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+        registrar_cache('api_lotes', entrada is not None)
+        return entrada
+
+    def guardar(self, clave: str, cuerpo: bytes) -> Dict[str, bytes]:
+        entrada = {'json': cuerpo}
+        if len(cuerpo) >= MIN_BYTES_GZIP:
+            # Se comprime una sola vez; las siguientes respuestas salen de la cache
+            entrada['gzip'] = gzip.compress(cuerpo, compresslevel=6)
+        with self._lock:
+            self._entradas[clave] = entrada
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return entrada
+
+
+# ============================================
+# OPERACIONES
+# ============================================
+
+def _registros(df: pd.DataFrame) -> list:
+    return json.loads(df.to_json(orient='records', date_format='iso')) if df is not None and not df.empty else []
+
+
+def _movimientos(registros: list, columna_valor: str) -> Optional[pd.DataFrame]:
+    """Ventas o entradas en JSON (`ventas` se acepta como alias de la cantidad, como en web_app)."""
+    if not registros:
+        return None
+    df = pd.DataFrame(registros)
+    if columna_valor not in df.columns and 'ventas' in df.columns:
+        df = df.rename(columns={'ventas': columna_valor})
+    faltantes = {'fecha', 'producto', columna_valor} - set(df.columns)
+    if faltantes:
+        raise ValueError(f"Faltan columnas: {', '.join(sorted(faltantes))}")
+    # Fechas ISO (con o sin zona) como días locales sin zona horaria
+    df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce', utc=True).dt.tz_localize(None)
+    df['producto'] = df['producto'].astype(str)
+    return limpiar_movimientos(df, columna_valor, user_id='api')
+
+
+def _parametros(cuerpo: Dict) -> Dict:
+    modelo = cuerpo.get('modelo', MODELO_POR_PRODUCTO)
+    if modelo not in MODELOS_PRONOSTICO:
+        raise ValueError(f"Modelo desconocido: {modelo}")
+    return {
+        'lead_time': int(cuerpo.get('lead_time', 7)),
+        'stock_seguridad_dias': int(cuerpo.get('stock_seguridad', 3)),
+        'frecuencia_estacional': int(cuerpo.get('frecuencia', 7)),
+        'modelo': modelo,
+    }
+
+
+def _inventario(registros: list) -> Optional[pd.DataFrame]:
+    """Costos unitarios (`producto`, `costo_unitario`) en el formato del inventario de la app."""
+    if not registros:
+        return None
+    df = pd.DataFrame(registros)
+    if 'producto' not in df.columns or 'costo_unitario' not in df.columns:
+        return None
+    return df.rename(columns={'producto': 'Producto', 'costo_unitario': 'Costo Unitario'})
+
+
+def optimizar(cuerpo: Dict) -> Dict:
+    """Puntos de reorden y cantidades (s, S)/EOQ de todos los productos de `ventas`."""
+    df_ventas = _movimientos(cuerpo.get('ventas'), 'cantidad_vendida')
+    if df_ventas is None or df_ventas.empty:
+        raise ValueError("Sin ventas válidas")
+    parametros = _parametros(cuerpo)
+    argumentos = (df_ventas, parametros['lead_time'], parametros['stock_seguridad_dias'], parametros['frecuencia_estacional'])
+    if parametros['modelo'] == MODELO_GLOBAL:
+        df_resultados = procesar_modelo_global(*argumentos)
+    else:
+        df_resultados = procesar_multiple_productos(*argumentos)
+
+    df_resultados = aplicar_politica(
+        df_resultados, df_ventas, _inventario(cuerpo.get('inventario')),
+        lead_time=parametros['lead_time'], nivel_servicio=cuerpo.get('nivel_servicio')
+    )
+    return {'parametros': parametros, 'resultados': _registros(df_resultados)}
+
+
+def trazabilidad(cuerpo: Dict) -> Dict:
+    """Optimización más la proyección de stock por producto (opcionalmente solo `productos`)."""
+    df_ventas = _movimientos(cuerpo.get('ventas'), 'cantidad_vendida')
+    if df_ventas is None or df_ventas.empty:
+        raise ValueError("Sin ventas válidas")
+    parametros = _parametros(cuerpo)
+    calculo = calcular_tenant(
+        df_ventas, _movimientos(cuerpo.get('stock'), 'cantidad_recibida'),
+        stock_inicial=float(cuerpo.get('stock_inicial', 0)), **parametros
+    )
+    df_trazabilidad = calculo['trazabilidad']
+    productos = cuerpo.get('productos')
+    if productos and not df_trazabilidad.empty:
+        df_trazabilidad = df_trazabilidad[df_trazabilidad['producto'].isin(productos)]
+    return {
+        'parametros': parametros,
+        'resultados': _registros(calculo['resultados']),
+        'trazabilidad': _registros(df_trazabilidad),
+    }
+
+
+OPERACIONES = {
+    '/optimizar': optimizar,
+    '/trazabilidad': trazabilidad,
+}
+
+# ============================================
+# CUERPO DE LAS PETICIONES
+# ============================================
+
+def descomprimir_gzip(crudo: bytes, limite: int = MAX_CUERPO_BYTES) -> Optional[bytes]:
+    """
+    Descomprime un cuerpo gzip por bloques sin pasar de `limite` bytes
+    descomprimidos: None si lo supera (bomba gzip), ValueError si no es gzip válido.
+    """
+    partes, total = [], 0
+    try:
+        while crudo:
+            descompresor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            while crudo and not descompresor.eof:
+                parte = descompresor.decompress(crudo, BLOQUE_GZIP)
+                total += len(parte)
+                if total > limite:
+                    return None
+                partes.append(parte)
+                crudo = descompresor.unconsumed_tail
+            if not descompresor.eof:
+                raise ValueError("Cuerpo gzip truncado")
+            # Un gzip puede traer varios miembros concatenados
+            crudo = descompresor.unused_data
+    except zlib.error as e:
+        raise ValueError(f"Cuerpo gzip inválido: {e}")
+    return b''.join(partes)
+
+
+def leer_json_objeto(crudo: bytes) -> Dict:
+    """Cuerpo JSON de una petición; debe ser un objeto."""
+    try:
+        cuerpo = json.loads(crudo or b'{}')
+    except ValueError:
+        raise ValueError("JSON inválido")
+    if not isinstance(cuerpo, dict):
+        raise ValueError("El cuerpo debe ser un objeto JSON")
+    return cuerpo
+
+
+# ============================================
+# AUTENTICACIÓN
+# ============================================
+
+def tenant_valido(tenant: str) -> bool:
+    """Los tenants son user_id de Supabase: solo se aceptan UUID en forma canónica."""
+    try:
+        return str(uuid.UUID(tenant)) == tenant
+    except (ValueError, TypeError, AttributeError):
+        return False
+
+
+def parsear_tokens(texto: str) -> Dict[str, str]:
+    """`<user_id>:<token>,...` → {token: user_id}. Descarta pares mal formados o con tenant inválido."""
+    tokens = {}
+    for par in (texto or '').split(','):
+        tenant, _, token = par.strip().partition(':')
+        tenant, token = tenant.strip(), token.strip()
+        if token and tenant_valido(tenant):
+            tokens[token] = tenant
+    return tokens
+
+
+# ============================================
+# SERVIDOR HTTP
+# ============================================
+
+class _ManejadorApi(BaseHTTPRequestHandler):
+    cache: CacheRespuestas = None
+    almacen: AlmacenSincronizacion = None
+    tokens: Dict[str, str] = {}
+
+    def _cors(self):
+        self.send_header('Access-Control-Allow-Origin', ORIGEN_CORS)
+        self.send_header('Access-Control-Allow-Headers', 'Authorization, Content-Type')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Expose-Headers', 'ETag')
+
+    def _responder_json(self, estado: int, datos: Dict):
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+        self.send_response(estado)
+        self._cors()
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _no_modificado(self, etag: str) -> bool:
+        if self.headers.get('If-None-Match') != etag:
+            return False
+        self.send_response(304)
+        self._cors()
+        self.send_header('ETag', etag)
+        self.end_headers()
+        return True
+
+    def _responder_entrada(self, etag: str, entrada: Dict[str, bytes]):
+        usar_gzip = 'gzip' in self.headers.get('Accept-Encoding', '') and 'gzip' in entrada
+        cuerpo = entrada['gzip'] if usar_gzip else entrada['json']
+        self.send_response(200)
+        self._cors()
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('ETag', etag)
+        self.send_header('Vary', 'Accept-Encoding')
+        if usar_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _tenant_del_token(self) -> Optional[str]:
+        autorizacion = self.headers.get('Authorization') or ''
+        if not autorizacion.startswith('Bearer '):
+            return None
+        enviado = autorizacion[len('Bearer '):].encode()
+        tenant_token = None
+        # Se comparan todos los tokens en tiempo constante
+        for token, tenant in self.tokens.items():
+            if hmac.compare_digest(token.encode(), enviado):
+                tenant_token = tenant
+        return tenant_token
+
+    def _autorizado(self, tenant: Optional[str] = None) -> bool:
+        """
+        Exige un token configurado. Las rutas de un tenant exigen además que el
+        token sea el de ese tenant; las operaciones sin estado aceptan cualquiera.
+        """
+        if tenant is not None and not tenant_valido(tenant):
+            self._responder_json(400, {'error': 'Tenant inválido'})
+            return False
+        tenant_token = self._tenant_del_token()
+        if tenant_token is None:
+            self._responder_json(401, {'error': 'No autorizado'})
+            return False
+        if tenant is not None and tenant_token != tenant:
+            self._responder_json(403, {'error': 'Token de otro tenant'})
+            return False
+        return True
+
+    def _ejecutar(self, ruta: str, clave: str, calcular):
+        """
+        Responde desde la cache o calcula, serializa y guarda. La clave es el
+        hash de la petición y los motores son deterministas: si el cliente ya
+        tiene esa versión (ETag) no se calcula nada.
+        """
+        etag = f'"{clave[:32]}"'
+        with cronometro(API_SEGUNDOS, ruta=ruta):
+            if self._no_modificado(etag):
+                return
+            entrada = self.cache.obtener(clave)
+            if entrada is None:
+                try:
+                    datos = calcular()
+                except (ValueError, KeyError, TypeError) as e:
+                    self._responder_json(400, {'error': str(e)})
+                    return
+                except Exception as e:
+                    self._responder_json(500, {'error': f'Error: {e}'})
+                    return
+                if datos is None:
+                    self._responder_json(404, {'error': 'Sin resultados'})
+                    return
+                entrada = self.cache.guardar(clave, json.dumps(datos, ensure_ascii=False).encode('utf-8'))
+            self._responder_entrada(etag, entrada)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self._cors()
+        self.send_header('Access-Control-Max-Age', '86400')
+        self.end_headers()
+
+    def do_GET(self):
+        ruta = self.path.split('?', 1)[0].rstrip('/')
+        if ruta == '/salud':
+            self._responder_json(200, {'estado': 'ok'})
+            return
+        if ruta == '/metrics':
+            cuerpo = exportar_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+            return
+
+        partes = ruta.strip('/').split('/')
+        if len(partes) != 3 or partes[0] != 'tenants' or partes[2] != 'resultados':
+            self._responder_json(404, {'error': 'Ruta desconocida'})
+            return
+        tenant = partes[1]
+        if not self._autorizado(tenant):
+            return
+        precalculo = cargar_precalculo(tenant)
+        if precalculo is None:
+            self._responder_json(404, {'error': 'Sin precálculo para el tenant'})
+            return
+        # La versión del precálculo forma parte de la clave: un batch nuevo invalida la cache
+        clave = hashlib.sha256(f"{tenant}:{precalculo['meta'].get('generado')}".encode()).hexdigest()
+        self._ejecutar('/tenants/resultados', clave, lambda: {
+            'meta': precalculo['meta'],
+            'resultados': _registros(precalculo['resultados']),
+            'trazabilidad': _registros(precalculo['trazabilidad']),
+        })
+
+    def _leer_cuerpo(self) -> Optional[bytes]:
+        largo = int(self.headers.get('Content-Length') or 0)
+        if largo > MAX_CUERPO_BYTES:
+            self._responder_json(413, {'error': 'Petición demasiado grande'})
+            return None
+        crudo = self.rfile.read(largo)
+        if self.headers.get('Content-Encoding') == 'gzip':
+            try:
+                crudo = descomprimir_gzip(crudo, MAX_CUERPO_BYTES)
+            except ValueError as e:
+                self._responder_json(400, {'error': str(e)})
+                return None
+            if crudo is None:
+                self._responder_json(413, {'error': 'Petición demasiado grande'})
+        return crudo
+
+    def _sincronizar(self, tenant: str, tabla: str):
+        """Intercambio de deltas: cambia estado, así que nunca pasa por la cache."""
+        crudo = self._leer_cuerpo()
+        if crudo is None:
+            return
+        with cronometro(API_SEGUNDOS, ruta='/sync'):
+            try:
+                desde, cambios, borradas = parsear_peticion(leer_json_objeto(crudo))
+                respuesta = self.almacen.sincronizar(tenant, tabla, desde, cambios, borradas)
+            except ValueError as e:
+                self._responder_json(400, {'error': str(e)})
+                return
+        cuerpo = json.dumps(respuesta, ensure_ascii=False).encode('utf-8')
+        usar_gzip = 'gzip' in self.headers.get('Accept-Encoding', '') and len(cuerpo) >= MIN_BYTES_GZIP
+        if usar_gzip:
+            cuerpo = gzip.compress(cuerpo, compresslevel=6)
+        self.send_response(200)
+        self._cors()
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Cache-Control', 'no-store')
+        if usar_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_POST(self):
+        ruta = self.path.split('?', 1)[0].rstrip('/')
+        partes = ruta.strip('/').split('/')
+        if len(partes) == 3 and partes[0] == 'sync':
+            if self._autorizado(partes[1]):
+                self._sincronizar(partes[1], partes[2])
+            return
+
+        operacion = OPERACIONES.get(ruta)
+        if operacion is None:
+            self._responder_json(404, {'error': 'Ruta desconocida'})
+            return
+        if not self._autorizado():
+            return
+        crudo = self._leer_cuerpo()
+        if crudo is None:
+            return
+        clave = hashlib.sha256(ruta.encode() + b'\0' + crudo).hexdigest()
+
+        self._ejecutar(ruta, clave, lambda: operacion(leer_json_objeto(crudo)))
+
+    def log_message(self, *args):
+        pass
+
+
+def crear_servidor(
+    host: str = '127.0.0.1',
+    puerto: int = PUERTO_API,
+    max_entradas_cache: int = MAX_ENTRADAS_CACHE,
+    ruta_sincronizacion: str = ARCHIVO_SINCRONIZACION,
+    tokens: Optional[Dict[str, str]] = None
+) -> ThreadingHTTPServer:
+    """
+    Servidor de la API con su propia cache de respuestas y almacén de
+    sincronización (sin arrancar). `tokens` ({token: user_id}) reemplaza a
+    STOCK_ZERO_API_TOKENS.
+    """
+    manejador = type('ManejadorApi', (_ManejadorApi,), {
+        'cache': CacheRespuestas(max_entradas_cache),
+        'almacen': AlmacenSincronizacion(ruta_sincronizacion),
+        'tokens': dict(tokens) if tokens is not None else parsear_tokens(TOKENS_API),
+    })
+    return ThreadingHTTPServer((host, puerto), manejador)
+
+
+def servir(host: str = '127.0.0.1', puerto: int = PUERTO_API):
+    """Arranca la API y atiende peticiones hasta interrumpirla."""
+    servidor = crear_servidor(host, puerto)
+    print(f"API de Stock Zero en http://{host}:{servidor.server_address[1]}", flush=True)
+    if not servidor.RequestHandlerClass.tokens:
+        print("Sin STOCK_ZERO_API_TOKENS: todas las peticiones autenticadas se rechazarán", file=sys.stderr, flush=True)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
@@ -0,0 +1,231 @@
+# modules/backtesting.py
+
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from modules.core_analysis import clasificar_abc
+
+MODELO_HOLT_WINTERS = 'holt_winters'
+MODELO_NAIVE_ESTACIONAL = 'naive_estacional'
+MODELO_MEDIA_MOVIL = 'media_movil'
+MODELOS = (MODELO_HOLT_WINTERS, MODELO_NAIVE_ESTACIONAL, MODELO_MEDIA_MOVIL)
+
+# Ventana de la media móvil (días)
+VENTANA_MEDIA_MOVIL = 28
+# Un día sub-pronosticado pesa este múltiplo del error: provoca quiebre de stock
+PESO_QUIEBRE = 3.0
+
+_SUMAS = ['n', 'suma_abs', 'suma_error', 'suma_ape', 'n_ape', 'suma_ponderada', 'suma_real']
+
+# ============================================
+# SERIES Y PRONÓSTICOS
+# ============================================
+
+def series_diarias(df_ventas: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Ventas diarias (días sin ventas en 0) de cada producto, con un solo groupby."""
+    diario = (
+        df_ventas.assign(fecha=pd.to_datetime(df_ventas['fecha']).dt.normalize())
+        .groupby(['producto', 'fecha'], sort=True)['cantidad_vendida'].sum()
+    )
+    series = {}
+    for producto, serie in diario.groupby(level='producto', sort=False):
+        serie = serie.droplevel('producto')
+        serie = serie.reindex(pd.date_range(serie.index.min(), serie.index.max(), freq='D'), fill_value=0)
+        series[producto] = serie.to_numpy(dtype=float)
+    return series
+
+
+def _holt_winters(historia: np.ndarray, horizonte: int, frecuencia: int, inicio: Optional[np.ndarray]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Mismo modelo que `calcular_orden_optima_producto` (tendencia y estacionalidad
+    aditivas). Con `inicio` (parámetros del origen anterior) se omite la búsqueda
+    por fuerza bruta y el optimizador arranca desde ese punto.
+    """
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+    modelo = ExponentialSmoothing(historia, trend='add', seasonal='add', seasonal_periods=frecuencia)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        if inicio is not None:
+            try:
+                ajuste = modelo.fit(optimized=True, start_params=inicio, use_brute=False)
+            except Exception:
+                ajuste = modelo.fit(optimized=True)
+        else:
+            ajuste = modelo.fit(optimized=True)
+
+    p = ajuste.params
+    parametros = np.concatenate([
+        [p['smoothing_level'], p['smoothing_trend'], p['smoothing_seasonal'], p['initial_level'], p['initial_trend']],
+        np.asarray(p['initial_seasons'], dtype=float)
+    ])
+    return np.clip(ajuste.forecast(horizonte), 0, None), parametros
+
+
+def _pronostico_base(modelo: str, historia: np.ndarray, horizonte: int, frecuencia: int) -> np.ndarray:
+    if modelo == MODELO_NAIVE_ESTACIONAL:
+        ultima_temporada = historia[-frecuencia:]
+        return np.resize(ultima_temporada, horizonte)
+    if modelo == MODELO_MEDIA_MOVIL:
+        return np.full(horizonte, historia[-VENTANA_MEDIA_MOVIL:].mean())
+    raise ValueError(f"Modelo desconocido: {modelo}")
+
+
+def _acumular(sumas: Dict[str, float], pronostico: np.ndarray, real: np.ndarray, peso_quiebre: float):
+    error = pronostico - real
+    absoluto = np.abs(error)
+    con_venta = real > 0
+    sumas['n'] += len(real)
+    sumas['suma_abs'] += absoluto.sum()
+    sumas['suma_error'] += error.sum()
+    sumas['suma_ape'] += (absoluto[con_venta] / real[con_venta]).sum()
+    sumas['n_ape'] += int(con_venta.sum())
+    sumas['suma_ponderada'] += np.where(error < 0, peso_quiebre, 1.0).dot(absoluto)
+    sumas['suma_real'] += real.sum()
+
+
+# ============================================
+# EVALUACIÓN CON ORIGEN MÓVIL
+# ============================================
+
+def origenes(longitud: int, n_origenes: int, paso: int, horizonte: int, frecuencia: int) -> List[int]:
+    """Cortes (largo de la historia de entrenamiento) del más antiguo al más reciente."""
+    ultimo = longitud - horizonte
+    cortes = [ultimo - i * paso for i in range(n_origenes)]
+    return sorted(c for c in cortes if c >= frecuencia * 2)
+
+
+def backtest_producto(
+    producto: str,
+    serie: np.ndarray,
+    modelos=MODELOS,
+    n_origenes: int = 20,
+    paso: int = 7,
+    horizonte: int = 7,
+    frecuencia: int = 7,
+    peso_quiebre: float = PESO_QUIEBRE
+) -> List[Dict]:
+    """
+    Evalúa cada modelo en todos los orígenes de un producto. Los orígenes se
+    recorren en orden para reutilizar los parámetros Holt-Winters del anterior.
+    Devuelve sumas acumuladas (no métricas) para poder agregarlas por clase.
+    """
+    sumas = {modelo: dict.fromkeys(_SUMAS, 0.0) for modelo in modelos}
+    inicio_hw = None
+    for corte in origenes(len(serie), n_origenes, paso, horizonte, frecuencia):
+        historia, real = serie[:corte], serie[corte:corte + horizonte]
+        for modelo in modelos:
+            if modelo == MODELO_HOLT_WINTERS:
+                try:
+                    pronostico, inicio_hw = _holt_winters(historia, horizonte, frecuencia, inicio_hw)
+                except Exception:
+                    inicio_hw = None
+                    continue
+            else:
+                pronostico = _pronostico_base(modelo, historia, horizonte, frecuencia)
+            _acumular(sumas[modelo], pronostico, real, peso_quiebre)
+    return [
+        dict(producto=producto, modelo=modelo, volumen_total_vendido=float(serie.sum()), **s)
+        for modelo, s in sumas.items() if s['n']
+    ]
+
+
+def _backtest_bloque(bloque: List[Tuple[str, np.ndarray]], kwargs: Dict) -> List[Dict]:
+    filas = []
+    for producto, serie in bloque:
+        filas.extend(backtest_producto(producto, serie, **kwargs))
+    return filas
+
+
+def _metricas(df_sumas: pd.DataFrame) -> pd.DataFrame:
+    """MAE, MAPE (%), sesgo y error ponderado por quiebre a partir de las sumas."""
+    df = df_sumas.copy()
+    df['mae'] = df['suma_abs'] / df['n']
+    df['mape'] = 100 * df['suma_ape'] / df['n_ape'].replace(0, np.nan)
+    df['sesgo'] = df['suma_error'] / df['n']
+    df['error_quiebre'] = df['suma_ponderada'] / df['n']
+    # Escala relativa a la venta media, comparable entre productos de distinto volumen
+    df['wmape'] = 100 * df['suma_abs'] / df['suma_real'].replace(0, np.nan)
+    return df.rename(columns={'n': 'dias_evaluados'})
+
+
+def ejecutar_backtesting(
+    df_ventas: pd.DataFrame,
+    modelos=MODELOS,
+    n_origenes: int = 20,
+    paso: int = 7,
+    horizonte: int = 7,
+    frecuencia: int = 7,
+    peso_quiebre: float = PESO_QUIEBRE,
+    workers: Optional[int] = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    Backtesting con origen móvil de todos los productos de `df_ventas`, en
+    paralelo por bloques de productos. Devuelve métricas por producto y modelo
+    (`por_producto`) y por clase ABC y modelo (`por_clase`).
+    """
+    series = series_diarias(df_ventas)
+    kwargs = dict(modelos=tuple(modelos), n_origenes=n_origenes, paso=paso, horizonte=horizonte,
+                  frecuencia=frecuencia, peso_quiebre=peso_quiebre)
+
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    items = list(series.items())
+    if workers == 1 or len(items) < 2:
+        filas = _backtest_bloque(items, kwargs)
+    else:
+        # Varios bloques por worker para equilibrar productos de distinto largo
+        n_bloques = min(len(items), workers * 4)
+        bloques = [items[i::n_bloques] for i in range(n_bloques)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            filas = [fila for parcial in pool.map(_backtest_bloque, bloques, [kwargs] * n_bloques) for fila in parcial]
+
+    columnas = ['producto', 'modelo', 'volumen_total_vendido'] + _SUMAS
+    df_sumas = pd.DataFrame(filas, columns=columnas)
+    if df_sumas.empty:
+        return {'por_producto': df_sumas, 'por_clase': df_sumas}
+
+    df_abc = clasificar_abc(
+        pd.DataFrame({'producto': list(series), 'volumen_total_vendido': [s.sum() for s in series.values()], 'error': None})
+    )
+    df_sumas['clasificacion_abc'] = df_sumas['producto'].map(df_abc.set_index('producto')['clasificacion_abc'])
+
+    columnas_metricas = ['dias_evaluados', 'mae', 'mape', 'wmape', 'sesgo', 'error_quiebre']
+    por_producto = _metricas(df_sumas)[['producto', 'clasificacion_abc', 'modelo', 'volumen_total_vendido'] + columnas_metricas]
+
+    agregado = df_sumas.groupby(['clasificacion_abc', 'modelo'], as_index=False).agg(
+        productos=('producto', 'nunique'), **{c: (c, 'sum') for c in _SUMAS}
+    )
+    por_clase = _metricas(agregado)[['clasificacion_abc', 'modelo', 'productos'] + columnas_metricas]
+
+    return {'por_producto': por_producto, 'por_clase': por_clase}
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def datos_sinteticos(n_skus: int = 1000, dias: int = 365, semilla: int = 0) -> pd.DataFrame:
+    """Ventas diarias sintéticas con tendencia, estacionalidad semanal y ruido."""
+    rng = np.random.default_rng(semilla)
+    fechas = pd.date_range('2024-01-01', periods=dias, freq='D')
+    base = rng.gamma(2.0, 10.0, n_skus)[:, None]
+    semana = 1 + 0.3 * np.sin(2 * np.pi * np.arange(dias) / 7)[None, :]
+    tendencia = 1 + rng.normal(0, 0.001, n_skus)[:, None] * np.arange(dias)[None, :]
+    ventas = rng.poisson(np.clip(base * semana * tendencia, 0, None))
+    return pd.DataFrame({
+        'fecha': np.tile(fechas, n_skus),
+        'producto': np.repeat([f'SKU-{i}' for i in range(n_skus)], dias),
+        'cantidad_vendida': ventas.ravel(),
+    })
+
+
+if __name__ == "__main__":
+    df = datos_sinteticos()
+    inicio = time.perf_counter()
+    resultado = ejecutar_backtesting(df)
+    print(f"{df['producto'].nunique()} SKUs x 20 orígenes en {time.perf_counter() - inicio:.1f} s")
+    print(resultado['por_clase'].to_string(index=False))
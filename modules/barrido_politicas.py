@@ -0,0 +1,215 @@
+# modules/barrido_politicas.py
+
+import time
+from typing import Dict, Optional, Sequence
+import numpy as np
+import pandas as pd
+from modules.instrumentacion import medir
+
+# Grilla por defecto de políticas a evaluar
+LEAD_TIMES = (3, 5, 7, 10, 14)
+DIAS_SEGURIDAD = (0, 1, 2, 3, 5, 7)
+HORIZONTES_PEDIDO = (3.5, 7, 14, 21, 28)
+
+# Días de demanda histórica contra los que se simula cada política
+DIAS_SIMULACION = 180
+# Ventana para estimar la demanda de productos sin pronóstico
+VENTANA_DEMANDA = 28
+
+# Costos (los mismos órdenes de magnitud que la comparación de costos de analytics)
+COSTO_PEDIDO = 25.0
+TASA_MANTENIMIENTO_ANUAL = 0.25
+COSTO_UNITARIO_DEFECTO = 1.0
+
+# ============================================
+# DATOS DE ENTRADA
+# ============================================
+
+def matriz_demanda(df_ventas: pd.DataFrame, dias: int = DIAS_SIMULACION) -> pd.DataFrame:
+    """Demanda diaria (productos x días) de los últimos `dias` días, con ceros en días sin venta."""
+    fechas = pd.to_datetime(df_ventas['fecha']).dt.normalize()
+    fin = fechas.max()
+    inicio = fin - pd.Timedelta(days=dias - 1)
+    recientes = df_ventas.assign(fecha=fechas)[fechas >= inicio]
+    matriz = recientes.pivot_table(index='producto', columns='fecha', values='cantidad_vendida', aggfunc='sum', fill_value=0)
+    return matriz.reindex(columns=pd.date_range(inicio, fin, freq='D'), fill_value=0)
+
+
+def grilla_politicas(
+    lead_times: Sequence[int] = LEAD_TIMES,
+    dias_seguridad: Sequence[float] = DIAS_SEGURIDAD,
+    horizontes: Sequence[float] = HORIZONTES_PEDIDO
+) -> pd.DataFrame:
+    """Producto cartesiano de lead time, días de seguridad y horizonte de pedido."""
+    indice = pd.MultiIndex.from_product([lead_times, dias_seguridad, horizontes], names=['lead_time', 'dias_seguridad', 'horizonte_pedido'])
+    return indice.to_frame(index=False)
+
+
+# ============================================
+# SIMULACIÓN VECTORIZADA (PRODUCTOS x POLÍTICAS)
+# ============================================
+
+def simular_politicas(
+    demanda: np.ndarray,
+    pronostico: np.ndarray,
+    politicas: pd.DataFrame,
+    costo_unitario: np.ndarray,
+    costo_pedido: float = COSTO_PEDIDO,
+    tasa_mantenimiento_anual: float = TASA_MANTENIMIENTO_ANUAL
+) -> Dict[str, np.ndarray]:
+    """
+    Simula una política (s, Q) de revisión continua con ventas perdidas para
+    todos los productos y políticas a la vez: cada día es una operación sobre
+    matrices P x K. El punto de reorden es pronóstico * (lead time + días de
+    seguridad) y la cantidad, pronóstico * horizonte, como en la optimización.
+    Se pide sobre la posición de inventario (en mano + en camino).
+    """
+    n_productos, n_dias = demanda.shape
+    lead = politicas['lead_time'].to_numpy(dtype=int)
+    f = pronostico[:, None]
+    pr = f * (lead + politicas['dias_seguridad'].to_numpy())[None, :]
+    q = np.maximum(f * politicas['horizonte_pedido'].to_numpy()[None, :], 1.0)
+
+    # Pedidos en camino: buffer circular por día de llegada
+    ventana = int(lead.max()) + 1
+    columnas = np.arange(len(lead))
+    en_camino = np.zeros((n_productos, len(lead), ventana))
+    total_en_camino = np.zeros_like(pr)
+
+    en_mano = pr + q
+    stock_acumulado = np.zeros_like(pr)
+    vendido = np.zeros_like(pr)
+    dias_quiebre = np.zeros_like(pr)
+    pedidos = np.zeros_like(pr)
+
+    for t in range(n_dias):
+        ranura = t % ventana
+        llegadas = en_camino[:, :, ranura]
+        en_mano += llegadas
+        total_en_camino -= llegadas
+        en_camino[:, :, ranura] = 0
+
+        d = demanda[:, t][:, None]
+        servido = np.minimum(en_mano, d)
+        en_mano -= servido
+        vendido += servido
+        dias_quiebre += servido < d
+
+        pedir = (en_mano + total_en_camino) <= pr
+        cantidad = np.where(pedir, q, 0.0)
+        en_camino[:, columnas, (t + lead) % ventana] += cantidad
+        total_en_camino += cantidad
+        pedidos += pedir
+        stock_acumulado += en_mano
+
+    demanda_total = demanda.sum(axis=1)[:, None]
+    stock_medio = stock_acumulado / n_dias
+    costo_mantenimiento = stock_medio * costo_unitario[:, None] * tasa_mantenimiento_anual * n_dias / 365
+    costo_pedidos = pedidos * costo_pedido
+    with np.errstate(invalid='ignore', divide='ignore'):
+        nivel_servicio = np.where(demanda_total > 0, vendido / demanda_total, 1.0)
+
+    return {
+        'punto_reorden': pr,
+        'cantidad_a_ordenar': q,
+        'nivel_servicio': nivel_servicio,
+        'dias_quiebre': dias_quiebre,
+        'pedidos': pedidos,
+        'stock_medio': stock_medio,
+        'costo_total': costo_mantenimiento + costo_pedidos,
+    }
+
+
+def _frontera_eficiente(costo: np.ndarray, servicio: np.ndarray) -> np.ndarray:
+    """Máscara P x K de políticas no dominadas (ninguna otra es más barata y con más servicio)."""
+    # Por costo ascendente y, a igual costo, mayor servicio primero
+    orden = np.lexsort((-servicio, costo), axis=1)
+    servicio_ordenado = np.take_along_axis(servicio, orden, axis=1)
+    mejor_previo = np.maximum.accumulate(servicio_ordenado, axis=1)
+    eficiente_ordenado = np.empty_like(servicio_ordenado, dtype=bool)
+    eficiente_ordenado[:, 0] = True
+    eficiente_ordenado[:, 1:] = servicio_ordenado[:, 1:] > mejor_previo[:, :-1]
+    eficiente = np.empty_like(eficiente_ordenado)
+    np.put_along_axis(eficiente, orden, eficiente_ordenado, axis=1)
+    return eficiente
+
+
+@medir('politicas.barrido')
+def barrido_politicas(
+    df_ventas: pd.DataFrame,
+    df_resultados: Optional[pd.DataFrame] = None,
+    inventario_df: Optional[pd.DataFrame] = None,
+    politicas: Optional[pd.DataFrame] = None,
+    dias_simulacion: int = DIAS_SIMULACION,
+    costo_pedido: float = COSTO_PEDIDO,
+    tasa_mantenimiento_anual: float = TASA_MANTENIMIENTO_ANUAL
+) -> pd.DataFrame:
+    """
+    Evalúa la grilla de políticas para todos los productos contra su demanda
+    reciente. Usa un único pronóstico por producto (`pronostico_diario_promedio`
+    de la optimización; sin él, la media de los últimos días) y el `Costo
+    Unitario` del inventario. Devuelve una fila por producto y política con
+    costo, nivel de servicio y si pertenece a la frontera eficiente (costo vs.
+    servicio) del SKU para ese lead time.
+    """
+    politicas = grilla_politicas() if politicas is None else politicas.reset_index(drop=True)
+    df_demanda = matriz_demanda(df_ventas, dias_simulacion)
+    productos = df_demanda.index
+    demanda = df_demanda.to_numpy(dtype=float)
+
+    pronostico = pd.Series(demanda[:, -VENTANA_DEMANDA:].mean(axis=1), index=productos)
+    if df_resultados is not None and not df_resultados.empty:
+        validos = df_resultados[df_resultados['error'].isnull()].drop_duplicates('producto').set_index('producto')
+        pronostico.update(validos['pronostico_diario_promedio'].reindex(productos).dropna())
+
+    costo_unitario = pd.Series(COSTO_UNITARIO_DEFECTO, index=productos)
+    if inventario_df is not None and not inventario_df.empty:
+        costos = inventario_df.drop_duplicates('Producto').set_index('Producto')['Costo Unitario']
+        costo_unitario.update(pd.to_numeric(costos, errors='coerce').reindex(productos).dropna())
+
+    sim = simular_politicas(
+        demanda, pronostico.to_numpy(dtype=float), politicas, costo_unitario.to_numpy(dtype=float),
+        costo_pedido, tasa_mantenimiento_anual
+    )
+    # El lead time lo impone el proveedor: la frontera se calcula para cada lead time
+    eficiente = np.zeros_like(sim['costo_total'], dtype=bool)
+    lead = politicas['lead_time'].to_numpy()
+    for valor in np.unique(lead):
+        columnas = lead == valor
+        eficiente[:, columnas] = _frontera_eficiente(sim['costo_total'][:, columnas], sim['nivel_servicio'][:, columnas])
+
+    n_productos, n_politicas = len(productos), len(politicas)
+    df = pd.DataFrame({
+        'producto': np.repeat(productos.to_numpy(), n_politicas),
+        **{col: np.tile(politicas[col].to_numpy(), n_productos) for col in politicas.columns},
+        'pronostico_diario_promedio': np.repeat(pronostico.to_numpy(), n_politicas),
+        **{nombre: valores.ravel() for nombre, valores in sim.items()},
+        'eficiente': eficiente.ravel(),
+    })
+    return df
+
+
+def politica_recomendada(df_barrido: pd.DataFrame, nivel_servicio_objetivo: float = 0.95) -> pd.DataFrame:
+    """
+    Por producto, la política más barata que alcanza el nivel de servicio
+    objetivo; si ninguna lo alcanza, la de mayor servicio. Filtrar antes por
+    `lead_time` para fijar el del proveedor.
+    """
+    cumple = df_barrido['nivel_servicio'] >= nivel_servicio_objetivo
+    df = df_barrido.assign(_cumple=cumple, _costo=np.where(cumple, df_barrido['costo_total'], np.inf))
+    df = df.sort_values(['producto', '_cumple', '_costo', 'nivel_servicio'], ascending=[True, False, True, False])
+    return df.drop_duplicates('producto').drop(columns=['_cumple', '_costo']).reset_index(drop=True)
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+if __name__ == "__main__":
+    from modules.backtesting import datos_sinteticos
+
+    df = datos_sinteticos(n_skus=1000, dias=DIAS_SIMULACION)
+    inicio = time.perf_counter()
+    resultado = barrido_politicas(df)
+    print(f"{df['producto'].nunique()} SKUs x {len(grilla_politicas())} políticas en {time.perf_counter() - inicio:.2f} s")
+    print(politica_recomendada(resultado).head())
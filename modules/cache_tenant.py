@@ -0,0 +1,133 @@
+# modules/cache_tenant.py
+
+import threading
+import time
+import pandas as pd
+from typing import Callable, Dict, Optional
+from modules.metricas import registrar_cache
+
+# Tiempo de vida de un dataset compartido antes de volver a descargarlo
+TTL_SEGUNDOS_DEFECTO = 600
+
+# ============================================
+# CACHE COMPARTIDA DE DATASETS POR TENANT
+# ============================================
+
+class CacheDatasetsTenant:
+    """
+    Cache de proceso, compartida entre sesiones, con los datasets de cada tenant
+    (`ventas`, `stock`). Todas las sesiones de un mismo tenant reciben el MISMO
+    objeto DataFrame, por lo que deben tratarlo como solo lectura: las
+    modificaciones se hacen sobre una copia o reemplazando la referencia.
+
+    Cada entrada lleva una versión (se incrementa en cada descarga o invalidación),
+    un TTL y un conteo de referencias por sesión; una entrada sin referencias se
+    libera de memoria.
+    """
+
+    def __init__(self, ttl_segundos: float = TTL_SEGUNDOS_DEFECTO):
+        self.ttl_segundos = ttl_segundos
+        self._entradas: Dict[str, Dict] = {}
+        self._versiones: Dict[str, int] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.estadisticas = {'hits': 0, 'misses': 0, 'descargas': 0, 'invalidaciones': 0}
+
+    def _lock_tenant(self, tenant_id: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(tenant_id, threading.Lock())
+
+    def _expirada(self, entrada: Dict) -> bool:
+        return time.monotonic() - entrada['cargado'] > self.ttl_segundos
+
+    def version(self, tenant_id: str) -> int:
+        """Versión vigente del dataset del tenant (0 si nunca se cargó)."""
+        return self._versiones.get(tenant_id, 0)
+
+    def vigente(self, tenant_id: str, version: Optional[int]) -> bool:
+        """True si una sesión que tiene `version` puede seguir usando sus datos."""
+        entrada = self._entradas.get(tenant_id)
+        return entrada is not None and entrada['version'] == version and not self._expirada(entrada)
+
+    def obtener(
+        self,
+        tenant_id: str,
+        cargar: Callable[[], Dict[str, pd.DataFrame]],
+        sesion_id: str
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Devuelve los datasets del tenant, descargándolos con `cargar()` solo si no
+        existen, expiraron o fueron invalidados. Si varias sesiones llegan a la vez,
+        una sola descarga y las demás esperan su resultado.
+        """
+        entrada = self._entradas.get(tenant_id)
+        if entrada is not None and not self._expirada(entrada):
+            entrada['refs'].add(sesion_id)
+            self.estadisticas['hits'] += 1
+            registrar_cache('datasets_tenant', True)
+            return entrada['datos']
+
+        with self._lock_tenant(tenant_id):
+            # Otra sesión pudo haber descargado mientras esperábamos el lock
+            entrada = self._entradas.get(tenant_id)
+            if entrada is not None and not self._expirada(entrada):
+                entrada['refs'].add(sesion_id)
+                self.estadisticas['hits'] += 1
+                registrar_cache('datasets_tenant', True)
+                return entrada['datos']
+
+            self.estadisticas['misses'] += 1
+            registrar_cache('datasets_tenant', False)
+            datos = cargar()
+            self.estadisticas['descargas'] += 1
+            refs = entrada['refs'] if entrada is not None else set()
+            refs.add(sesion_id)
+            version = self._versiones.get(tenant_id, 0) + 1
+            self._versiones[tenant_id] = version
+            self._entradas[tenant_id] = {
+                'datos': datos, 'version': version, 'cargado': time.monotonic(), 'refs': refs
+            }
+            return datos
+
+    def invalidar(self, tenant_id: str):
+        """Descarta el dataset del tenant (p. ej. tras subir datos nuevos)."""
+        with self._lock_tenant(tenant_id):
+            entrada = self._entradas.pop(tenant_id, None)
+            self._versiones[tenant_id] = self._versiones.get(tenant_id, 0) + 1
+            self.estadisticas['invalidaciones'] += 1
+            if entrada is not None and entrada['refs']:
+                # Se conservan las referencias (no los datos) para la próxima carga
+                self._entradas[tenant_id] = {
+                    'datos': {}, 'version': -1, 'cargado': float('-inf'), 'refs': entrada['refs']
+                }
+
+    def liberar(self, tenant_id: str, sesion_id: str):
+        """Quita la referencia de una sesión; sin referencias, la entrada se libera."""
+        with self._lock_tenant(tenant_id):
+            entrada = self._entradas.get(tenant_id)
+            if entrada is None:
+                return
+            entrada['refs'].discard(sesion_id)
+            if not entrada['refs']:
+                del self._entradas[tenant_id]
+
+    def ids_frames(self) -> set:
+        """id() de los DataFrames en cache: son compartidos por las sesiones del tenant."""
+        return {
+            id(df) for entrada in list(self._entradas.values())
+            for df in entrada['datos'].values() if df is not None
+        }
+
+    def resumen(self) -> pd.DataFrame:
+        """Tenants en cache con su versión, edad, sesiones y filas."""
+        filas = []
+        ahora = time.monotonic()
+        for tenant_id, entrada in list(self._entradas.items()):
+            filas.append({
+                'tenant': tenant_id,
+                'version': entrada['version'],
+                'edad_s': round(ahora - entrada['cargado'], 1) if entrada['version'] >= 0 else None,
+                'sesiones': len(entrada['refs']),
+                'filas': sum(len(df) for df in entrada['datos'].values() if df is not None),
+            })
+        return pd.DataFrame(filas, columns=['tenant', 'version', 'edad_s', 'sesiones', 'filas'])
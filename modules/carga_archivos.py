@@ -0,0 +1,149 @@
+# modules/carga_archivos.py
+
+import os
+from typing import List, Optional
+import pandas as pd
+
+# Formatos aceptados en la subida de datos
+EXTENSIONES_COLUMNARES = ('parquet', 'feather', 'arrow', 'ipc')
+EXTENSIONES_CARGA = ('csv',) + EXTENSIONES_COLUMNARES
+# Tipo con que pandas parsea las fechas de un CSV (us en pandas 3, ns en pandas 2)
+TIPO_FECHA = pd.to_datetime(pd.Series(['1970-01-01'])).dtype
+
+# ============================================
+# LECTURA SIN PARSEO DE TEXTO (ARROW)
+# ============================================
+
+def _extension(nombre: str) -> str:
+    return os.path.splitext(nombre)[1].lstrip('.').lower()
+
+
+def _fuente_arrow(archivo):
+    """
+    Fuente Arrow sin copias: una ruta se mapea en memoria y un archivo subido
+    (BytesIO de Streamlit) se envuelve sobre su propio buffer.
+    """
+    import pyarrow as pa
+
+    if isinstance(archivo, (str, os.PathLike)):
+        return pa.memory_map(str(archivo), 'r')
+    if hasattr(archivo, 'getbuffer'):
+        return pa.BufferReader(pa.py_buffer(archivo.getbuffer()))
+    return pa.BufferReader(archivo.read())
+
+
+def _leer_tabla_arrow(archivo, extension: str, columnas_valor: List[str]):
+    """Tabla Arrow del archivo; en Parquet solo se leen las columnas necesarias si el formato es largo."""
+    import pyarrow as pa
+
+    fuente = _fuente_arrow(archivo)
+    if extension == 'parquet':
+        import pyarrow.parquet as pq
+
+        esquema = pq.read_schema(fuente)
+        columnas = None
+        if 'producto' in esquema.names:
+            columnas = [c for c in ['fecha', 'producto'] + columnas_valor if c in esquema.names]
+        return pq.read_table(fuente, columns=columnas)
+
+    # Feather v2 es el formato de archivo IPC de Arrow; .arrow puede venir también como stream
+    try:
+        return pa.ipc.open_file(fuente).read_all()
+    except pa.ArrowInvalid:
+        fuente.seek(0)
+        return pa.ipc.open_stream(fuente).read_all()
+
+
+def _validar_esquema(tabla, columna_valor: str):
+    """Comprueba tipos de `fecha`, `producto` y la columna de cantidades (o las del formato ancho)."""
+    import pyarrow.types as pt
+
+    esquema = tabla.schema
+    if 'fecha' not in esquema.names:
+        raise ValueError("Falta la columna 'fecha'")
+    tipo_fecha = esquema.field('fecha').type
+    if not (pt.is_date(tipo_fecha) or pt.is_timestamp(tipo_fecha) or pt.is_string(tipo_fecha) or pt.is_large_string(tipo_fecha)):
+        raise ValueError(f"'fecha' debe ser fecha o timestamp, no {tipo_fecha}")
+
+    if 'producto' in esquema.names:
+        tipo_producto = esquema.field('producto').type
+        if pt.is_dictionary(tipo_producto):
+            tipo_producto = tipo_producto.value_type
+        if not (pt.is_string(tipo_producto) or pt.is_large_string(tipo_producto)):
+            raise ValueError(f"'producto' debe ser texto, no {tipo_producto}")
+        if columna_valor not in esquema.names:
+            raise ValueError(f"Falta la columna '{columna_valor}'")
+        columnas_valor = [columna_valor]
+    else:
+        # Formato ancho: una columna numérica por producto
+        columnas_valor = [c for c in esquema.names if c != 'fecha']
+        if not columnas_valor:
+            raise ValueError("Sin columna 'producto' ni columnas de productos")
+
+    for columna in columnas_valor:
+        tipo = esquema.field(columna).type
+        if not (pt.is_integer(tipo) or pt.is_floating(tipo) or pt.is_decimal(tipo)):
+            raise ValueError(f"'{columna}' debe ser numérica, no {tipo}")
+
+
+def _tabla_a_pandas(tabla) -> pd.DataFrame:
+    """Convierte conservando tipos: fechas como datetime64 y productos como texto (no categóricos)."""
+    import pyarrow as pa
+    import pyarrow.types as pt
+
+    if 'producto' in tabla.schema.names and pt.is_dictionary(tabla.schema.field('producto').type):
+        indice = tabla.schema.get_field_index('producto')
+        tabla = tabla.set_column(indice, 'producto', tabla.column('producto').cast(pa.string()))
+    df = tabla.to_pandas(date_as_object=False)
+    # Un frame guardado con `set_index('fecha')` vuelve con la fecha como índice
+    if 'fecha' not in df.columns:
+        df = df.reset_index()
+    if isinstance(df['fecha'].dtype, pd.DatetimeTZDtype):
+        df['fecha'] = df['fecha'].dt.tz_localize(None)
+    # date32 llega en ms y los timestamps en su unidad: la misma que la ruta CSV
+    if pd.api.types.is_datetime64_dtype(df['fecha']):
+        df['fecha'] = df['fecha'].astype(TIPO_FECHA)
+    return df
+
+
+# ============================================
+# PUNTO DE ENTRADA DE LA SUBIDA
+# ============================================
+
+def leer_archivo_carga(archivo, columna_valor: str, nombre: Optional[str] = None) -> pd.DataFrame:
+    """
+    Lee un archivo de ventas o stock en CSV, Parquet, Feather o Arrow IPC. Los
+    formatos columnares llegan con sus tipos y se validan contra el esquema
+    esperado; `nombre` (o el del archivo subido) define el formato.
+    """
+    nombre = nombre or getattr(archivo, 'name', None) or str(archivo)
+    extension = _extension(nombre)
+    if extension not in EXTENSIONES_COLUMNARES:
+        return pd.read_csv(archivo)
+
+    tabla = _leer_tabla_arrow(archivo, extension, [columna_valor])
+    _validar_esquema(tabla, columna_valor)
+    return _tabla_a_pandas(tabla)
+
+
+def limpiar_movimientos(df_raw: pd.DataFrame, columna_valor: str, user_id: str) -> pd.DataFrame:
+    """
+    Formato largo (fecha, producto, cantidad) desde largo o ancho, sin fechas
+    inválidas ni cantidades no positivas. Las columnas ya tipadas (Parquet,
+    Feather, Arrow) no se vuelven a parsear.
+    """
+    # Detectar formato y convertir
+    if 'producto' not in df_raw.columns and len(df_raw.columns) > 2:
+        df = df_raw.melt(id_vars='fecha', var_name='producto', value_name=columna_valor)
+    else:
+        df = df_raw[['fecha', 'producto', columna_valor]].copy()
+
+    if not pd.api.types.is_datetime64_any_dtype(df['fecha']):
+        df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce')
+    df = df.dropna(subset=['fecha'])
+    if not pd.api.types.is_numeric_dtype(df[columna_valor]):
+        df[columna_valor] = pd.to_numeric(df[columna_valor], errors='coerce')
+    df[columna_valor] = df[columna_valor].fillna(0)
+    df = df[df[columna_valor] > 0]
+    df['user_id'] = user_id
+    return df
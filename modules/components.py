@@ -3,10 +3,22 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 from datetime import datetime
 from typing import Dict, List, Union
+from modules.reduccion_series import anchos_barras, reducir_dataframe, puntos_por_ancho
+from modules.instrumentacion import medir
+from modules.inventario_store import AlmacenInventario, COLUMNAS_DERIVADAS, COLUMNAS_OPTIMAS, puntos_optimos, version_resultados
+from modules.alertas_reorden import HORIZONTE_DIAS, alertas_catalogo
+from modules.libro_movimientos import LibroMovimientos, TIPOS_MANUALES, construir_libro
+
+# Vista paginada del inventario
+TAMANOS_PAGINA = (50, 100, 250, 500)
+MAX_FILAS_ALERTAS = 200
+# Marca (solo lectura) de las filas que cambió la última optimización
+COLUMNA_ACTUALIZADO = '🔄'
+MAX_FILAS_MOVIMIENTOS = 100
+# Ventanas de consolidación de pedidos en órdenes de compra (días)
+VENTANAS_CONSOLIDACION = {'Por día': 1, 'Por semana': 7, 'Por quincena': 14}
 
 # ============================================
 # FUNCIONES AUXILIARES
@@ -46,32 +58,18 @@ def generar_inventario_base(df_ventas: pd.DataFrame = None, use_example_data: bo
     df['Valor Total'] = df['Stock Actual'] * df['Costo Unitario']
     return df
 
+@medir()
 def sincronizar_puntos_optimos(df_inventario: pd.DataFrame, df_resultados: pd.DataFrame) -> pd.DataFrame:
-    """Actualiza las columnas 'Punto de Reorden (PR)' y 'Cantidad a Ordenar'."""
-    pr_map = df_resultados.set_index('producto')['punto_reorden'].to_dict()
-    orden_map = df_resultados.set_index('producto')['cantidad_a_ordenar'].to_dict()
-    
-    for col in ['Punto de Reorden (PR)', 'Cantidad a Ordenar']:
-        df_inventario[col] = pd.to_numeric(df_inventario[col], errors='coerce').fillna(0)
-    
-    df_inventario['PR Mapeado'] = df_inventario['Producto'].map(pr_map).fillna(0)
-    df_inventario['Punto de Reorden (PR)'] = np.where(
-        df_inventario['PR Mapeado'] > 0, df_inventario['PR Mapeado'].round(2), df_inventario['Punto de Reorden (PR)']
-    )
-    df_inventario = df_inventario.drop(columns=['PR Mapeado'], errors='ignore')
-    
-    df_inventario['Orden Mapeado'] = df_inventario['Producto'].map(orden_map).fillna(0)
-    df_inventario['Cantidad a Ordenar'] = np.where(
-        df_inventario['Orden Mapeado'] > 0, df_inventario['Orden Mapeado'].round(2), df_inventario['Cantidad a Ordenar']
-    )
-    df_inventario = df_inventario.drop(columns=['Orden Mapeado'], errors='ignore')
-    
-    df_inventario['Punto de Reorden (PR)'] = np.where(
-        df_inventario['Punto de Reorden (PR)'] < 0.01, 0.0, df_inventario['Punto de Reorden (PR)']
-    )
-    df_inventario['Cantidad a Ordenar'] = np.where(
-        df_inventario['Cantidad a Ordenar'] < 0.01, 0.0, df_inventario['Cantidad a Ordenar']
-    )
+    """
+    Actualiza las columnas 'Punto de Reorden (PR)' y 'Cantidad a Ordenar' con un
+    join por producto. La vista de inventario usa `AlmacenInventario.sincronizar_resultados`,
+    que además escribe solo las filas que cambian.
+    """
+    posiciones, valores = puntos_optimos(df_inventario['Producto'], df_resultados)
+    for j, col in enumerate(COLUMNAS_OPTIMAS):
+        actual = pd.to_numeric(df_inventario[col], errors='coerce').fillna(0).to_numpy(dtype=float, copy=True)
+        actual[posiciones] = np.where(np.isnan(valores[:, j]), actual[posiciones], valores[:, j])
+        df_inventario[col] = np.where(actual < 0.01, 0.0, actual)
 
     return df_inventario
 
@@ -79,7 +77,69 @@ def sincronizar_puntos_optimos(df_inventario: pd.DataFrame, df_resultados: pd.Da
 # FUNCIONES DE INTERFAZ Y GRÁFICOS
 # ============================================
 
-def inventario_basico_app():
+def _almacen_inventario(df_inventario: pd.DataFrame) -> AlmacenInventario:
+    """Almacén de la sesión; se reconstruye solo si `inventario_df` fue reemplazado desde fuera."""
+    almacen = st.session_state.get('inventario_store')
+    if almacen is None or almacen.df is not df_inventario:
+        almacen = AlmacenInventario(df_inventario)
+        st.session_state['inventario_store'] = almacen
+        st.session_state['inventario_df'] = almacen.df
+    return almacen
+
+
+def _libro_movimientos(almacen: AlmacenInventario) -> LibroMovimientos:
+    """
+    Libro de la sesión. Se reconstruye si cambian ventas, entradas o recetas,
+    conservando aperturas y ajustes; el stock tecleado de los productos que
+    aún no estaban anclados abre su saldo.
+    """
+    ventas = st.session_state.get('df_ventas_trazabilidad')
+    entradas = st.session_state.get('df_stock_trazabilidad')
+    repo = st.session_state.get('recetas_repo')
+    firma = (id(ventas), id(entradas), id(repo), getattr(repo, 'version', None))
+    previo = st.session_state.get('libro_movimientos')
+    if previo is not None and st.session_state.get('libro_firma') == firma:
+        libro = previo
+    else:
+        libro = construir_libro(
+            ventas, entradas, repo.ingredientes_df() if repo is not None else None,
+            manuales=previo.movimientos(tipos=TIPOS_MANUALES) if previo is not None else None
+        )
+        if previo is not None:
+            libro.anclados |= previo.anclados
+        st.session_state['libro_movimientos'] = libro
+        st.session_state['libro_firma'] = firma
+
+    pendientes = almacen.df.loc[~almacen.df['Producto'].isin(libro.anclados), ['Producto', 'Stock Actual']]
+    if not pendientes.empty:
+        libro.anclar(pendientes.set_index('Producto')['Stock Actual'])
+    return libro
+
+
+def _evaluar_reorden(almacen: AlmacenInventario, lead_time: int, horizonte_dias: int, ventana_dias: int) -> Dict[str, pd.DataFrame]:
+    """Alertas y órdenes del catálogo; se reevalúan solo si cambió el inventario, los resultados o los parámetros."""
+    df_resultados = st.session_state.get('df_resultados')
+    firma = (
+        id(almacen), almacen.version, version_resultados(df_resultados) if df_resultados is not None else None,
+        lead_time, horizonte_dias, ventana_dias, datetime.now().date()
+    )
+    previa = st.session_state.get('evaluacion_reorden')
+    if previa is None or previa['firma'] != firma:
+        previa = st.session_state['evaluacion_reorden'] = {
+            'firma': firma,
+            **alertas_catalogo(almacen.df, df_resultados, lead_time, horizonte_dias, ventana_dias),
+        }
+    return previa
+
+
+def _registrar_stock_tecleado(libro: LibroMovimientos, producto: str, stock: float):
+    """Un 'Stock Actual' tecleado es un conteo: se registra la diferencia con el libro."""
+    libro.conciliar(producto, stock, tipo='ajuste' if producto in libro.anclados else 'apertura')
+    libro.anclados.add(producto)
+
+
+@medir()
+def inventario_basico_app(lead_time: int = 7):
     """Componente completo para la interfaz del control de inventario básico."""
     st.header("🛒 Control de Inventario Básico")
     
@@ -89,70 +149,163 @@ def inventario_basico_app():
         st.warning("El inventario base está vacío. Sube datos en la pestaña de Optimización.")
         return 
 
-    # Sincronización de datos (si hay resultados)
-    if 'df_resultados' in st.session_state:
-        df_inventario = sincronizar_puntos_optimos(df_inventario, st.session_state['df_resultados'])
-        st.session_state['inventario_df'] = df_inventario
+    almacen = _almacen_inventario(df_inventario)
+
+    # Sincronización de datos (solo con otra versión de resultados o filas nuevas)
+    df_resultados = st.session_state.get('df_resultados')
+    if df_resultados is not None and not df_resultados.empty and almacen.requiere_sincronizar(df_resultados):
+        almacen.sincronizar_resultados(df_resultados)
+
+    # 'Stock Actual' es el saldo del libro de movimientos
+    libro = _libro_movimientos(almacen)
+    if almacen.libro_sincronizado != (id(libro), libro.version):
+        almacen.sincronizar_stock(libro.saldos(), (id(libro), libro.version))
 
     st.subheader("1️⃣ Inventario Actual (Edición en Vivo)")
-    
-    edited_df = st.data_editor(
-        df_inventario, width='stretch', key="data_editor_inventario"
+
+    # --- Filtros y orden (se resuelven en el servidor) ---
+    col_buscar, col_categoria, col_orden, col_sentido = st.columns([3, 2, 2, 1])
+    with col_buscar:
+        texto = st.text_input("🔎 Buscar producto", key="inventario_buscar")
+    with col_categoria:
+        categoria = st.selectbox("Categoría", ['Todas'] + almacen.categorias(), key="inventario_categoria")
+    with col_orden:
+        orden = st.selectbox("Ordenar por", ['(sin orden)'] + list(almacen.df.columns), key="inventario_orden")
+    with col_sentido:
+        descendente = st.toggle("Desc.", key="inventario_desc")
+    col_faltantes, col_tamano, col_pagina = st.columns([3, 2, 2])
+    with col_faltantes:
+        solo_faltantes = st.checkbox("Solo ítems bajo PR", key="inventario_solo_faltantes")
+        solo_actualizados = st.checkbox(
+            f"Solo actualizados por la optimización ({len(almacen.actualizados):,})",
+            key="inventario_solo_actualizados", disabled=not almacen.actualizados
+        ) and bool(almacen.actualizados)
+    with col_tamano:
+        tamano = st.selectbox("Filas por página", TAMANOS_PAGINA, index=1, key="inventario_tamano")
+
+    filtros = (texto, categoria, orden, descendente, solo_faltantes, solo_actualizados, tamano)
+    posiciones = almacen.buscar(
+        texto.strip(), None if categoria == 'Todas' else categoria, solo_faltantes, solo_actualizados,
+        None if orden == '(sin orden)' else orden, not descendente
     )
-    
-    if not edited_df.empty:
-        try:
-            df_final = edited_df.copy()
-            for col in ['Stock Actual', 'Punto de Reorden (PR)', 'Cantidad a Ordenar', 'Costo Unitario']:
-                df_final.loc[:, col] = pd.to_numeric(df_final[col], errors='coerce').fillna(0)
-            
-            df_final.loc[:, 'Faltante?'] = df_final['Stock Actual'] < df_final['Punto de Reorden (PR)']
-            df_final.loc[:, 'Valor Total'] = df_final['Stock Actual'] * df_final['Costo Unitario']
-            
-            st.session_state['inventario_df'] = df_final
-            
-        except Exception:
-            pass
-    
-    df_actual = st.session_state['inventario_df']
+    n_paginas = max(1, -(-len(posiciones) // tamano))
+    # Otro filtro u orden vuelve a la primera página
+    if st.session_state.get('inventario_filtros') != filtros:
+        st.session_state['inventario_filtros'] = filtros
+        st.session_state['inventario_pagina'] = 1
+    st.session_state['inventario_pagina'] = min(st.session_state.get('inventario_pagina', 1), n_paginas)
+    with col_pagina:
+        pagina = st.number_input(f"Página (de {n_paginas})", min_value=1, max_value=n_paginas, step=1, key="inventario_pagina")
 
-    st.subheader("2️⃣ Alertas y Totales")
+    # Los productos de la página quedan fijos mientras dure el editor: sus cambios
+    # vienen por número de fila y no deben apuntar a otro producto tras reordenar.
+    # Sincronizaciones que cambian filas también renuevan el editor para no reaplicar ediciones viejas.
+    clave_editor = f"editor_inventario_{abs(hash(filtros + (pagina, id(almacen), almacen.estructura, almacen.sincronizaciones)))}"
+    vista = st.session_state.get('inventario_vista')
+    if vista is None or vista['clave'] != clave_editor:
+        inicio = (pagina - 1) * tamano
+        productos = almacen.df['Producto'].to_numpy()[posiciones[inicio:inicio + tamano]].tolist()
+        vista = st.session_state['inventario_vista'] = {'clave': clave_editor, 'productos': productos}
 
-    items_faltantes = df_actual[df_actual['Faltante?']]
-    total_valor = df_actual['Valor Total'].sum()
-    
-    col_a, col_b = st.columns(2)
-    with col_a: st.metric("🚨 Ítems con Bajo Stock", f"{len(items_faltantes)}")
-    with col_b: st.metric("💰 Valor Total del Inventario", f"${total_valor:,.2f}")
+    st.caption(f"{len(posiciones):,} de {len(almacen):,} productos · página {pagina} de {n_paginas}")
+    df_pagina = almacen.filas(vista['productos'])
+    if almacen.actualizados:
+        # La marca no es una columna del inventario: aplicar_cambios la ignora
+        df_pagina.insert(0, COLUMNA_ACTUALIZADO, df_pagina['Producto'].isin(almacen.actualizados))
+        st.caption(f"{COLUMNA_ACTUALIZADO} = PR o cantidad a ordenar actualizados por la última optimización ({len(almacen.actualizados):,} productos).")
+    st.data_editor(
+        df_pagina, width='stretch', hide_index=True, num_rows='dynamic', key=clave_editor,
+        disabled=COLUMNAS_DERIVADAS + [COLUMNA_ACTUALIZADO]
+    )
 
-    if not items_faltantes.empty:
-        st.warning("⚠️ **¡URGENTE!** Ítems por debajo de PR.")
-        st.dataframe(
-            items_faltantes[['Producto', 'Stock Actual', 'Punto de Reorden (PR)']],
-            width='stretch', hide_index=True
+    # Solo el change-set del editor: las derivadas se recalculan en las filas tocadas
+    conteos = almacen.aplicar_cambios(
+        vista['productos'], st.session_state.get(clave_editor) or {},
+        al_cambiar_stock=lambda producto, stock: _registrar_stock_tecleado(libro, producto, stock)
+    )
+    almacen.libro_sincronizado = (id(libro), libro.version)
+    if conteos['agregadas'] or conteos['eliminadas']:
+        st.session_state['inventario_df'] = almacen.df
+        st.rerun()
+
+    st.subheader("2️⃣ Alertas y Órdenes de Compra")
+
+    col_horizonte, col_ventana = st.columns(2)
+    with col_horizonte:
+        horizonte = st.slider("Horizonte de pedidos (días)", 0, 60, HORIZONTE_DIAS, key="reorden_horizonte")
+    with col_ventana:
+        ventana = st.selectbox("Consolidar pedidos", list(VENTANAS_CONSOLIDACION), key="reorden_ventana")
+    evaluacion = _evaluar_reorden(almacen, lead_time, horizonte, VENTANAS_CONSOLIDACION[ventana])
+    alertas, ordenes = evaluacion['alertas'], evaluacion['ordenes']
+
+    totales = almacen.totales()
+    col_a, col_b, col_c, col_d = st.columns(4)
+    with col_a: st.metric("🚨 Ítems con Bajo Stock", f"{totales['faltantes']}")
+    with col_b: st.metric("💰 Valor Total del Inventario", f"${totales['valor_total']:,.2f}")
+    with col_c: st.metric("🛒 SKUs a Pedir", f"{len(alertas):,}", help=f"Pedidos con fecha dentro de {horizonte} días")
+    with col_d: st.metric("⛔ Riesgo de Quiebre", f"{int(alertas['riesgo_quiebre'].sum()):,}", help="Se agotan antes de que llegue el pedido")
+
+    if alertas.empty:
+        st.success("🎉 Ningún producto necesita pedido en el horizonte.")
+    else:
+        if alertas['riesgo_quiebre'].any():
+            st.warning(f"⚠️ **¡URGENTE!** {int(alertas['riesgo_quiebre'].sum())} productos se agotan antes de que llegue su pedido (lead time {lead_time} días).")
+        st.markdown("**Órdenes de compra consolidadas**")
+        st.dataframe(ordenes, width='stretch', hide_index=True, column_config={
+            'fecha_pedido': st.column_config.DateColumn("Fecha de pedido"),
+            'fecha_llegada': st.column_config.DateColumn("Llegada estimada"),
+            'costo_total': st.column_config.NumberColumn("Costo total", format="$%.2f"),
+        })
+        st.markdown("**Detalle por producto**")
+        st.dataframe(alertas.head(MAX_FILAS_ALERTAS), width='stretch', hide_index=True)
+        if len(alertas) > MAX_FILAS_ALERTAS:
+            st.caption(f"Se muestran {MAX_FILAS_ALERTAS} de {len(alertas):,}: los que hay que pedir antes, con riesgo de quiebre primero.")
+        st.download_button(
+            "📥 Descargar líneas de órdenes (CSV)", alertas.to_csv(index=False).encode('utf-8'),
+            file_name=f"ordenes_compra_{datetime.now():%Y%m%d}.csv", mime="text/csv"
         )
-    else: st.success("🎉 Todo el inventario está en niveles óptimos.")
+
+    with st.expander(f"📒 Libro de movimientos ({len(libro):,} movimientos)"):
+        col_producto, col_fecha = st.columns(2)
+        with col_producto:
+            producto = st.selectbox("Producto", libro.productos, key="libro_producto")
+        with col_fecha:
+            fecha = st.date_input("Stock al", value=datetime.now().date(), key="libro_fecha")
+        if producto is not None:
+            st.metric(f"Stock al {fecha:%d/%m/%Y}", f"{libro.stock_al(producto, fecha):,.2f}")
+            movimientos = libro.movimientos(producto)
+            st.dataframe(movimientos.tail(MAX_FILAS_MOVIMIENTOS).iloc[::-1], width='stretch', hide_index=True)
 
     st.markdown("---")
 
 
+@medir()
 def crear_grafico_trazabilidad_total(
     df_trazabilidad: pd.DataFrame, 
     resultado: Dict, 
     lead_time: int
 ):
     """Crea el gráfico de trazabilidad de Inventario con doble eje para Stock y Demanda."""
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+
     nombre = resultado['producto']
     punto_reorden = resultado['punto_reorden']
     cantidad_a_ordenar = resultado['cantidad_a_ordenar']
     pronostico_diario_promedio = resultado['pronostico_diario_promedio']
     
-    fig, ax1 = plt.subplots(figsize=(12, 6))
+    ancho_pulgadas, dpi = 12, 100
+    fig, ax1 = plt.subplots(figsize=(ancho_pulgadas, 6), dpi=dpi)
     ax2 = ax1.twinx()
     
     df_hist = df_trazabilidad[df_trazabilidad['Tipo'] == 'Histórico']
     df_proj = df_trazabilidad[df_trazabilidad['Tipo'] == 'Proyectado']
     
+    # Historiales largos: se reduce a ~1 punto por píxel conservando valles (quiebres) y picos
+    df_hist = reducir_dataframe(df_hist, 'Fecha', ['Stock', 'Ventas'], puntos_por_ancho(ancho_pulgadas * dpi))
+    # Los puntos reducidos no quedan equiespaciados: cada barra toma el ancho hasta sus vecinos
+    anchos_barra = anchos_barras(df_hist['Fecha'].to_numpy())
+    
     # Eje 1 (Izquierda): STOCK
     ax1.plot(df_hist['Fecha'], df_hist['Stock'], color='#1f77b4', linewidth=3, label='Stock Real Histórico')
     ax1.plot(df_proj['Fecha'], df_proj['Stock'], color='#ff7f0e', linewidth=2, linestyle='--', label='Stock Proyectado (Simulación PR)')
@@ -168,7 +321,7 @@ def crear_grafico_trazabilidad_total(
     ax1.tick_params(axis='y', labelcolor='#1f77b4')
 
     # Eje 2 (Derecha): DEMANDA (Ventas + Pronóstico + Órdenes)
-    ax2.bar(df_hist['Fecha'], df_hist['Ventas'], color='purple', alpha=0.3, width=1, label='Venta Diaria Histórica')
+    ax2.bar(df_hist['Fecha'], df_hist['Ventas'], color='purple', alpha=0.3, width=anchos_barra, label='Venta Diaria Histórica')
             
     pronostico_fechas = df_proj['Fecha']
     pronostico_valores = [pronostico_diario_promedio] * len(df_proj)
@@ -212,8 +365,11 @@ def crear_grafico_trazabilidad_total(
     
     return fig
 
+@medir()
 def crear_grafico_comparativo(resultados: List[Dict]):
     """Crea el gráfico de volumen total de ventas para la visión general."""
+    import matplotlib.pyplot as plt
+
     df = pd.DataFrame([r for r in resultados if r.get('error') is None])
     if df.empty:
         fig, ax = plt.subplots(figsize=(10, 5))
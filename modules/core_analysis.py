@@ -1,10 +1,12 @@
 # modules/core_analysis.py
-import statsmodels
 import pandas as pd
-from statsmodels.tsa.holtwinters import ExponentialSmoothing
 from typing import Dict, Union, List
 import numpy as np
+from modules.instrumentacion import medir, tramo
+from modules.matriz_compartida import adjuntar_matriz
+from modules.metricas import FIT_PRONOSTICO_SEGUNDOS, OPTIMIZACION_CATALOGO_SEGUNDOS, cronometro, cronometrar
 
+@medir('holt_winters.producto')
 def calcular_orden_optima_producto(
     df_producto: pd.DataFrame,
     nombre_producto: str,
@@ -17,25 +19,64 @@ def calcular_orden_optima_producto(
         df = df_producto.copy()
         df = df.set_index('fecha').sort_index()
         df_diario = df.resample('D').sum()
-        df_diario['cantidad_vendida'] = df_diario['cantidad_vendida'].fillna(0)
-        
-        volumen_total_vendido = df_diario['cantidad_vendida'].sum()
+        serie_ventas = df_diario['cantidad_vendida'].fillna(0)
+    except Exception as e:
+        return _resultado_error(nombre_producto, f'Error: {str(e)}', 0.0)
+    return calcular_orden_optima_serie(serie_ventas, nombre_producto, lead_time, stock_seguridad_dias, frecuencia_estacional)
+
+
+@medir('holt_winters.producto')
+def calcular_orden_optima_compartida(
+    tenant: str,
+    version: str,
+    nombre_producto: str,
+    lead_time: int = 7,
+    stock_seguridad_dias: int = 3,
+    frecuencia_estacional: int = 7,
+    directorio: str = None
+) -> Dict[str, Union[float, str]]:
+    """
+    Igual que `calcular_orden_optima_producto`, leyendo la serie del producto de
+    la matriz publicada del tenant: al worker solo viaja la referencia.
+    """
+    matriz = adjuntar_matriz(tenant, version, directorio)
+    if matriz is None:
+        return _resultado_error(nombre_producto, f'Error: matriz {version} del tenant no disponible', 0.0)
+    return calcular_orden_optima_serie(matriz.serie(nombre_producto), nombre_producto, lead_time, stock_seguridad_dias, frecuencia_estacional)
+
+
+def _resultado_error(nombre_producto: str, error: str, volumen_total_vendido: float) -> Dict[str, Union[float, str]]:
+    return {
+        'producto': nombre_producto, 'error': error,
+        'punto_reorden': 0.0, 'cantidad_a_ordenar': 0.0, 'pronostico_diario_promedio': 0.0,
+        'volumen_total_vendido': volumen_total_vendido
+    }
+
+
+def calcular_orden_optima_serie(
+    serie_ventas: pd.Series,
+    nombre_producto: str,
+    lead_time: int = 7,
+    stock_seguridad_dias: int = 3,
+    frecuencia_estacional: int = 7
+) -> Dict[str, Union[float, str]]:
+    """Ajuste Holt-Winters sobre la serie diaria (completa, sin huecos) de un producto."""
+    # statsmodels tarda segundos en importarse: se carga solo cuando se ajusta un modelo
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+    try:
+        volumen_total_vendido = serie_ventas.sum()
         
-        if len(df_diario) < frecuencia_estacional * 2:
-            return {
-                'producto': nombre_producto, 'error': 'Datos insuficientes (mínimo de estacionalidad)',
-                'punto_reorden': 0.0, 'cantidad_a_ordenar': 0.0, 'pronostico_diario_promedio': 0.0, 
-                'volumen_total_vendido': volumen_total_vendido
-            }
-            
-        serie_ventas = df_diario['cantidad_vendida']
+        if len(serie_ventas) < frecuencia_estacional * 2:
+            return _resultado_error(nombre_producto, 'Datos insuficientes (mínimo de estacionalidad)', volumen_total_vendido)
         
         # Modelo Holt-Winters
         modelo = ExponentialSmoothing(
             serie_ventas, trend='add', seasonal='add', seasonal_periods=frecuencia_estacional
         )
         
-        modelo_ajustado = modelo.fit(optimized=True)
+        with tramo('holt_winters.fit'), cronometro(FIT_PRONOSTICO_SEGUNDOS, producto=nombre_producto):
+            modelo_ajustado = modelo.fit(optimized=True)
         
         # El pronóstico se calcula para el Lead Time
         pronostico = modelo_ajustado.forecast(steps=lead_time)
@@ -60,31 +101,17 @@ def calcular_orden_optima_producto(
         }
         
     except Exception as e:
-        return {
-            'producto': nombre_producto, 'error': f'Error: {str(e)}',
-            'punto_reorden': 0.0, 'cantidad_a_ordenar': 0.0, 'pronostico_diario_promedio': 0.0, 
-            'volumen_total_vendido': 0.0
-        }
+        return _resultado_error(nombre_producto, f'Error: {str(e)}', 0.0)
 
 
-def procesar_multiple_productos(
-    df: pd.DataFrame,
-    lead_time: int = 7,
-    stock_seguridad_dias: int = 3,
-    frecuencia_estacional: int = 7
-) -> pd.DataFrame:
-    """Procesa múltiples productos, realiza la clasificación ABC y devuelve un DataFrame."""
-    resultados = []
-    productos = df['producto'].unique()
-    
-    for producto in productos:
-        df_producto = df[df['producto'] == producto][['fecha', 'cantidad_vendida']].copy()
-        
-        resultado = calcular_orden_optima_producto(df_producto, producto, lead_time, stock_seguridad_dias, frecuencia_estacional)
-        resultados.append(resultado)
-        
-    df_resultados = pd.DataFrame(resultados)
+def iterar_productos(df: pd.DataFrame):
+    """Recorre (producto, df_producto) con un solo groupby en lugar de un filtro por producto."""
+    for producto, df_producto in df.groupby('producto', sort=False):
+        yield producto, df_producto[['fecha', 'cantidad_vendida']].copy()
+
 
+def clasificar_abc(df_resultados: pd.DataFrame) -> pd.DataFrame:
+    """Agrega la clasificación ABC (80/95% del volumen acumulado) a los resultados."""
     if 'error' not in df_resultados.columns:
         df_resultados['error'] = None
     
@@ -108,3 +135,23 @@ def procesar_multiple_productos(
         df_resultados.loc[df_abc.index, 'clasificacion_abc'] = df_abc['clasificacion_abc']
     
     return df_resultados
+
+
+@medir('optimizacion.catalogo')
+@cronometrar(OPTIMIZACION_CATALOGO_SEGUNDOS)
+def procesar_multiple_productos(
+    df: pd.DataFrame,
+    lead_time: int = 7,
+    stock_seguridad_dias: int = 3,
+    frecuencia_estacional: int = 7
+) -> pd.DataFrame:
+    """Procesa múltiples productos, realiza la clasificación ABC y devuelve un DataFrame."""
+    resultados = []
+    
+    for producto, df_producto in iterar_productos(df):
+        resultado = calcular_orden_optima_producto(df_producto, producto, lead_time, stock_seguridad_dias, frecuencia_estacional)
+        resultados.append(resultado)
+        
+    df_resultados = pd.DataFrame(resultados)
+    
+    return clasificar_abc(df_resultados)
@@ -2,7 +2,10 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple
+from modules.instrumentacion import medir
+from modules.fusion_cargas import rango_fechas
 
+@medir()
 def calcular_indicadores_ventas(df_ventas: pd.DataFrame) -> Dict:
     """
     Calcula indicadores detallados de ventas
@@ -27,8 +30,8 @@ def calcular_indicadores_ventas(df_ventas: pd.DataFrame) -> Dict:
     # Tendencia (comparación de períodos)
     fecha_medio = fecha_min + timedelta(days=dias_analisis // 2)
     
-    ventas_primera_mitad = df_ventas[df_ventas['fecha'] < fecha_medio]['cantidad_vendida'].sum()
-    ventas_segunda_mitad = df_ventas[df_ventas['fecha'] >= fecha_medio]['cantidad_vendida'].sum()
+    ventas_segunda_mitad = rango_fechas(df_ventas, desde=fecha_medio)['cantidad_vendida'].sum()
+    ventas_primera_mitad = total_ventas - ventas_segunda_mitad
     
     if ventas_primera_mitad > 0:
         tendencia_crecimiento = ((ventas_segunda_mitad - ventas_primera_mitad) / ventas_primera_mitad) * 100
@@ -67,6 +70,7 @@ def calcular_indicadores_ventas(df_ventas: pd.DataFrame) -> Dict:
         'coeficiente_variacion': coeficiente_variacion
     }
 
+@medir()
 def calcular_indicadores_inventario(inventario_df: pd.DataFrame, df_resultados: pd.DataFrame) -> Dict:
     """
     Calcula indicadores detallados de inventario
@@ -128,6 +132,7 @@ def calcular_indicadores_inventario(inventario_df: pd.DataFrame, df_resultados:
         'analisis_abc': analisis_abc
     }
 
+@medir()
 def calcular_eficiencia_operacional(ventas_kpis: Dict, inventario_kpis: Dict, df_ventas: pd.DataFrame) -> Dict:
     """
     Calcula indicadores de eficiencia operacional
@@ -185,6 +190,7 @@ def calcular_eficiencia_operacional(ventas_kpis: Dict, inventario_kpis: Dict, df
         'costo_total_optimizado': costo_total_optimizado
     }
 
+@medir()
 def generar_recomendaciones(kpis_ventas: Dict, kpis_inventario: Dict, kpis_eficiencia: Dict) -> List[str]:
     """
     Genera recomendaciones automáticas basadas en los KPIs
@@ -238,6 +244,7 @@ def generar_recomendaciones(kpis_ventas: Dict, kpis_inventario: Dict, kpis_efici
     
     return recomendaciones
 
+@medir()
 def calcular_kpi_tendencias(df_ventas: pd.DataFrame, dias_periodo: int = 30) -> Dict:
     """
     Calcula tendencias específicas para el dashboard
@@ -252,14 +259,15 @@ def calcular_kpi_tendencias(df_ventas: pd.DataFrame, dias_periodo: int = 30) ->
     fecha_inicio_anterior = fecha_max - timedelta(days=dias_periodo * 2)
     fecha_fin_anterior = fecha_max - timedelta(days=dias_periodo + 1)
     
+    # Cortes por búsqueda binaria (las ventas se mantienen ordenadas por fecha)
+    df_reciente = rango_fechas(df_ventas, desde=fecha_inicio_reciente)
+    df_anterior = rango_fechas(df_ventas, desde=fecha_inicio_anterior, hasta=fecha_fin_anterior)
+
     # Ventas recientes
-    ventas_recientes = df_ventas[df_ventas['fecha'] >= fecha_inicio_reciente]['cantidad_vendida'].sum()
+    ventas_recientes = df_reciente['cantidad_vendida'].sum()
     
     # Ventas período anterior
-    ventas_anteriores = df_ventas[
-        (df_ventas['fecha'] >= fecha_inicio_anterior) & 
-        (df_ventas['fecha'] <= fecha_fin_anterior)
-    ]['cantidad_vendida'].sum()
+    ventas_anteriores = df_anterior['cantidad_vendida'].sum()
     
     # Cálculo de tendencia
     if ventas_anteriores > 0:
@@ -270,11 +278,8 @@ def calcular_kpi_tendencias(df_ventas: pd.DataFrame, dias_periodo: int = 30) ->
         cambio_absoluto = ventas_recientes
     
     # Tendencia por producto
-    productos_recientes = df_ventas[df_ventas['fecha'] >= fecha_inicio_reciente].groupby('producto')['cantidad_vendida'].sum()
-    productos_anteriores = df_ventas[
-        (df_ventas['fecha'] >= fecha_inicio_anterior) & 
-        (df_ventas['fecha'] <= fecha_fin_anterior)
-    ].groupby('producto')['cantidad_vendida'].sum()
+    productos_recientes = df_reciente.groupby('producto')['cantidad_vendida'].sum()
+    productos_anteriores = df_anterior.groupby('producto')['cantidad_vendida'].sum()
     
     tendencias_producto = {}
     for producto in productos_recientes.index:
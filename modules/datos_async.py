@@ -0,0 +1,255 @@
+# modules/datos_async.py
+
+import asyncio
+import codecs
+import json
+import re
+import threading
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from modules.metricas import SUPABASE_SEGUNDOS, cronometro
+
+# Filas por página (max-rows por defecto de PostgREST en Supabase)
+TAMANO_PAGINA = 1000
+# Peticiones HTTP simultáneas como máximo por carga (entre todas las tablas)
+MAX_CONCURRENCIA = 6
+# Conexiones keep-alive del cliente compartido por todas las cargas del proceso
+MAX_CONEXIONES = 20
+# Orden estable para que las páginas no se solapen
+ORDEN_DEFECTO = 'fecha.asc,producto.asc'
+
+_CONTENT_RANGE = re.compile(r'(\d+|\*)-?(\d*)/(\d+|\*)')
+
+# ============================================
+# DECODIFICACIÓN JSON INCREMENTAL
+# ============================================
+
+class DecodificadorArrayJSON:
+    """
+    Decodifica un array JSON de objetos a medida que llegan los bytes: cada
+    objeto completo se entrega en cuanto aparece, sin esperar al cuerpo entero.
+    """
+
+    def __init__(self):
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._inicio = False
+
+    def alimentar(self, chunk: bytes) -> List[Dict]:
+        """Agrega bytes y devuelve los objetos que quedaron completos."""
+        self._buffer += self._utf8.decode(chunk)
+        objetos = []
+        pos = 0
+        n = len(self._buffer)
+        while pos < n:
+            caracter = self._buffer[pos]
+            if caracter in ' \t\r\n,':
+                pos += 1
+                continue
+            if not self._inicio:
+                if caracter != '[':
+                    raise ValueError("Se esperaba un array JSON")
+                self._inicio = True
+                pos += 1
+                continue
+            if caracter == ']':
+                pos = n
+                break
+            try:
+                objeto, fin = self._decoder.raw_decode(self._buffer, pos)
+            except json.JSONDecodeError:
+                # Objeto incompleto: se espera al siguiente chunk
+                break
+            objetos.append(objeto)
+            pos = fin
+        self._buffer = self._buffer[pos:]
+        return objetos
+
+
+# ============================================
+# DESCARGA CONCURRENTE (POSTGREST)
+# ============================================
+
+def _cabeceras(key: str, token: Optional[str], desde: int, hasta: int, contar: bool) -> Dict[str, str]:
+    cabeceras = {
+        'apikey': key,
+        'Authorization': f'Bearer {token or key}',
+        'Accept': 'application/json',
+        'Range-Unit': 'items',
+        'Range': f'{desde}-{hasta}',
+    }
+    if contar:
+        cabeceras['Prefer'] = 'count=exact'
+    return cabeceras
+
+
+def _total_filas(content_range: Optional[str]) -> Optional[int]:
+    """Extrae el total de filas de un Content-Range de PostgREST ("0-999/5234")."""
+    if not content_range:
+        return None
+    coincidencia = _CONTENT_RANGE.search(content_range)
+    if coincidencia is None or coincidencia.group(3) == '*':
+        return None
+    return int(coincidencia.group(3))
+
+
+async def _descargar_pagina(
+    http, semaforo: asyncio.Semaphore, rest_url: str, tabla: str, params: Dict,
+    key: str, token: Optional[str], desde: int, hasta: Optional[int] = None, contar: bool = False
+) -> Tuple[List[Dict], Optional[int]]:
+    """
+    Pide las filas [desde, hasta] (una página por defecto) decodificando el
+    JSON mientras llega. El servidor puede devolver menos (`max-rows` de
+    PostgREST menor que la página).
+    """
+    hasta = desde + TAMANO_PAGINA - 1 if hasta is None else hasta
+    async with semaforo:
+        cabeceras = _cabeceras(key, token, desde, hasta, contar)
+        with cronometro(SUPABASE_SEGUNDOS, operacion='select', tabla=tabla):
+            async with http.stream('GET', f"{rest_url}/{tabla}", params=params, headers=cabeceras) as respuesta:
+                if respuesta.status_code >= 400:
+                    await respuesta.aread()
+                    respuesta.raise_for_status()
+                decodificador = DecodificadorArrayJSON()
+                filas = []
+                async for chunk in respuesta.aiter_bytes():
+                    filas.extend(decodificador.alimentar(chunk))
+                return filas, _total_filas(respuesta.headers.get('content-range'))
+
+
+async def _descargar_rango(
+    http, semaforo: asyncio.Semaphore, rest_url: str, tabla: str, params: Dict,
+    key: str, token: Optional[str], desde: int, hasta: Optional[int] = None
+) -> List[Dict]:
+    """
+    Filas desde `desde` hasta `hasta` (o hasta el final si es None). Cada
+    petición avanza según las filas recibidas, así que páginas más cortas
+    que las pedidas no dejan huecos; sin `hasta` se termina con una página vacía.
+    """
+    filas = []
+    while hasta is None or desde <= hasta:
+        pagina, _ = await _descargar_pagina(http, semaforo, rest_url, tabla, params, key, token, desde, hasta)
+        if not pagina:
+            break
+        filas.extend(pagina)
+        desde += len(pagina)
+    return filas
+
+
+async def _descargar_filas(
+    http, semaforo: asyncio.Semaphore, rest_url: str, tabla: str, params: Dict,
+    key: str, token: Optional[str] = None
+) -> List[Dict]:
+    """
+    Todas las filas de la consulta. La primera página informa el total y el
+    tamaño real de página del servidor; el resto de rangos se piden en paralelo
+    con ese paso. Sin conteo exacto se pagina secuencialmente.
+    """
+    primeras, total = await _descargar_pagina(http, semaforo, rest_url, tabla, params, key, token, 0, contar=True)
+    if not primeras:
+        return []
+    if total is None:
+        return primeras + await _descargar_rango(http, semaforo, rest_url, tabla, params, key, token, len(primeras))
+    paso = len(primeras)
+    restantes = await asyncio.gather(*[
+        _descargar_rango(http, semaforo, rest_url, tabla, params, key, token, desde, min(desde + paso, total) - 1)
+        for desde in range(paso, total, paso)
+    ])
+    return primeras + [fila for rango in restantes for fila in rango]
+
+
+async def descargar_tabla_async(
+    http, semaforo: asyncio.Semaphore, rest_url: str, tabla: str, user_id: str,
+    key: str, token: Optional[str] = None, orden: str = ORDEN_DEFECTO
+) -> Optional[pd.DataFrame]:
+    """Descarga una tabla completa del usuario (páginas en paralelo) y convierte `fecha` a datetime."""
+    params = {'select': '*', 'user_id': f'eq.{user_id}'}
+    if orden:
+        params['order'] = orden
+
+    filas = await _descargar_filas(http, semaforo, rest_url, tabla, params, key, token)
+    if not filas:
+        return None
+    df = pd.DataFrame(filas)
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return df
+
+
+async def descargar_tablas_async(
+    rest_url: str,
+    key: str,
+    user_id: str,
+    tablas: List[str],
+    token: Optional[str] = None,
+    max_concurrencia: int = MAX_CONCURRENCIA,
+    http=None
+) -> Dict[str, Optional[pd.DataFrame]]:
+    """
+    Descarga varias tablas del usuario a la vez con paralelismo acotado. `http`
+    es el httpx.AsyncClient a usar (por defecto, el compartido del proceso).
+    """
+    semaforo = asyncio.Semaphore(max_concurrencia)
+    http = http or _cliente_compartido()
+    dfs = await asyncio.gather(*[
+        descargar_tabla_async(http, semaforo, rest_url.rstrip('/'), tabla, user_id, key, token)
+        for tabla in tablas
+    ])
+    return dict(zip(tablas, dfs))
+
+
+async def listar_ids_async(rest_url: str, key: str, tabla: str = 'clients', columna: str = 'id', http=None) -> List[str]:
+    """IDs de todos los tenants (requiere una key con acceso a la tabla, p. ej. service_role)."""
+    params = {'select': columna, 'order': f'{columna}.asc'}
+    filas = await _descargar_filas(http or _cliente_compartido(), asyncio.Semaphore(MAX_CONCURRENCIA), rest_url.rstrip('/'), tabla, params, key)
+    return [str(fila[columna]) for fila in filas]
+
+
+# ============================================
+# CLIENTE HTTP COMPARTIDO
+# ============================================
+
+_bucle: Optional[asyncio.AbstractEventLoop] = None
+_cliente = None
+_lock_bucle = threading.Lock()
+
+
+def _bucle_compartido() -> asyncio.AbstractEventLoop:
+    """
+    Bucle de eventos del proceso en un hilo propio. Un AsyncClient queda atado
+    al bucle donde abrió sus conexiones: con un `asyncio.run` por carga, el
+    pool keep-alive no se podría reutilizar entre cargas.
+    """
+    global _bucle
+    with _lock_bucle:
+        if _bucle is None:
+            _bucle = asyncio.new_event_loop()
+            threading.Thread(target=_bucle.run_forever, name="datos-async", daemon=True).start()
+        return _bucle
+
+
+def _cliente_compartido():
+    """AsyncClient único del proceso (solo desde el bucle compartido)."""
+    import httpx
+
+    global _cliente
+    if _cliente is None:
+        _cliente = httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0),
+            limits=httpx.Limits(max_connections=MAX_CONEXIONES, max_keepalive_connections=MAX_CONEXIONES)
+        )
+    return _cliente
+
+
+def _ejecutar(corrutina):
+    return asyncio.run_coroutine_threadsafe(corrutina, _bucle_compartido()).result()
+
+
+def descargar_tablas(rest_url: str, key: str, user_id: str, tablas: List[str], token: Optional[str] = None, **kwargs) -> Dict[str, Optional[pd.DataFrame]]:
+    """Versión síncrona de `descargar_tablas_async`: corre en el bucle compartido, con su pool de conexiones."""
+    return _ejecutar(descargar_tablas_async(rest_url, key, user_id, tablas, token, **kwargs))
+
+
+def listar_ids(rest_url: str, key: str, tabla: str = 'clients', columna: str = 'id') -> List[str]:
+    """Versión síncrona de `listar_ids_async`."""
+    return _ejecutar(listar_ids_async(rest_url, key, tabla, columna))
@@ -0,0 +1,51 @@
+# modules/datos_supabase.py
+
+import pandas as pd
+from typing import Dict, Optional
+from modules.fusion_cargas import CLAVE
+
+# Tablas del tenant y columnas esperadas cuando la tabla está vacía
+TABLAS_TENANT = {
+    'ventas': ['fecha', 'producto', 'cantidad_vendida', 'user_id'],
+    'stock': ['fecha', 'producto', 'cantidad_recibida', 'user_id'],
+}
+
+# ============================================
+# DESCARGA DE DATOS DEL TENANT
+# ============================================
+
+def descargar_datos_tenant(cliente, user_id: str) -> Dict[str, pd.DataFrame]:
+    """
+    Descarga `ventas` y `stock` del tenant en paralelo (tablas y páginas a la vez).
+    Una tabla sin filas se devuelve como None.
+    """
+    from modules.datos_async import descargar_tablas
+
+    return descargar_tablas(
+        str(cliente.rest_url), cliente.supabase_key, user_id, list(TABLAS_TENANT), token=_token_sesion(cliente)
+    )
+
+
+def escribir_cambios(cliente, tabla: str, cambios: Dict[str, pd.DataFrame], columna_valor: str) -> int:
+    """
+    Escribe en `tabla` solo el resultado de `fusionar_carga`: claves nuevas y
+    claves que cambian van en un único upsert sobre (user_id, fecha, producto),
+    atómico en el servidor (requiere esa restricción única en la tabla).
+    Devuelve las filas escritas.
+    """
+    filas = pd.concat([cambios['insertar'], cambios['actualizar']], ignore_index=True)
+    if filas.empty:
+        return 0
+    filas['fecha'] = filas['fecha'].dt.strftime('%Y-%m-%d')
+    data = filas[['user_id', 'fecha', 'producto', columna_valor]].to_dict('records')
+    respuesta = cliente.table(tabla).upsert(data, on_conflict=','.join(CLAVE)).execute()
+    return len(respuesta.data)
+
+
+def _token_sesion(cliente) -> Optional[str]:
+    """Token del usuario autenticado en el cliente (para respetar RLS), si existe."""
+    try:
+        sesion = cliente.auth.get_session()
+    except Exception:
+        return None
+    return sesion.access_token if sesion else None
@@ -0,0 +1,114 @@
+# modules/estados_producto.py
+
+import time
+import pandas as pd
+import numpy as np
+from typing import Dict
+from modules.instrumentacion import medir
+
+ESTADO_CRITICO = '🔴 Crítico'
+ESTADO_SIN_OPTIMIZACION = '🔴 Sin optimización'
+ESTADO_ADVERTENCIA = '🟡 Advertencia'
+ESTADO_OPTIMO = '🟢 Óptimo'
+
+# Umbral de advertencia: stock por encima del PR pero por debajo de PR * 1.5
+FACTOR_ADVERTENCIA = 1.5
+
+ORDEN_ESTADOS = {ESTADO_CRITICO: 0, ESTADO_SIN_OPTIMIZACION: 1, ESTADO_ADVERTENCIA: 2, ESTADO_OPTIMO: 3}
+
+# ============================================
+# MOTOR VECTORIZADO DE ESTADOS
+# ============================================
+
+@medir('estados.clasificar')
+def clasificar_estados_producto(inventario_df: pd.DataFrame, df_resultados: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calcula para todo el catálogo el estado de stock, los días de cobertura y la
+    prioridad, con expresiones vectorizadas (sin apply por fila).
+    """
+    if inventario_df is None or inventario_df.empty:
+        return pd.DataFrame()
+
+    df = inventario_df.copy()
+    stock = pd.to_numeric(df['Stock Actual'], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+    if df_resultados is None or df_resultados.empty:
+        df['Estado'] = 'Sin optimización'
+        df['ABC'] = 'N/A'
+        df['Punto Reorden'] = 0
+        df['Cantidad a Ordenar'] = 0
+        df['Días de Inventario'] = 0
+        df['Prioridad'] = 4
+        return df
+
+    # Join por índice hash en lugar de merge fila a fila
+    resultados = df_resultados.drop_duplicates('producto').set_index('producto')
+    alineado = resultados.reindex(df['Producto'])
+
+    pr = alineado['punto_reorden'].to_numpy(dtype=float)
+    pronostico = alineado['pronostico_diario_promedio'].to_numpy(dtype=float)
+    sin_pr = np.isnan(pr)
+
+    df['Estado'] = np.select(
+        [sin_pr, stock <= pr, stock <= pr * FACTOR_ADVERTENCIA],
+        [ESTADO_SIN_OPTIMIZACION, ESTADO_CRITICO, ESTADO_ADVERTENCIA],
+        default=ESTADO_OPTIMO
+    )
+
+    con_pronostico = ~np.isnan(pronostico) & (pronostico != 0)
+    dias = np.zeros(len(df))
+    np.divide(stock, pronostico, out=dias, where=con_pronostico)
+    df['Días de Inventario'] = np.round(dias, 1)
+
+    df['ABC'] = alineado['clasificacion_abc'].fillna('N/A').to_numpy() if 'clasificacion_abc' in alineado.columns else 'N/A'
+    df['Punto Reorden'] = np.round(np.nan_to_num(pr, nan=0.0), 0)
+    df['Cantidad a Ordenar'] = np.round(np.nan_to_num(alineado['cantidad_a_ordenar'].to_numpy(dtype=float), nan=0.0), 0)
+    df['Prioridad'] = pd.Series(df['Estado']).map(ORDEN_ESTADOS).fillna(4).to_numpy()
+    return df
+
+
+def contar_estados(df_estados: pd.DataFrame) -> Dict[str, int]:
+    """Conteo de productos por estado para el gráfico de composición."""
+    if df_estados is None or df_estados.empty:
+        return {}
+    # En el gráfico los productos sin PR se muestran sin el indicador rojo
+    estados = df_estados['Estado'].replace({ESTADO_SIN_OPTIMIZACION: 'Sin optimización'})
+    conteo = estados.value_counts(sort=False)
+    return {estado: int(n) for estado, n in conteo.items()}
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def benchmark_estados(n_skus: int = 50000, repeticiones: int = 5) -> Dict[str, float]:
+    """Mide el tiempo medio (ms) de clasificación y conteo sobre un catálogo sintético."""
+    rng = np.random.default_rng(0)
+    productos = [f'SKU-{i}' for i in range(n_skus)]
+    inventario = pd.DataFrame({
+        'Producto': productos,
+        'Stock Actual': rng.uniform(0, 200, n_skus),
+    })
+    resultados = pd.DataFrame({
+        'producto': productos,
+        'punto_reorden': np.where(rng.random(n_skus) < 0.1, np.nan, rng.uniform(10, 100, n_skus)),
+        'cantidad_a_ordenar': rng.uniform(5, 50, n_skus),
+        'pronostico_diario_promedio': rng.uniform(0, 20, n_skus),
+        'clasificacion_abc': rng.choice(['A', 'B', 'C'], n_skus),
+    })
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        df_estados = clasificar_estados_producto(inventario, resultados)
+    t_clasificar = (time.perf_counter() - inicio) / repeticiones
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        contar_estados(df_estados)
+    t_contar = (time.perf_counter() - inicio) / repeticiones
+
+    return {'n_skus': n_skus, 'clasificar_ms': t_clasificar * 1000, 'contar_ms': t_contar * 1000}
+
+
+if __name__ == "__main__":
+    print(benchmark_estados())
@@ -0,0 +1,134 @@
+# modules/fusion_cargas.py
+
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# Una fila por usuario, día y producto
+CLAVE = ['user_id', 'fecha', 'producto']
+ORDEN = ['fecha', 'producto']
+
+# ============================================
+# ÍNDICE HASH POR CLAVE
+# ============================================
+
+def _hash_texto(columna: pd.Series) -> np.ndarray:
+    # Se hashean solo los valores distintos (pocos productos, un usuario) y se expanden por código
+    codigos, unicos = pd.factorize(columna)
+    return pd.util.hash_array(unicos.astype(str).to_numpy(dtype=object))[codigos]
+
+
+def hash_claves(df: pd.DataFrame) -> np.ndarray:
+    """Hash uint64 de (user_id, fecha, producto) de cada fila, con la fecha como número de día."""
+    # Días desde 1970: el mismo día hashea igual sea cual sea la resolución (ns, us, ms, s)
+    fechas = pd.to_datetime(df['fecha']).dt.normalize().to_numpy().astype('datetime64[D]').view('i8')
+    resultado = _hash_texto(df['user_id'])
+    for parte in (pd.util.hash_array(fechas), _hash_texto(df['producto'])):
+        # Combinación no conmutativa (aritmética uint64 con desborde)
+        resultado = (resultado * np.uint64(0x9E3779B97F4A7C15)) ^ parte
+    return resultado
+
+
+def _agrupar_por_clave(df: pd.DataFrame, columna_valor: str) -> pd.DataFrame:
+    """Una fila por clave (las repetidas se suman, como las agrega el análisis) con su hash."""
+    df = df.assign(fecha=pd.to_datetime(df['fecha']).dt.normalize(), _hash=hash_claves(df))
+    if df['_hash'].is_unique:
+        return df
+    agregado = df.groupby('_hash', sort=False).agg({**{c: 'first' for c in CLAVE}, columna_valor: 'sum'})
+    return agregado.reset_index()
+
+
+def _sumar_repetidas(df: pd.DataFrame, columna_valor: str) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Histórico con una fila por clave: las repetidas (inserciones duplicadas
+    anteriores al upsert) se suman en la primera, conservando sus demás
+    columnas y el orden. Devuelve el frame y el hash de cada fila.
+    """
+    hashes = hash_claves(df)
+    if pd.Index(hashes).is_unique:
+        return df, hashes
+    otras = {c: 'first' for c in df.columns if c != columna_valor}
+    valores = pd.to_numeric(df[columna_valor], errors='coerce')
+    agregado = df.assign(**{columna_valor: valores}).groupby(hashes, sort=False).agg({**otras, columna_valor: 'sum'})
+    return agregado[df.columns].reset_index(drop=True), agregado.index.to_numpy()
+
+
+# ============================================
+# FUSIÓN INCREMENTAL
+# ============================================
+
+def fusionar_carga(
+    df_actual: Optional[pd.DataFrame],
+    df_nuevo: pd.DataFrame,
+    columna_valor: str
+) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame], Dict[str, int]]:
+    """
+    Fusiona una carga con los datos ya en sesión usando un índice hash de la
+    clave (user_id, fecha, producto): las claves nuevas se agregan, las que
+    cambian de `columna_valor` se actualizan y las idénticas se omiten. Las
+    claves repetidas de `df_actual` se suman antes en una sola fila.
+
+    Devuelve el DataFrame fusionado (ordenado por fecha y producto, sin
+    modificar `df_actual`), las filas a escribir en la base (`insertar` y
+    `actualizar`) y los conteos de insertadas, actualizadas y omitidas.
+    """
+    nuevo = _agrupar_por_clave(df_nuevo, columna_valor)
+
+    if df_actual is None or df_actual.empty:
+        fusionado = nuevo.drop(columns='_hash').sort_values(ORDEN, kind='mergesort', ignore_index=True)
+        cambios = {'insertar': fusionado, 'actualizar': fusionado.iloc[:0]}
+        return fusionado, cambios, {'insertadas': len(fusionado), 'actualizadas': 0, 'omitidas': 0}
+
+    # Índice hash -> posición, sobre el histórico con sus claves repetidas ya sumadas
+    actual, hashes = _sumar_repetidas(df_actual.reset_index(drop=True), columna_valor)
+    indice = pd.Series(np.arange(len(actual)), index=hashes)
+
+    encontrado = indice.index.get_indexer(nuevo['_hash'].to_numpy())
+    es_nueva = encontrado < 0
+    posiciones = indice.to_numpy()[encontrado[~es_nueva]]
+
+    valores_nuevos = nuevo[columna_valor].to_numpy(dtype=float)[~es_nueva]
+    valores_actuales = pd.to_numeric(actual[columna_valor], errors='coerce').to_numpy(dtype=float)[posiciones]
+    cambia = ~np.isclose(valores_nuevos, valores_actuales)
+
+    insertar = nuevo.loc[es_nueva].drop(columns='_hash')
+    actualizar = nuevo.loc[~es_nueva].loc[cambia].drop(columns='_hash')
+
+    fusionado = actual.copy()
+    if cambia.any():
+        fusionado.loc[posiciones[cambia], columna_valor] = valores_nuevos[cambia]
+    if not insertar.empty:
+        insertar = insertar.sort_values(ORDEN, kind='mergesort')
+        posterior = insertar['fecha'].iloc[0] > actual['fecha'].max()
+        fusionado = pd.concat([fusionado, insertar], ignore_index=True)
+        # Lo habitual (export semanal) agrega días posteriores: ya queda ordenado
+        if not (posterior and actual['fecha'].is_monotonic_increasing):
+            # Estable: las filas existentes conservan su orden relativo
+            fusionado = fusionado.sort_values(ORDEN, kind='mergesort', ignore_index=True)
+
+    conteos = {'insertadas': len(insertar), 'actualizadas': int(cambia.sum()), 'omitidas': int((~cambia).sum())}
+    return fusionado, {'insertar': insertar, 'actualizar': actualizar}, conteos
+
+
+# ============================================
+# CORTES POR FECHA CON BÚSQUEDA BINARIA
+# ============================================
+
+def rango_fechas(df: pd.DataFrame, desde=None, hasta=None) -> pd.DataFrame:
+    """
+    Filas con `desde <= fecha <= hasta` (extremos opcionales). Si el frame está
+    ordenado por fecha se corta con búsqueda binaria; si no, con una máscara.
+    """
+    fechas = df['fecha']
+    if not fechas.is_monotonic_increasing:
+        mascara = pd.Series(True, index=df.index)
+        if desde is not None:
+            mascara &= fechas >= desde
+        if hasta is not None:
+            mascara &= fechas <= hasta
+        return df[mascara]
+
+    valores = fechas.to_numpy()
+    inicio = 0 if desde is None else valores.searchsorted(np.datetime64(pd.Timestamp(desde)), side='left')
+    fin = len(df) if hasta is None else valores.searchsorted(np.datetime64(pd.Timestamp(hasta)), side='right')
+    return df.iloc[inicio:fin]
@@ -0,0 +1,171 @@
+# modules/instrumentacion.py
+
+import functools
+import threading
+import time
+import tracemalloc
+import weakref
+from typing import Dict, List, Optional
+
+# ============================================
+# ÁRBOL DE TRAMOS (SPANS) POR RERUN
+# ============================================
+
+class Tramo:
+    """Nodo del árbol de un rerun: las llamadas con el mismo nombre bajo el mismo padre se agregan."""
+
+    __slots__ = ('nombre', 'hijos', 'llamadas', 'segundos', 'memoria_bytes')
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.hijos: Dict[str, 'Tramo'] = {}
+        self.llamadas = 0
+        self.segundos = 0.0
+        self.memoria_bytes = 0
+
+    def hijo(self, nombre: str) -> 'Tramo':
+        nodo = self.hijos.get(nombre)
+        if nodo is None:
+            nodo = self.hijos[nombre] = Tramo(nombre)
+        return nodo
+
+
+_local = threading.local()
+# Número de hilos perfilando; con 0 los decoradores salen de inmediato
+_hilos_activos = 0
+_lock = threading.Lock()
+
+
+class _Guardia:
+    """Vive en el estado del hilo: si el hilo termina sin cerrar su rerun, lo libera al recolectarse."""
+
+
+def _liberar_hilo():
+    """Descuenta un hilo perfilando; con 0 se detiene tracemalloc."""
+    global _hilos_activos
+    with _lock:
+        _hilos_activos -= 1
+        if _hilos_activos == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def iniciar_rerun(nombre: str = 'rerun', medir_memoria: bool = False) -> Tramo:
+    """
+    Abre el tramo raíz del rerun en el hilo actual y activa la instrumentación.
+    Si el rerun se corta (excepción, st.stop, st.rerun) sin `finalizar_rerun`,
+    el hilo se libera al reutilizarse o, si Streamlit lo descarta, al terminar.
+    """
+    global _hilos_activos
+    if getattr(_local, 'pila', None) is None:
+        with _lock:
+            _hilos_activos += 1
+        _local.guardia = _Guardia()
+        _local.liberar = weakref.finalize(_local.guardia, _liberar_hilo)
+    raiz = Tramo(nombre)
+    raiz.llamadas = 1
+    _local.pila = [raiz]
+    _local.inicio = time.perf_counter()
+    _local.memoria = medir_memoria
+    if medir_memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _local.memoria_inicio = tracemalloc.get_traced_memory()[0] if medir_memoria else 0
+    return raiz
+
+
+def finalizar_rerun() -> Optional[Tramo]:
+    """Cierra el tramo raíz del hilo actual y devuelve el árbol completo."""
+    pila = getattr(_local, 'pila', None)
+    if pila is None:
+        return None
+    raiz = pila[0]
+    raiz.segundos = time.perf_counter() - _local.inicio
+    if _local.memoria:
+        raiz.memoria_bytes = tracemalloc.get_traced_memory()[0] - _local.memoria_inicio
+    _local.pila = None
+    # El finalizador corre una sola vez: no se vuelve a descontar al terminar el hilo
+    _local.liberar()
+    _local.guardia = _local.liberar = None
+    return raiz
+
+
+def cancelar_rerun():
+    """Descarta el árbol en curso (p. ej. si el rerun se interrumpe con st.stop)."""
+    finalizar_rerun()
+
+
+class tramo:
+    """
+    Context manager que mide un bloque dentro del rerun en curso:
+
+        with tramo('supabase.carga'):
+            ...
+
+    Fuera de un rerun perfilado no hace nada.
+    """
+
+    __slots__ = ('nombre', 'nodo', 'inicio', 'memoria')
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.nodo = None
+
+    def __enter__(self):
+        if not _hilos_activos:
+            return self
+        pila = getattr(_local, 'pila', None)
+        if pila is None:
+            return self
+        self.nodo = pila[-1].hijo(self.nombre)
+        pila.append(self.nodo)
+        self.memoria = tracemalloc.get_traced_memory()[0] if _local.memoria else 0
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.nodo is None:
+            return False
+        self.nodo.segundos += time.perf_counter() - self.inicio
+        self.nodo.llamadas += 1
+        if _local.memoria:
+            self.nodo.memoria_bytes += tracemalloc.get_traced_memory()[0] - self.memoria
+        _local.pila.pop()
+        return False
+
+
+def medir(nombre: str = None):
+    """Decorador que registra cada llamada a la función como un tramo del rerun."""
+    def decorador(funcion):
+        etiqueta = nombre or f"{funcion.__module__.split('.')[-1]}.{funcion.__name__}"
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _hilos_activos:
+                return funcion(*args, **kwargs)
+            with tramo(etiqueta):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+# ============================================
+# REPORTE
+# ============================================
+
+def arbol_a_filas(raiz: Tramo) -> List[Dict]:
+    """Aplana el árbol en filas (con sangría por nivel) para mostrarlo como tabla."""
+    filas = []
+
+    def recorrer(nodo: Tramo, nivel: int):
+        hijos_s = sum(h.segundos for h in nodo.hijos.values())
+        filas.append({
+            'tramo': '    ' * nivel + nodo.nombre,
+            'llamadas': nodo.llamadas,
+            'total_ms': round(nodo.segundos * 1000, 2),
+            'propio_ms': round(max(nodo.segundos - hijos_s, 0) * 1000, 2),
+            'memoria_kb': round(nodo.memoria_bytes / 1024, 1),
+        })
+        for hijo in sorted(nodo.hijos.values(), key=lambda h: -h.segundos):
+            recorrer(hijo, nivel + 1)
+
+    recorrer(raiz, 0)
+    return filas
@@ -0,0 +1,328 @@
+# modules/inventario_store.py
+
+import itertools
+import time
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+COLUMNAS_NUMERICAS = ['Stock Actual', 'Punto de Reorden (PR)', 'Cantidad a Ordenar', 'Costo Unitario']
+COLUMNAS_DERIVADAS = ['Faltante?', 'Valor Total']
+VALORES_DEFECTO = {'Categoría': 'Insumo', 'Unidad': 'UNI'}
+
+# Columnas del inventario que fija la optimización, con su columna en df_resultados
+COLUMNAS_OPTIMAS = {'Punto de Reorden (PR)': 'punto_reorden', 'Cantidad a Ordenar': 'cantidad_a_ordenar'}
+# Atributos de df_resultados con su versión y su momento de cálculo (viajan con el frame, también al bajarlo a disco)
+ATRIBUTO_VERSION = 'stockzero_version_resultados'
+ATRIBUTO_GENERADO = 'stockzero_resultados_generados'
+
+# ============================================
+# VERSIÓN DE RESULTADOS Y JOIN CON EL INVENTARIO
+# ============================================
+
+_SELLOS = itertools.count(1)
+
+
+def sellar_resultados(df_resultados: pd.DataFrame, generado: Optional[float] = None) -> pd.DataFrame:
+    """
+    Marca `df_resultados` con una versión nueva y el momento (epoch) en que se
+    calcularon, por defecto ahora; llamar al guardarlo en la sesión.
+    """
+    df_resultados.attrs[ATRIBUTO_VERSION] = next(_SELLOS)
+    df_resultados.attrs[ATRIBUTO_GENERADO] = time.time() if generado is None else generado
+    return df_resultados
+
+
+def generado_resultados(df_resultados: pd.DataFrame) -> float:
+    """Momento de cálculo de los resultados (0 si no se sellaron)."""
+    return df_resultados.attrs.get(ATRIBUTO_GENERADO, 0.0)
+
+
+def version_resultados(df_resultados: pd.DataFrame) -> Hashable:
+    """Versión de los resultados; sin sello, la identidad del objeto."""
+    return df_resultados.attrs.get(ATRIBUTO_VERSION, ('id', id(df_resultados)))
+
+
+def puntos_optimos(productos: pd.Series, df_resultados: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Join indexado de los resultados con los productos del inventario. Devuelve
+    las posiciones de los productos optimizados y, por cada una, los valores de
+    `COLUMNAS_OPTIMAS` redondeados (NaN donde la optimización no dio un valor
+    positivo y se conserva el del inventario).
+    """
+    resultados = df_resultados.drop_duplicates('producto', keep='last')
+    posiciones = pd.Index(productos).get_indexer(resultados['producto'])
+    encontrados = posiciones >= 0
+    valores = np.column_stack([
+        pd.to_numeric(resultados[col], errors='coerce').to_numpy(dtype=float)[encontrados]
+        for col in COLUMNAS_OPTIMAS.values()
+    ]).reshape(-1, len(COLUMNAS_OPTIMAS))
+    valores = np.where(valores > 0, np.round(valores, 2), np.nan)
+    valores[valores < 0.01] = 0.0
+    return posiciones[encontrados], valores
+
+# ============================================
+# ALMACÉN INDEXADO DEL INVENTARIO
+# ============================================
+
+class AlmacenInventario:
+    """
+    Inventario indexado por producto para vistas paginadas. Las columnas
+    numéricas se convierten una sola vez al construirlo; las ediciones llegan
+    como change-set del editor y solo recalculan las columnas derivadas de las
+    filas tocadas. Filtros y orden se resuelven con operaciones vectorizadas;
+    los órdenes por columna se cachean hasta que esa columna cambia.
+
+    `df` se modifica en su lugar al editar valores (quien lo tenga ve los
+    cambios); altas, bajas y sincronizaciones lo reemplazan.
+    """
+
+    def __init__(self, df_inventario: pd.DataFrame):
+        df = df_inventario.reset_index(drop=True).copy()
+        for col in COLUMNAS_NUMERICAS:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(float)
+        self.version = 0
+        self.estructura = 0
+        self.resultados_sincronizados: Optional[Hashable] = None
+        self.estructura_sincronizada: Optional[int] = None
+        # Productos cuyo PR o cantidad cambió con la última optimización aplicada
+        self.actualizados: set = set()
+        self.libro_sincronizado: Optional[Hashable] = None
+        # Sincronizaciones que cambiaron filas (renuevan el editor de la vista)
+        self.sincronizaciones = 0
+        self._reconstruir(df)
+
+    def _reconstruir(self, df: pd.DataFrame):
+        """Nuevo frame (altas, bajas o sincronización): índices y derivadas completas."""
+        self.df = df.reset_index(drop=True)
+        self.df['Faltante?'] = self.df['Stock Actual'] < self.df['Punto de Reorden (PR)']
+        self.df['Valor Total'] = self.df['Stock Actual'] * self.df['Costo Unitario']
+        self._posiciones: Dict[str, int] = {p: i for i, p in enumerate(self.df['Producto'])}
+        self._ordenes: Dict = {}
+        self._texto: Optional[pd.Series] = None
+        self._totales: Optional[Dict] = None
+
+    def _recalcular_derivadas(self, filas: List[int]):
+        stock = self.df.loc[filas, 'Stock Actual']
+        self.df.loc[filas, 'Faltante?'] = stock < self.df.loc[filas, 'Punto de Reorden (PR)']
+        self.df.loc[filas, 'Valor Total'] = stock * self.df.loc[filas, 'Costo Unitario']
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    # --- Consultas ---
+
+    def categorias(self) -> List[str]:
+        if 'Categoría' not in self.df.columns:
+            return []
+        return sorted(self.df['Categoría'].dropna().astype(str).unique().tolist())
+
+    def _orden(self, columna: str, ascendente: bool) -> np.ndarray:
+        clave = (columna, ascendente)
+        if clave not in self._ordenes:
+            self._ordenes[clave] = self.df[columna].sort_values(ascending=ascendente, kind='stable', na_position='last').index.to_numpy()
+        return self._ordenes[clave]
+
+    def buscar(
+        self,
+        texto: str = '',
+        categoria: Optional[str] = None,
+        solo_faltantes: bool = False,
+        solo_actualizados: bool = False,
+        orden: Optional[str] = None,
+        ascendente: bool = True
+    ) -> np.ndarray:
+        """Posiciones de las filas que pasan los filtros, en el orden pedido."""
+        mascara = np.ones(len(self.df), dtype=bool)
+        if texto:
+            if self._texto is None:
+                self._texto = self.df['Producto'].astype(str).str.lower()
+            mascara &= self._texto.str.contains(texto.lower(), regex=False).to_numpy()
+        if categoria:
+            mascara &= (self.df['Categoría'].astype(str) == categoria).to_numpy()
+        if solo_faltantes:
+            mascara &= self.df['Faltante?'].to_numpy(dtype=bool)
+        if solo_actualizados:
+            mascara &= self.df['Producto'].isin(self.actualizados).to_numpy()
+
+        posiciones = self._orden(orden, ascendente) if orden else np.arange(len(self.df))
+        return posiciones[mascara[posiciones]]
+
+    def filas(self, productos: List[str]) -> pd.DataFrame:
+        """Filas actuales de `productos`, en ese orden (las que ya no existen se omiten)."""
+        posiciones = [self._posiciones[p] for p in productos if p in self._posiciones]
+        return self.df.iloc[posiciones].reset_index(drop=True)
+
+    def totales(self) -> Dict:
+        """Ítems bajo PR y valor total, cacheados hasta el próximo cambio."""
+        if self._totales is None:
+            self._totales = {
+                'faltantes': int(self.df['Faltante?'].sum()),
+                'valor_total': float(self.df['Valor Total'].sum()),
+            }
+        return self._totales
+
+    # --- Cambios ---
+
+    def _marcar_cambio(self, columnas=None):
+        self.version += 1
+        self._totales = None
+        if columnas is None:
+            self._ordenes.clear()
+            return
+        for clave in [c for c in self._ordenes if c[0] in columnas]:
+            del self._ordenes[clave]
+
+    def aplicar_cambios(
+        self,
+        productos_pagina: List[str],
+        cambios: Dict,
+        al_cambiar_stock: Optional[Callable[[str, float], None]] = None
+    ) -> Dict[str, int]:
+        """
+        Aplica el change-set de `st.data_editor` (`edited_rows`, `added_rows`,
+        `deleted_rows`, con filas relativas a la página) por producto. Los
+        valores iguales a los guardados no cuentan como cambio.
+        `al_cambiar_stock(producto, stock)` recibe cada 'Stock Actual' tecleado.
+        """
+        conteos = {'editadas': 0, 'agregadas': 0, 'eliminadas': 0}
+        tocadas, columnas_tocadas = [], set()
+
+        for fila, valores in (cambios.get('edited_rows') or {}).items():
+            fila = int(fila)
+            if fila >= len(productos_pagina) or productos_pagina[fila] not in self._posiciones:
+                continue
+            producto = productos_pagina[fila]
+            posicion = self._posiciones[producto]
+            cambio_fila = False
+            for columna, valor in valores.items():
+                if columna in COLUMNAS_DERIVADAS or columna not in self.df.columns:
+                    continue
+                if columna == 'Producto':
+                    if self._renombrar(producto, valor):
+                        # La página sigue apuntando a la fila con su nombre nuevo
+                        productos_pagina[fila] = producto = valor
+                        cambio_fila = True
+                    continue
+                if columna in COLUMNAS_NUMERICAS:
+                    valor = pd.to_numeric(valor, errors='coerce')
+                    valor = 0.0 if pd.isna(valor) else float(valor)
+                if self.df.at[posicion, columna] != valor:
+                    self.df.at[posicion, columna] = valor
+                    columnas_tocadas.add(columna)
+                    cambio_fila = True
+                    if columna == 'Stock Actual' and al_cambiar_stock is not None:
+                        al_cambiar_stock(producto, valor)
+            if cambio_fila:
+                tocadas.append(posicion)
+                conteos['editadas'] += 1
+
+        if tocadas:
+            self._recalcular_derivadas(tocadas)
+            self._marcar_cambio(columnas_tocadas | set(COLUMNAS_DERIVADAS) | {'Producto'})
+
+        eliminados = {
+            productos_pagina[int(fila)] for fila in (cambios.get('deleted_rows') or [])
+            if int(fila) < len(productos_pagina)
+        }
+        nuevas = []
+        for valores in cambios.get('added_rows') or []:
+            producto = valores.get('Producto')
+            if producto is None or pd.isna(producto) or str(producto).strip() == '' or producto in self._posiciones:
+                continue
+            nueva = {col: VALORES_DEFECTO.get(col, 0.0 if col in COLUMNAS_NUMERICAS else None) for col in self.df.columns}
+            nueva.update({c: v for c, v in valores.items() if c in self.df.columns and c not in COLUMNAS_DERIVADAS})
+            for col in COLUMNAS_NUMERICAS:
+                valor = pd.to_numeric(nueva.get(col), errors='coerce')
+                nueva[col] = 0.0 if pd.isna(valor) else float(valor)
+            nuevas.append(nueva)
+
+        eliminados &= set(self._posiciones)
+        if eliminados or nuevas:
+            df = self.df
+            if eliminados:
+                df = df[~df['Producto'].isin(eliminados)]
+            if nuevas:
+                df = pd.concat([df, pd.DataFrame(nuevas, columns=self.df.columns)], ignore_index=True)
+            self._reconstruir(df)
+            self.estructura += 1
+            self._marcar_cambio()
+            conteos['eliminadas'] = len(eliminados)
+            conteos['agregadas'] = len(nuevas)
+            if al_cambiar_stock is not None:
+                for nueva in nuevas:
+                    al_cambiar_stock(nueva['Producto'], nueva['Stock Actual'])
+        return conteos
+
+    def _renombrar(self, producto: str, nuevo: str) -> bool:
+        if nuevo is None or pd.isna(nuevo) or str(nuevo).strip() == '' or nuevo in self._posiciones:
+            return False
+        posicion = self._posiciones.pop(producto)
+        self.df.at[posicion, 'Producto'] = nuevo
+        self._posiciones[nuevo] = posicion
+        if producto in self.actualizados:
+            self.actualizados.discard(producto)
+            self.actualizados.add(nuevo)
+        self._texto = None
+        return True
+
+    # --- Resultados de la optimización ---
+
+    def requiere_sincronizar(self, df_resultados: pd.DataFrame) -> bool:
+        """Hay resultados de otra versión, o filas nuevas desde la última sincronización."""
+        return (
+            self.resultados_sincronizados != version_resultados(df_resultados)
+            or self.estructura_sincronizada != self.estructura
+        )
+
+    def sincronizar_resultados(self, df_resultados: pd.DataFrame) -> List[str]:
+        """
+        Aplica PR y cantidades de la optimización solo en las filas donde
+        cambian y devuelve esos productos. Con una versión nueva de resultados
+        `actualizados` se reinicia; si solo hubo altas, se amplía.
+        """
+        version = version_resultados(df_resultados)
+        columnas = list(COLUMNAS_OPTIMAS)
+        posiciones, valores = puntos_optimos(self.df['Producto'], df_resultados)
+        actuales = self.df[columnas].to_numpy(dtype=float)[posiciones]
+        nuevos = np.where(np.isnan(valores), actuales, valores)
+        cambiadas = (nuevos != actuales).any(axis=1)
+        filas = posiciones[cambiadas]
+
+        if len(filas):
+            for j, columna in enumerate(columnas):
+                self.df.loc[filas, columna] = nuevos[cambiadas, j]
+            self._recalcular_derivadas(filas)
+            self._marcar_cambio(set(columnas) | set(COLUMNAS_DERIVADAS))
+            self.sincronizaciones += 1
+
+        productos = self.df['Producto'].to_numpy()[filas].tolist()
+        if self.resultados_sincronizados != version:
+            self.actualizados = set(productos)
+        else:
+            self.actualizados.update(productos)
+        self.resultados_sincronizados = version
+        self.estructura_sincronizada = self.estructura
+        return productos
+
+    # --- Libro de movimientos ---
+
+    def sincronizar_stock(self, saldos: pd.Series, version: Hashable) -> List[str]:
+        """
+        'Stock Actual' pasa a ser el saldo del libro (Producto -> saldo) en las
+        filas donde difiere; los productos sin movimientos conservan su valor.
+        """
+        posiciones = pd.Index(self.df['Producto']).get_indexer(saldos.index)
+        encontrados = posiciones >= 0
+        posiciones = posiciones[encontrados]
+        nuevos = saldos.to_numpy(dtype=float)[encontrados]
+        cambiadas = ~np.isclose(self.df['Stock Actual'].to_numpy(dtype=float)[posiciones], nuevos)
+        filas = posiciones[cambiadas]
+        if len(filas):
+            self.df.loc[filas, 'Stock Actual'] = nuevos[cambiadas]
+            self._recalcular_derivadas(filas)
+            self._marcar_cambio({'Stock Actual'} | set(COLUMNAS_DERIVADAS))
+            self.sincronizaciones += 1
+        self.libro_sincronizado = version
+        return self.df['Producto'].to_numpy()[filas].tolist()
@@ -0,0 +1,328 @@
+# modules/libro_movimientos.py
+
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+# Tipos de movimiento y su signo sobre el stock (apertura y ajuste llevan el signo en la cantidad)
+TIPOS_MOVIMIENTO = ('apertura', 'entrada', 'venta', 'ajuste', 'backflush')
+SIGNOS = {'apertura': 1.0, 'entrada': 1.0, 'venta': -1.0, 'ajuste': 1.0, 'backflush': -1.0}
+# Movimientos cargados a mano (no se derivan de ventas, entradas ni recetas)
+TIPOS_MANUALES = ('apertura', 'ajuste')
+
+# Movimientos recientes que se consultan por barrido antes de consolidar el índice
+MAX_COLA = 4096
+
+# Clave del índice: producto en los 32 bits altos, día (desplazado a positivo) en los bajos
+_DESPLAZAMIENTO_DIA = 2**31
+
+
+def dias_desde_epoca(fechas) -> np.ndarray:
+    """Fechas (escalar o vector) a días enteros desde 1970-01-01."""
+    fechas = pd.to_datetime(pd.Series(np.atleast_1d(np.asarray(fechas))))
+    return fechas.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]').astype(np.int64)
+
+
+def _dia(fecha) -> int:
+    fecha = pd.Timestamp(fecha if fecha is not None else datetime.now().date())
+    return int(np.datetime64(fecha.date(), 'D').astype(np.int64))
+
+
+# ============================================
+# LIBRO DE MOVIMIENTOS (SOLO ANEXAR)
+# ============================================
+
+class LibroMovimientos:
+    """
+    Libro de movimientos de stock de solo anexar: entradas, ventas, ajustes,
+    aperturas y consumos por receta (backflush). El stock de un producto es la
+    suma de sus movimientos; no se teclea.
+
+    - `saldo` / `saldos`: saldo actual, mantenido al registrar (O(1)).
+    - `stock_al`: stock al cierre de un día, por búsqueda binaria en las sumas
+      prefijas del producto (O(log n)) más la cola de movimientos recientes.
+    - Cada `MAX_COLA` movimientos la cola se consolida en el índice ordenado
+      (una instantánea nueva de las sumas prefijas).
+    """
+
+    def __init__(self):
+        self._codigos: Dict[str, int] = {}
+        self._nombres: List[str] = []
+        self._saldos = np.zeros(0)
+        # Movimientos en orden de registro (la posición es la secuencia)
+        self._bloques: List[Dict[str, np.ndarray]] = []
+        self.n_movimientos = 0
+        # Índice consolidado: claves (producto, día) ordenadas y suma acumulada por producto
+        self._claves = np.zeros(0, dtype=np.int64)
+        self._acumulado = np.zeros(0)
+        self._consolidados = 0
+        self.instantaneas: List[Dict] = []
+        # Productos cuyo stock tecleado ya abrió el libro (no se vuelven a anclar)
+        self.anclados: set = set()
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self.n_movimientos
+
+    def __contains__(self, producto) -> bool:
+        return producto in self._codigos
+
+    @property
+    def productos(self) -> List[str]:
+        return list(self._nombres)
+
+    def _codificar(self, productos: np.ndarray) -> np.ndarray:
+        for producto in pd.unique(productos):
+            if producto not in self._codigos:
+                self._codigos[producto] = len(self._nombres)
+                self._nombres.append(producto)
+        if len(self._saldos) < len(self._nombres):
+            self._saldos = np.concatenate([self._saldos, np.zeros(len(self._nombres) - len(self._saldos))])
+        if len(productos) < 64:
+            return np.array([self._codigos[p] for p in productos], dtype=np.int64)
+        return pd.Index(self._nombres).get_indexer(productos).astype(np.int64)
+
+    # --- Registro ---
+
+    def registrar(self, productos: Sequence, fechas: Sequence, cantidades: Sequence, tipo: str, referencia: Optional[str] = None) -> int:
+        """
+        Anexa movimientos de un tipo. Las cantidades van en unidades positivas
+        salvo en `apertura` y `ajuste`, donde el signo indica la dirección.
+        Devuelve cuántos movimientos se registraron.
+        """
+        if tipo not in SIGNOS:
+            raise ValueError(f"Tipo de movimiento desconocido: {tipo}")
+        cantidades = pd.to_numeric(pd.Series(cantidades), errors='coerce').to_numpy(dtype=float)
+        validos = ~np.isnan(cantidades) & (cantidades != 0)
+        if not validos.any():
+            return 0
+        productos = np.asarray(productos, dtype=object)[validos]
+        dias = dias_desde_epoca(fechas)[validos]
+        cantidades = cantidades[validos] * SIGNOS[tipo]
+
+        codigos = self._codificar(productos)
+        self._bloques.append({
+            'codigo': codigos, 'dia': dias, 'cantidad': cantidades,
+            'tipo': np.full(len(codigos), TIPOS_MOVIMIENTO.index(tipo), dtype=np.int8),
+            'referencia': np.full(len(codigos), referencia, dtype=object),
+        })
+        np.add.at(self._saldos, codigos, cantidades)
+        self.n_movimientos += len(codigos)
+        self.version += 1
+        if self.n_movimientos - self._consolidados > MAX_COLA:
+            self.consolidar()
+        return len(codigos)
+
+    def conciliar(self, producto: str, stock_contado: float, fecha=None, tipo: str = 'ajuste') -> float:
+        """Registra la diferencia entre el stock contado y el saldo del libro; devuelve el ajuste."""
+        diferencia = float(stock_contado) - self.saldo(producto)
+        if abs(diferencia) > 1e-9:
+            self.registrar([producto], [fecha if fecha is not None else datetime.now().date()], [diferencia], tipo)
+        return diferencia
+
+    def anclar(self, stock: pd.Series, tipo: str = 'apertura') -> int:
+        """
+        Aperturas para que el saldo actual de cada producto sea `stock`
+        (Producto -> cantidad), fechadas en su primer movimiento (u hoy si no tiene).
+        """
+        stock = pd.to_numeric(stock, errors='coerce').dropna()
+        stock = stock[~stock.index.duplicated(keep='last')]
+        diferencias = stock.to_numpy(dtype=float) - self.saldos().reindex(stock.index).fillna(0).to_numpy()
+        primeros = self.primeros_dias().reindex(stock.index)
+        hoy = _dia(None)
+        dias = primeros.fillna(hoy).to_numpy(dtype=np.int64).astype('datetime64[D]')
+        self.anclados.update(stock.index)
+        return self.registrar(stock.index.to_numpy(dtype=object), dias, diferencias, tipo)
+
+    # --- Índice de sumas prefijas ---
+
+    def _columna(self, nombre: str, desde: int = 0) -> np.ndarray:
+        """Columna desde la secuencia `desde`; solo une los bloques que la cubren."""
+        n_bloques, inicio = 0, self.n_movimientos
+        for bloque in reversed(self._bloques):
+            n_bloques += 1
+            inicio -= len(bloque['codigo'])
+            if inicio <= desde:
+                break
+        if n_bloques > 1:
+            # Los bloques unidos quedan como uno: la próxima lectura no vuelve a concatenar
+            unidos = self._bloques[-n_bloques:]
+            self._bloques[-n_bloques:] = [{c: np.concatenate([b[c] for b in unidos]) for c in unidos[0]}]
+        return self._bloques[-1][nombre][desde - inicio:]
+
+    def consolidar(self):
+        """Incorpora la cola al índice ordenado por (producto, día) y toma una instantánea."""
+        if self._consolidados == self.n_movimientos:
+            return
+        inicio = time.perf_counter()
+        codigos = self._columna('codigo')
+        dias = self._columna('dia')
+        cantidades = self._columna('cantidad')
+        claves = codigos * 2**32 + (dias + _DESPLAZAMIENTO_DIA)
+        # Estable: los movimientos del mismo día quedan en orden de registro
+        orden = np.argsort(claves, kind='stable')
+        claves, cantidades, codigos = claves[orden], cantidades[orden], codigos[orden]
+
+        acumulado = np.cumsum(cantidades)
+        # Cada producto acumula desde cero: se resta lo acumulado antes de su primera fila
+        inicios = np.flatnonzero(np.r_[True, codigos[1:] != codigos[:-1]])
+        previo = np.r_[0.0, acumulado][inicios]
+        acumulado -= np.repeat(previo, np.diff(np.r_[inicios, len(codigos)]))
+
+        self._claves, self._acumulado = claves, acumulado
+        self._consolidados = self.n_movimientos
+        self.instantaneas.append({
+            'movimientos': self.n_movimientos,
+            'productos': len(self._nombres),
+            'segundos': round(time.perf_counter() - inicio, 4),
+        })
+
+    def _cola(self):
+        """Movimientos registrados después de la última consolidación."""
+        if self._consolidados == self.n_movimientos:
+            return None
+        return (
+            self._columna('codigo', self._consolidados),
+            self._columna('dia', self._consolidados),
+            self._columna('cantidad', self._consolidados),
+        )
+
+    def _acumulado_hasta(self, claves_consulta: np.ndarray, codigos: np.ndarray) -> np.ndarray:
+        posiciones = np.searchsorted(self._claves, claves_consulta, side='right') - 1
+        valores = np.zeros(len(claves_consulta))
+        validas = posiciones >= 0
+        # La fila encontrada debe ser del mismo producto (si no, no hay movimientos hasta ese día)
+        validas[validas] = (self._claves[posiciones[validas]] >> 32) == codigos[validas]
+        valores[validas] = self._acumulado[posiciones[validas]]
+        return valores
+
+    # --- Consultas ---
+
+    def saldo(self, producto: str) -> float:
+        codigo = self._codigos.get(producto)
+        return 0.0 if codigo is None else float(self._saldos[codigo])
+
+    def saldos(self) -> pd.Series:
+        """Saldo actual de todos los productos del libro."""
+        return pd.Series(self._saldos.copy(), index=pd.Index(self._nombres, name='producto'), name='stock')
+
+    def stock_al(self, producto: str, fecha) -> float:
+        """Stock del producto al cierre de `fecha`."""
+        codigo = self._codigos.get(producto)
+        if codigo is None:
+            return 0.0
+        dia = _dia(fecha)
+        valor = self._acumulado_hasta(np.array([codigo * 2**32 + dia + _DESPLAZAMIENTO_DIA]), np.array([codigo]))[0]
+        cola = self._cola()
+        if cola is not None:
+            valor += cola[2][(cola[0] == codigo) & (cola[1] <= dia)].sum()
+        return float(valor)
+
+    def historial(self, producto: str, fechas: pd.DatetimeIndex) -> np.ndarray:
+        """Stock al cierre de cada una de `fechas` (una búsqueda binaria por fecha)."""
+        codigo = self._codigos.get(producto)
+        if codigo is None:
+            return np.zeros(len(fechas))
+        self.consolidar()
+        dias = dias_desde_epoca(fechas)
+        codigos = np.full(len(dias), codigo, dtype=np.int64)
+        return self._acumulado_hasta(codigos * 2**32 + dias + _DESPLAZAMIENTO_DIA, codigos)
+
+    def saldos_al(self, fecha) -> pd.Series:
+        """Stock de todos los productos al cierre de `fecha`."""
+        self.consolidar()
+        codigos = np.arange(len(self._nombres), dtype=np.int64)
+        valores = self._acumulado_hasta(codigos * 2**32 + _dia(fecha) + _DESPLAZAMIENTO_DIA, codigos)
+        return pd.Series(valores, index=pd.Index(self._nombres, name='producto'), name='stock')
+
+    def primeros_dias(self) -> pd.Series:
+        """Primer día (días desde 1970) con movimientos de cada producto."""
+        if not self.n_movimientos:
+            return pd.Series(dtype='int64')
+        primeros = np.full(len(self._nombres), np.iinfo(np.int64).max)
+        np.minimum.at(primeros, self._columna('codigo'), self._columna('dia'))
+        return pd.Series(primeros, index=pd.Index(self._nombres, name='producto'))
+
+    def movimientos(self, producto: Optional[str] = None, tipos: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Movimientos en orden de registro (opcionalmente de un producto y/o de ciertos tipos)."""
+        columnas = ['secuencia', 'fecha', 'producto', 'tipo', 'cantidad', 'referencia']
+        if not self.n_movimientos:
+            return pd.DataFrame(columns=columnas)
+        codigos = self._columna('codigo')
+        tipos_codigo = self._columna('tipo')
+        mascara = np.ones(len(codigos), dtype=bool)
+        if producto is not None:
+            mascara &= codigos == self._codigos.get(producto, -1)
+        if tipos is not None:
+            mascara &= np.isin(tipos_codigo, [TIPOS_MOVIMIENTO.index(t) for t in tipos])
+        posiciones = np.flatnonzero(mascara)
+        return pd.DataFrame({
+            'secuencia': posiciones + 1,
+            'fecha': pd.to_datetime(self._columna('dia')[posiciones].astype('datetime64[D]')),
+            'producto': np.asarray(self._nombres, dtype=object)[codigos[posiciones]] if len(self._nombres) else [],
+            'tipo': np.asarray(TIPOS_MOVIMIENTO, dtype=object)[tipos_codigo[posiciones]],
+            'cantidad': self._columna('cantidad')[posiciones],
+            'referencia': self._columna('referencia')[posiciones],
+        }, columns=columnas)
+
+
+# ============================================
+# CONSTRUCCIÓN DESDE LOS DATOS DEL TENANT
+# ============================================
+
+def movimientos_backflush(df_ventas: pd.DataFrame, df_ingredientes: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """Consumo de ingredientes por las ventas de productos con receta (fecha, producto, cantidad)."""
+    columnas = ['fecha', 'producto', 'cantidad']
+    if df_ventas is None or df_ventas.empty or df_ingredientes is None or df_ingredientes.empty:
+        return pd.DataFrame(columns=columnas)
+    receta = df_ingredientes[['Producto Final', 'Ingrediente', 'Cantidad Requerida']].copy()
+    receta['Cantidad Requerida'] = pd.to_numeric(receta['Cantidad Requerida'], errors='coerce').fillna(0)
+    consumo = df_ventas[['fecha', 'producto', 'cantidad_vendida']].merge(
+        receta, left_on='producto', right_on='Producto Final', how='inner'
+    )
+    if consumo.empty:
+        return pd.DataFrame(columns=columnas)
+    return pd.DataFrame({
+        'fecha': consumo['fecha'],
+        'producto': consumo['Ingrediente'],
+        'cantidad': pd.to_numeric(consumo['cantidad_vendida'], errors='coerce').fillna(0) * consumo['Cantidad Requerida'],
+    })
+
+
+def construir_libro(
+    df_ventas: Optional[pd.DataFrame],
+    df_entradas: Optional[pd.DataFrame],
+    df_ingredientes: Optional[pd.DataFrame] = None,
+    manuales: Optional[pd.DataFrame] = None,
+    stock_inicial: Optional[float] = None
+) -> LibroMovimientos:
+    """
+    Libro del tenant a partir de sus ventas, entradas de stock y recetas.
+    `manuales` (aperturas y ajustes de un libro anterior) se vuelven a anexar;
+    con `stock_inicial`, cada producto sin apertura abre con esa cantidad en
+    su primer movimiento.
+    """
+    libro = LibroMovimientos()
+    if manuales is not None and not manuales.empty:
+        for tipo, grupo in manuales.groupby('tipo', sort=False):
+            libro.registrar(grupo['producto'].to_numpy(dtype=object), grupo['fecha'], grupo['cantidad'], tipo, referencia='manual')
+    if df_entradas is not None and not df_entradas.empty:
+        libro.registrar(df_entradas['producto'].to_numpy(dtype=object), df_entradas['fecha'], df_entradas['cantidad_recibida'], 'entrada')
+    if df_ventas is not None and not df_ventas.empty:
+        libro.registrar(df_ventas['producto'].to_numpy(dtype=object), df_ventas['fecha'], df_ventas['cantidad_vendida'], 'venta')
+    consumo = movimientos_backflush(df_ventas, df_ingredientes)
+    if not consumo.empty:
+        libro.registrar(consumo['producto'].to_numpy(dtype=object), consumo['fecha'], consumo['cantidad'], 'backflush')
+
+    if stock_inicial:
+        con_apertura = set(manuales.loc[manuales['tipo'] == 'apertura', 'producto']) if manuales is not None and not manuales.empty else set()
+        primeros = libro.primeros_dias()
+        primeros = primeros[~primeros.index.isin(con_apertura)]
+        libro.registrar(
+            primeros.index.to_numpy(dtype=object), primeros.to_numpy(dtype=np.int64).astype('datetime64[D]'),
+            np.full(len(primeros), float(stock_inicial)), 'apertura'
+        )
+    libro.consolidar()
+    return libro
@@ -0,0 +1,257 @@
+# modules/matriz_compartida.py
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# Sin imports de módulos de la app: lo cargan los workers de procesos y el batch
+DIRECTORIO_DATOS = os.getenv("STOCK_ZERO_DATA_DIR", ".stock_zero")
+DIRECTORIO_MATRICES = os.path.join(DIRECTORIO_DATOS, "matrices")
+
+ARCHIVO_VENTAS = "ventas.npy"
+ARCHIVO_RANGOS = "rangos.npy"
+ARCHIVO_PRODUCTOS = "productos.json"
+ARCHIVO_ACTUAL = "actual.json"
+DIRECTORIO_ARRIENDOS = "arriendos"
+
+# Versiones sin arriendo que se conservan por tenant (los lectores de una versión anterior siguen mapeados)
+MAX_VERSIONES = 2
+# Un arriendo más viejo que esto se considera de un proceso caído y deja de proteger la versión
+TTL_ARRIENDO_S = float(os.getenv("STOCK_ZERO_ARRIENDO_MATRIZ_H", "24")) * 3600
+
+# ============================================
+# MATRIZ DE DEMANDA DIARIA (PRODUCTOS x DÍAS)
+# ============================================
+
+class MatrizDemanda:
+    """
+    Ventas diarias del tenant (productos x días, 0 los días sin venta) con su
+    diccionario de productos y el rango [primer, último] día con registros de
+    cada uno. Publicada, `ventas` es un mapa de memoria de solo lectura: los
+    procesos que la adjuntan comparten las mismas páginas sin copiar ni
+    serializar el dataset.
+    """
+
+    def __init__(self, productos: pd.Index, inicio: pd.Timestamp, ventas: np.ndarray, rangos: np.ndarray, version: Optional[str] = None):
+        self.productos = productos
+        self.inicio = inicio
+        self.ventas = ventas
+        self.rangos = rangos
+        self.version = version
+        # Archivo de arriendo si la publicó un trabajo que la necesita hasta terminar
+        self.arriendo: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.productos)
+
+    @property
+    def dias(self) -> pd.DatetimeIndex:
+        return pd.date_range(self.inicio, periods=self.ventas.shape[1], freq='D', name='fecha')
+
+    def posicion(self, producto) -> int:
+        return self.productos.get_loc(producto)
+
+    def serie(self, producto) -> pd.Series:
+        """Ventas diarias del producto entre su primer y último registro (vista, sin copia)."""
+        i = self.posicion(producto)
+        primer, ultimo = self.rangos[i]
+        fechas = pd.date_range(self.inicio + pd.Timedelta(days=int(primer)), periods=int(ultimo - primer) + 1, freq='D', name='fecha')
+        return pd.Series(self.ventas[i, primer:ultimo + 1], index=fechas, name='cantidad_vendida', copy=False)
+
+
+def construir_matriz(df_ventas: pd.DataFrame, columna_valor: str = 'cantidad_vendida') -> MatrizDemanda:
+    """Matriz en memoria (sin publicar); productos en orden de primera aparición."""
+    fechas = pd.to_datetime(df_ventas['fecha']).dt.normalize()
+    codigos, productos = pd.factorize(df_ventas['producto'], sort=False)
+    inicio = fechas.min()
+    dia = (fechas - inicio).dt.days.to_numpy()
+    n_productos, n_dias = len(productos), int(dia.max()) + 1
+
+    cantidades = pd.to_numeric(df_ventas[columna_valor], errors='coerce').fillna(0).to_numpy(dtype=float)
+    ventas = np.bincount(codigos * n_dias + dia, weights=cantidades, minlength=n_productos * n_dias).reshape(n_productos, n_dias)
+
+    rangos = np.empty((n_productos, 2), dtype=np.int64)
+    rangos[:, 0] = n_dias
+    rangos[:, 1] = -1
+    np.minimum.at(rangos[:, 0], codigos, dia)
+    np.maximum.at(rangos[:, 1], codigos, dia)
+    return MatrizDemanda(pd.Index(productos, name='producto'), inicio, ventas, rangos)
+
+
+def _firma(matriz: MatrizDemanda) -> str:
+    """Versión por contenido: los mismos datos publican (y reutilizan) la misma versión."""
+    h = hashlib.blake2b(digest_size=8)
+    h.update(json.dumps([str(p) for p in matriz.productos], ensure_ascii=False).encode('utf-8'))
+    h.update(str(matriz.inicio).encode())
+    h.update(np.ascontiguousarray(matriz.ventas).data)
+    h.update(matriz.rangos.data)
+    return h.hexdigest()
+
+
+# ============================================
+# PUBLICACIÓN Y ADJUNTO ENTRE PROCESOS
+# ============================================
+
+def _carpeta_tenant(tenant: str, directorio: str) -> str:
+    return os.path.join(directorio, str(tenant))
+
+
+def publicar_matriz(
+    tenant: str,
+    df_ventas: pd.DataFrame,
+    columna_valor: str = 'cantidad_vendida',
+    directorio: str = DIRECTORIO_MATRICES,
+    arrendar: bool = False
+) -> MatrizDemanda:
+    """
+    Publica la matriz del tenant en `directorio/<tenant>/<version>/` y la
+    devuelve adjuntada (mapa de memoria). La carpeta de la versión se escribe
+    aparte y se renombra al final; `actual.json` apunta a la última publicada.
+
+    Con `arrendar`, la versión queda protegida de la poda (aunque se publiquen
+    otras) hasta `liberar_matriz`: los workers la adjuntan cuando les toca un
+    producto, quizás mucho después de publicarla.
+    """
+    matriz = construir_matriz(df_ventas, columna_valor)
+    version = _firma(matriz)
+    carpeta_tenant = _carpeta_tenant(tenant, directorio)
+    carpeta = os.path.join(carpeta_tenant, version)
+
+    if not os.path.isdir(carpeta):
+        temporal = f"{carpeta}.tmp{os.getpid()}"
+        os.makedirs(temporal, exist_ok=True)
+        np.save(os.path.join(temporal, ARCHIVO_VENTAS), matriz.ventas)
+        np.save(os.path.join(temporal, ARCHIVO_RANGOS), matriz.rangos)
+        with open(os.path.join(temporal, ARCHIVO_PRODUCTOS), 'w', encoding='utf-8') as f:
+            json.dump({'productos': [str(p) for p in matriz.productos], 'inicio': matriz.inicio.isoformat()}, f, ensure_ascii=False)
+        try:
+            os.replace(temporal, carpeta)
+        except OSError:
+            # Otro proceso publicó la misma versión antes
+            shutil.rmtree(temporal, ignore_errors=True)
+
+    actual = os.path.join(carpeta_tenant, ARCHIVO_ACTUAL)
+    with open(actual + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'version': version, 'publicado': time.time()}, f)
+    os.replace(actual + '.tmp', actual)
+    # El arriendo se toma antes de podar: otra publicación no puede borrar esta versión en medio
+    arriendo = _arrendar(carpeta) if arrendar else None
+    _podar_versiones(carpeta_tenant, version)
+    matriz = adjuntar_matriz(tenant, version, directorio)
+    if arriendo is not None:
+        if matriz is None:
+            _borrar_arriendo(arriendo)
+        else:
+            matriz.arriendo = arriendo
+    return matriz
+
+
+def _arrendar(carpeta: str) -> str:
+    arriendos = os.path.join(carpeta, DIRECTORIO_ARRIENDOS)
+    os.makedirs(arriendos, exist_ok=True)
+    ruta = os.path.join(arriendos, f"{os.getpid()}-{uuid.uuid4().hex[:12]}")
+    with open(ruta, 'w', encoding='utf-8'):
+        pass
+    return ruta
+
+
+def _borrar_arriendo(ruta: str):
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
+
+
+def liberar_matriz(matriz: Optional[MatrizDemanda]):
+    """Suelta el arriendo de una matriz publicada con `arrendar=True`; la versión vuelve a poder podarse."""
+    arriendo = getattr(matriz, 'arriendo', None)
+    if arriendo is not None:
+        _borrar_arriendo(arriendo)
+        matriz.arriendo = None
+
+
+def _arrendada(carpeta: str, ahora: float) -> bool:
+    """Si algún trabajo en curso tiene arrendada la versión (arriendos vencidos no cuentan)."""
+    arriendos = os.path.join(carpeta, DIRECTORIO_ARRIENDOS)
+    try:
+        nombres = os.listdir(arriendos)
+    except OSError:
+        return False
+    for nombre in nombres:
+        try:
+            if ahora - os.path.getmtime(os.path.join(arriendos, nombre)) < TTL_ARRIENDO_S:
+                return True
+        except OSError:
+            continue
+    return False
+
+
+def _podar_versiones(carpeta_tenant: str, vigente: str):
+    """
+    Conserva la versión vigente, las arrendadas por trabajos en curso y, de las
+    demás, las `MAX_VERSIONES - 1` más recientes.
+    """
+    ahora = time.time()
+    versiones = [
+        os.path.join(carpeta_tenant, nombre) for nombre in os.listdir(carpeta_tenant)
+        if nombre != vigente and '.tmp' not in nombre and os.path.isdir(os.path.join(carpeta_tenant, nombre))
+    ]
+    versiones = [carpeta for carpeta in versiones if not _arrendada(carpeta, ahora)]
+    versiones.sort(key=os.path.getmtime, reverse=True)
+    for carpeta in versiones[MAX_VERSIONES - 1:]:
+        # En POSIX los procesos que aún la tienen mapeada siguen leyendo sin problema
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+
+def version_actual(tenant: str, directorio: str = DIRECTORIO_MATRICES) -> Optional[str]:
+    """Última versión publicada del tenant, o None."""
+    try:
+        with open(os.path.join(_carpeta_tenant(tenant, directorio), ARCHIVO_ACTUAL), encoding='utf-8') as f:
+            return json.load(f)['version']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+# Matrices ya adjuntadas en este proceso: (directorio, tenant, versión) -> matriz
+_ADJUNTAS: Dict[Tuple[str, str, str], MatrizDemanda] = {}
+_LOCK_ADJUNTAS = threading.Lock()
+
+
+def adjuntar_matriz(tenant: str, version: Optional[str] = None, directorio: Optional[str] = None) -> Optional[MatrizDemanda]:
+    """
+    Matriz publicada del tenant (la versión actual si no se indica), mapeada en
+    memoria y de solo lectura. Cada proceso la abre una vez por versión.
+    """
+    directorio = directorio or DIRECTORIO_MATRICES
+    version = version or version_actual(tenant, directorio)
+    if version is None:
+        return None
+
+    clave = (directorio, str(tenant), version)
+    with _LOCK_ADJUNTAS:
+        matriz = _ADJUNTAS.get(clave)
+        if matriz is not None:
+            return matriz
+        carpeta = os.path.join(_carpeta_tenant(tenant, directorio), version)
+        try:
+            with open(os.path.join(carpeta, ARCHIVO_PRODUCTOS), encoding='utf-8') as f:
+                diccionario = json.load(f)
+            ventas = np.load(os.path.join(carpeta, ARCHIVO_VENTAS), mmap_mode='r')
+            rangos = np.load(os.path.join(carpeta, ARCHIVO_RANGOS))
+        except (OSError, ValueError):
+            return None
+        matriz = MatrizDemanda(
+            pd.Index(diccionario['productos'], name='producto'), pd.Timestamp(diccionario['inicio']), ventas, rangos, version
+        )
+        # Las versiones viejas del mismo tenant se sueltan: el mapa se cierra al no quedar referencias
+        for otra in [c for c in _ADJUNTAS if c[:2] == clave[:2]]:
+            del _ADJUNTAS[otra]
+        _ADJUNTAS[clave] = matriz
+        return matriz
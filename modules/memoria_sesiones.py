@@ -0,0 +1,328 @@
+# modules/memoria_sesiones.py
+
+import hashlib
+import os
+import pickle
+import shutil
+import threading
+import time
+from typing import Callable, Dict, Optional, Set, Tuple
+import numpy as np
+import pandas as pd
+from modules.metricas import contador
+
+DIRECTORIO_DATOS = os.getenv("STOCK_ZERO_DATA_DIR", ".stock_zero")
+DIRECTORIO_DESBORDE = os.path.join(DIRECTORIO_DATOS, "desborde_sesiones")
+
+# Memoria total de frames de sesión antes de empezar a bajar sesiones inactivas a disco
+PRESUPUESTO_MB = float(os.getenv("STOCK_ZERO_MEMORIA_SESIONES_MB", "2048"))
+# Una sesión sin reruns durante este tiempo puede bajarse a disco
+INACTIVIDAD_S = float(os.getenv("STOCK_ZERO_SESION_INACTIVA_S", "300"))
+# Niveles de anidamiento que se recorren buscando frames dentro de los valores de la sesión
+PROFUNDIDAD_MAX = 4
+
+DESBORDES_TOTAL = contador(
+    'stockzero_session_spill_total', 'Frames de sesión bajados a disco o recargados', ('operacion',)
+)
+
+# ============================================
+# FRAMES EN DISCO
+# ============================================
+
+def _comprimir(datos: bytes) -> Tuple[bytes, str]:
+    try:
+        import pyarrow as pa
+
+        return pa.compress(datos, codec='zstd', asbytes=True), 'zstd'
+    except ImportError:
+        import zlib
+
+        return zlib.compress(datos, 1), 'zlib'
+
+
+def _descomprimir(datos: bytes, codec: str, tamano: int) -> bytes:
+    if codec == 'zstd':
+        import pyarrow as pa
+
+        return pa.decompress(datos, decompressed_size=tamano, codec='zstd', asbytes=True)
+    import zlib
+
+    return zlib.decompress(datos)
+
+
+class FrameEnDisco:
+    """
+    Marcador que ocupa el lugar de un valor bajado a disco en `st.session_state`.
+    Todos los valores de una sesión van al mismo archivo (`clave` los distingue)
+    para que las referencias compartidas entre ellos sobrevivan a la recarga.
+    """
+
+    def __init__(self, ruta: str, codec: str, tamano: int, bytes_memoria: int, filas: int, clave: str = None):
+        self.ruta = ruta
+        self.codec = codec
+        self.tamano = tamano
+        self.bytes_memoria = bytes_memoria
+        self.filas = filas
+        self.clave = clave
+
+    def cargar(self):
+        with open(self.ruta, 'rb') as f:
+            return pickle.loads(_descomprimir(f.read(), self.codec, self.tamano))
+
+    def __repr__(self) -> str:
+        return f"FrameEnDisco({self.filas} filas, {self.bytes_memoria / 2**20:.1f} MB)"
+
+
+def huella(valor) -> int:
+    """Bytes en memoria de un DataFrame, Series o array (incluye el contenido de columnas de texto)."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(index=True, deep=True))
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    return 0
+
+
+def _es_propio(valor) -> bool:
+    """Objetos de la app (almacén de inventario, libro de movimientos, recetas...)."""
+    return type(valor).__module__.startswith('modules.') and hasattr(valor, '__dict__')
+
+
+def bloques_de_datos(valor, compartidos: Set[int], medidos: Dict[int, int], bloques: Dict[int, int], profundidad: int = 0):
+    """
+    Frames y arrays alcanzables desde `valor` ({id: bytes} en `bloques`):
+    recorre dicts, listas y los atributos de los objetos de la app, de modo
+    que el frame que guarda un almacén se cuenta una sola vez aunque la
+    sesión también lo tenga bajo otra clave. `medidos` evita volver a medir
+    frames ya vistos.
+    """
+    if profundidad > PROFUNDIDAD_MAX or id(valor) in bloques or id(valor) in compartidos:
+        return
+    if isinstance(valor, (pd.DataFrame, pd.Series, np.ndarray)):
+        bytes_valor = medidos.get(id(valor))
+        bloques[id(valor)] = huella(valor) if bytes_valor is None else bytes_valor
+    elif isinstance(valor, dict):
+        for item in list(valor.values()):
+            bloques_de_datos(item, compartidos, medidos, bloques, profundidad + 1)
+    elif isinstance(valor, (list, tuple)):
+        for item in list(valor):
+            bloques_de_datos(item, compartidos, medidos, bloques, profundidad + 1)
+    elif _es_propio(valor):
+        for item in list(vars(valor).values()):
+            bloques_de_datos(item, compartidos, medidos, bloques, profundidad + 1)
+
+
+# ============================================
+# GESTOR DE MEMORIA DE SESIONES
+# ============================================
+
+class GestorMemoriaSesiones:
+    """
+    Registro de proceso con la huella de los datos que cada sesión guarda en
+    su `st.session_state`: frames, arrays y los objetos de la app que los
+    contienen (almacén de inventario, libro de movimientos, recetas,
+    evaluaciones). Cada frame se cuenta una vez aunque lo alcancen varias
+    claves. Si el total supera el presupuesto, los valores de las sesiones
+    inactivas más antiguas se guardan juntos, comprimidos, en disco y se
+    reemplazan por un `FrameEnDisco`; al siguiente rerun de esa sesión (o
+    del fragmento que la mantiene activa), `acceder` los devuelve a memoria
+    con sus referencias compartidas intactas antes de que la página los lea.
+
+    Los frames compartidos entre sesiones (cache de datasets del tenant) no se
+    cuentan ni se bajan: liberarlos en una sesión no libera memoria. Las
+    sesiones que `activa` da por cerradas se olvidan en la siguiente pasada.
+    """
+
+    def __init__(
+        self,
+        presupuesto_bytes: float = PRESUPUESTO_MB * 2**20,
+        inactividad_s: float = INACTIVIDAD_S,
+        directorio: str = DIRECTORIO_DESBORDE,
+        compartidos: Optional[Callable[[], Set[int]]] = None,
+        activa: Optional[Callable[[str], bool]] = None
+    ):
+        self.presupuesto_bytes = presupuesto_bytes
+        self.inactividad_s = inactividad_s
+        # Carpeta propia del proceso; lo que quedó de una ejecución anterior ya no tiene sesión
+        self.directorio = os.path.join(directorio, str(os.getpid()))
+        shutil.rmtree(self.directorio, ignore_errors=True)
+        self._compartidos = compartidos or set
+        self._activa = activa or (lambda sesion_id: True)
+        self._sesiones: Dict[str, Dict] = {}
+        self._lock = threading.RLock()
+
+    # --- Medición ---
+
+    def _medir(self, sesion: Dict, estado, compartidos: Set[int]):
+        """
+        Actualiza los bloques de datos de la sesión y, por clave, los bytes de
+        los bloques que ninguna clave anterior alcanzó. Toda clave que alcance
+        algún bloque se baja a disco junto con las demás. Solo se miden los
+        frames nuevos.
+        """
+        medidos = sesion['bloques']
+        bloques, claves, en_disco = {}, {}, {}
+        for clave, valor in estado.filtered_state.items():
+            if isinstance(valor, FrameEnDisco):
+                en_disco[clave] = valor.bytes_memoria
+                continue
+            alcanzados = {}
+            bloques_de_datos(valor, compartidos, medidos, alcanzados)
+            if alcanzados:
+                claves[clave] = sum(b for i, b in alcanzados.items() if i not in bloques)
+                bloques.update(alcanzados)
+        sesion['bloques'] = bloques
+        sesion['claves'] = claves
+        sesion['en_disco'] = en_disco
+
+    def _total_en_memoria(self) -> int:
+        vistos, total = set(), 0
+        for sesion in self._sesiones.values():
+            for id_bloque, bytes_bloque in sesion['bloques'].items():
+                if id_bloque not in vistos:
+                    vistos.add(id_bloque)
+                    total += bytes_bloque
+        return total
+
+    # --- API pública ---
+
+    def acceder(self, sesion_id: str, estado, usuario: Optional[str] = None):
+        """
+        Llamar al inicio de cada rerun, y de cada rerun de fragmento, con el
+        estado de la sesión (el objeto de la sesión, no el proxy global
+        `st.session_state`): recarga lo que estaba en disco, mide la sesión y,
+        si hace falta, baja a disco sesiones inactivas.
+        """
+        with self._lock:
+            sesion = self._sesiones.get(sesion_id)
+            if sesion is None or sesion['estado'] is not estado:
+                sesion = self._sesiones[sesion_id] = {'estado': estado, 'bloques': {}, 'claves': {}, 'en_disco': {}}
+            sesion['usuario'] = usuario or sesion.get('usuario')
+            sesion['ultimo_acceso'] = time.monotonic()
+
+            self._recargar(estado)
+            compartidos = self._compartidos()
+            self._medir(sesion, estado, compartidos)
+            self._gobernar(sesion_id, compartidos)
+
+    def _recargar(self, estado):
+        """Un solo `pickle.loads` por archivo: los valores recargados se siguen compartiendo."""
+        por_archivo: Dict[str, Dict[str, FrameEnDisco]] = {}
+        for clave, valor in estado.filtered_state.items():
+            if isinstance(valor, FrameEnDisco):
+                por_archivo.setdefault(valor.ruta, {})[clave] = valor
+        for ruta, marcadores in por_archivo.items():
+            datos = next(iter(marcadores.values())).cargar()
+            for clave, marcador in marcadores.items():
+                estado[clave] = datos[marcador.clave] if marcador.clave is not None else datos
+                DESBORDES_TOTAL.inc(operacion='recarga')
+            _borrar_archivo(ruta)
+
+    def _gobernar(self, sesion_actual: str, compartidos: Set[int]):
+        # Pestañas cerradas: se suelta su estado y se borra lo que tuvieran en disco
+        for sesion_id in [s for s in self._sesiones if s != sesion_actual and not self._activa(s)]:
+            self.liberar(sesion_id)
+        total = self._total_en_memoria()
+        if total <= self.presupuesto_bytes:
+            return
+        ahora = time.monotonic()
+        candidatas = sorted(
+            (s for s in self._sesiones.items() if s[0] != sesion_actual and s[1]['claves']
+             and ahora - s[1]['ultimo_acceso'] >= self.inactividad_s),
+            key=lambda s: s[1]['ultimo_acceso']
+        )
+        for sesion_id, sesion in candidatas:
+            if total <= self.presupuesto_bytes:
+                break
+            total -= self._desbordar(sesion_id, sesion, compartidos)
+
+    def _desbordar(self, sesion_id: str, sesion: Dict, compartidos: Set[int]) -> int:
+        """
+        Baja a disco, en un solo archivo, los valores con datos de una sesión
+        inactiva; devuelve los bytes liberados.
+        """
+        estado = sesion['estado']
+        valores = {}
+        for clave in sesion['claves']:
+            try:
+                valores[clave] = estado[clave]
+            except KeyError:
+                continue
+        crudo = _serializar(valores)
+        if not valores:
+            return 0
+        comprimido, codec = _comprimir(crudo)
+        carpeta = os.path.join(self.directorio, sesion_id)
+        os.makedirs(carpeta, exist_ok=True)
+        ruta = os.path.join(carpeta, hashlib.sha1(str(time.monotonic_ns()).encode()).hexdigest()[:16] + '.pkl')
+        with open(ruta + '.tmp', 'wb') as f:
+            f.write(comprimido)
+        os.replace(ruta + '.tmp', ruta)
+
+        antes = sum(sesion['bloques'].values())
+        reemplazados = 0
+        for clave, valor in valores.items():
+            try:
+                estado[clave] = FrameEnDisco(ruta, codec, len(crudo), sesion['claves'][clave], _filas(valor), clave)
+            except Exception:
+                # Claves de widgets: Streamlit no permite reemplazarlas desde fuera
+                continue
+            reemplazados += 1
+            DESBORDES_TOTAL.inc(operacion='desborde')
+        if reemplazados == 0:
+            _borrar_archivo(ruta)
+        # Lo que siga alcanzable desde claves que quedaron en memoria sigue contando
+        self._medir(sesion, estado, compartidos)
+        return antes - sum(sesion['bloques'].values())
+
+    def liberar(self, sesion_id: str):
+        """Olvida la sesión y borra sus frames en disco (logout o sesión cerrada)."""
+        with self._lock:
+            self._sesiones.pop(sesion_id, None)
+            shutil.rmtree(os.path.join(self.directorio, sesion_id), ignore_errors=True)
+
+    def resumen(self) -> pd.DataFrame:
+        """Memoria por sesión: MB en memoria y en disco, valores con datos e inactividad."""
+        ahora = time.monotonic()
+        filas = []
+        with self._lock:
+            for sesion_id, sesion in self._sesiones.items():
+                filas.append({
+                    'sesion': sesion_id[:8],
+                    'usuario': sesion.get('usuario'),
+                    'memoria_mb': round(sum(sesion['claves'].values()) / 2**20, 2),
+                    'disco_mb': round(sum(sesion['en_disco'].values()) / 2**20, 2),
+                    'frames': len(sesion['claves']),
+                    'frames_en_disco': len(sesion['en_disco']),
+                    'inactiva_s': round(ahora - sesion['ultimo_acceso'], 1),
+                })
+        columnas = ['sesion', 'usuario', 'memoria_mb', 'disco_mb', 'frames', 'frames_en_disco', 'inactiva_s']
+        return pd.DataFrame(filas, columns=columnas).sort_values('memoria_mb', ascending=False, ignore_index=True)
+
+
+def _serializar(valores: Dict) -> bytes:
+    """Pickle conjunto de los valores; los que no se pueden serializar se quitan y quedan en memoria."""
+    try:
+        return pickle.dumps(valores, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        for clave in list(valores):
+            try:
+                pickle.dumps(valores[clave], protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                del valores[clave]
+        return pickle.dumps(valores, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _filas(valor) -> int:
+    try:
+        return len(valor)
+    except TypeError:
+        return 0
+
+
+def _borrar_archivo(ruta: str):
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
@@ -0,0 +1,306 @@
+# modules/metricas.py
+
+import bisect
+import functools
+import logging
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
+
+# Límite de series por métrica: etiquetas de alta cardinalidad (p. ej. producto)
+# se agrupan en "_otros" al superarlo
+MAX_SERIES_POR_METRICA = 5000
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BUCKETS_FILAS_POR_SEGUNDO = (10, 100, 1000, 10000, 100000, 1000000)
+
+# Exportación: archivo de texto Prometheus (para node_exporter textfile) y/o endpoint HTTP
+ARCHIVO_METRICAS = os.getenv("STOCK_ZERO_METRICS_FILE")
+PUERTO_METRICAS = os.getenv("STOCK_ZERO_METRICS_PORT")
+# Interfaz del servidor /metrics (sin autenticación y con nombres de productos: solo local por defecto)
+HOST_METRICAS = os.getenv("STOCK_ZERO_METRICS_HOST", "127.0.0.1")
+INTERVALO_ARCHIVO_S = 15
+
+_log = logging.getLogger(__name__)
+
+# ============================================
+# TIPOS DE MÉTRICA
+# ============================================
+
+class _Metrica:
+    tipo = ''
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._series: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _clave(self, valores: Dict) -> Tuple:
+        clave = tuple(str(valores.get(e, '')) for e in self.etiquetas)
+        if clave not in self._series and len(self._series) >= MAX_SERIES_POR_METRICA:
+            clave = tuple('_otros' for _ in self.etiquetas)
+        return clave
+
+    def _etiquetas_texto(self, clave: Tuple, extra: str = '') -> str:
+        partes = [f'{e}="{_escapar(v)}"' for e, v in zip(self.etiquetas, clave)]
+        if extra:
+            partes.append(extra)
+        return '{' + ','.join(partes) + '}' if partes else ''
+
+
+class Contador(_Metrica):
+    """Valor acumulado que solo crece."""
+    tipo = 'counter'
+
+    def inc(self, valor: float = 1.0, **etiquetas):
+        with self._lock:
+            clave = self._clave(etiquetas)
+            self._series[clave] = self._series.get(clave, 0.0) + valor
+
+    def exponer(self) -> List[str]:
+        return [f"{self.nombre}{self._etiquetas_texto(c)} {_numero(v)}" for c, v in list(self._series.items())]
+
+
+class Medidor(_Metrica):
+    """Valor instantáneo que puede subir o bajar."""
+    tipo = 'gauge'
+
+    def set(self, valor: float, **etiquetas):
+        with self._lock:
+            self._series[self._clave(etiquetas)] = float(valor)
+
+    def exponer(self) -> List[str]:
+        return [f"{self.nombre}{self._etiquetas_texto(c)} {_numero(v)}" for c, v in list(self._series.items())]
+
+
+class Histograma(_Metrica):
+    """Distribución de observaciones en buckets acumulativos."""
+    tipo = 'histogram'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = (), buckets=BUCKETS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, valor: float, **etiquetas):
+        with self._lock:
+            clave = self._clave(etiquetas)
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = {'conteos': [0] * (len(self.buckets) + 1), 'suma': 0.0, 'n': 0}
+            serie['conteos'][bisect.bisect_left(self.buckets, valor)] += 1
+            serie['suma'] += valor
+            serie['n'] += 1
+
+    def exponer(self) -> List[str]:
+        lineas = []
+        for clave, serie in list(self._series.items()):
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float('inf'),), serie['conteos']):
+                acumulado += conteo
+                le = 'le="+Inf"' if limite == float('inf') else 'le="%s"' % _numero(limite)
+                lineas.append(f"{self.nombre}_bucket{self._etiquetas_texto(clave, le)} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{self._etiquetas_texto(clave)} {_numero(serie['suma'])}")
+            lineas.append(f"{self.nombre}_count{self._etiquetas_texto(clave)} {serie['n']}")
+        return lineas
+
+
+class cronometro:
+    """Context manager que observa la duración del bloque en un histograma."""
+
+    __slots__ = ('histograma', 'etiquetas', 'inicio')
+
+    def __init__(self, histograma: Histograma, **etiquetas):
+        self.histograma = histograma
+        self.etiquetas = etiquetas
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histograma.observe(time.perf_counter() - self.inicio, **self.etiquetas)
+        return False
+
+
+def cronometrar(histograma: Histograma, **etiquetas):
+    """Decorador que observa la duración de cada llamada en `histograma`."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with cronometro(histograma, **etiquetas):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+# ============================================
+# REGISTRO
+# ============================================
+
+_metricas: Dict[str, _Metrica] = {}
+_colectores: List[Callable[[], None]] = []
+_lock_registro = threading.Lock()
+
+
+def _registrar(metrica: _Metrica) -> _Metrica:
+    with _lock_registro:
+        return _metricas.setdefault(metrica.nombre, metrica)
+
+
+def contador(nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()) -> Contador:
+    return _registrar(Contador(nombre, ayuda, etiquetas))
+
+
+def medidor(nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()) -> Medidor:
+    return _registrar(Medidor(nombre, ayuda, etiquetas))
+
+
+def histograma(nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = (), buckets=BUCKETS_SEGUNDOS) -> Histograma:
+    return _registrar(Histograma(nombre, ayuda, etiquetas, buckets))
+
+
+def registrar_colector(funcion: Callable[[], None]):
+    """Función que actualiza medidores justo antes de cada exportación."""
+    with _lock_registro:
+        if funcion not in _colectores:
+            _colectores.append(funcion)
+
+
+def exportar_prometheus() -> str:
+    """Todas las métricas en formato de texto de exposición de Prometheus."""
+    for colector in list(_colectores):
+        try:
+            colector()
+        except Exception:
+            pass
+    lineas = []
+    for metrica in list(_metricas.values()):
+        lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+        lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+        lineas.extend(metrica.exponer())
+    return '\n'.join(lineas) + '\n'
+
+
+# ============================================
+# EXPORTACIÓN (ARCHIVO / HTTP)
+# ============================================
+
+def escribir_archivo(ruta: str):
+    """Escribe las métricas de forma atómica (compatible con el textfile collector)."""
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        f.write(exportar_prometheus())
+    os.replace(temporal, ruta)
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') not in ('', '/metrics'):
+            self.send_error(404)
+            return
+        cuerpo = exportar_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def iniciar_exportacion(archivo: str = ARCHIVO_METRICAS, puerto=PUERTO_METRICAS, host: str = HOST_METRICAS) -> Dict:
+    """
+    Arranca la exportación configurada: un hilo que reescribe `archivo` cada
+    INTERVALO_ARCHIVO_S segundos y/o un servidor HTTP en `host:puerto`
+    (/metrics). Si el puerto no se puede abrir, el servidor queda desactivado
+    (`error` en el resultado) y la app sigue sin él.
+    """
+    activos = {}
+    if archivo:
+        def escribir_periodicamente():
+            while True:
+                try:
+                    escribir_archivo(archivo)
+                except OSError:
+                    pass
+                time.sleep(INTERVALO_ARCHIVO_S)
+        threading.Thread(target=escribir_periodicamente, name="metricas-archivo", daemon=True).start()
+        activos['archivo'] = archivo
+    if puerto:
+        try:
+            servidor = ThreadingHTTPServer((host, int(puerto)), _ManejadorMetricas)
+        except OSError as e:
+            _log.warning("Exportador de métricas desactivado: no se pudo abrir %s:%s (%s)", host, puerto, e)
+            activos['error'] = str(e)
+        else:
+            threading.Thread(target=servidor.serve_forever, name="metricas-http", daemon=True).start()
+            activos['host'] = host
+            activos['puerto'] = int(puerto)
+    return activos
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _numero(valor: float) -> str:
+    valor = float(valor)
+    if math.isnan(valor):
+        return 'NaN'
+    if math.isinf(valor):
+        return '+Inf' if valor > 0 else '-Inf'
+    return str(int(valor)) if valor.is_integer() else repr(valor)
+
+
+# ============================================
+# MÉTRICAS DE LA APLICACIÓN
+# ============================================
+
+FIT_PRONOSTICO_SEGUNDOS = histograma(
+    'stockzero_forecast_fit_seconds', 'Duración del ajuste Holt-Winters por producto', ('producto',)
+)
+SIMULACION_SEGUNDOS = histograma(
+    'stockzero_trazabilidad_simulacion_seconds', 'Duración de la simulación de trazabilidad por producto'
+)
+OPTIMIZACION_CATALOGO_SEGUNDOS = histograma(
+    'stockzero_optimizacion_catalogo_seconds', 'Duración de la optimización de un catálogo completo'
+)
+CARGA_FILAS_TOTAL = contador(
+    'stockzero_upload_rows_total', 'Filas procesadas en subidas de archivos', ('tabla',)
+)
+CARGA_FILAS_POR_SEGUNDO = histograma(
+    'stockzero_upload_rows_per_second', 'Velocidad de procesamiento de subidas', ('tabla',), BUCKETS_FILAS_POR_SEGUNDO
+)
+SUPABASE_SEGUNDOS = histograma(
+    'stockzero_supabase_request_seconds', 'Latencia de ida y vuelta de peticiones a Supabase', ('operacion', 'tabla')
+)
+CACHE_SOLICITUDES_TOTAL = contador(
+    'stockzero_cache_requests_total', 'Solicitudes a caches por resultado', ('cache', 'resultado')
+)
+CACHE_RATIO_ACIERTOS = medidor(
+    'stockzero_cache_hit_ratio', 'Proporción de aciertos de cada cache', ('cache',)
+)
+
+
+def registrar_carga(tabla: str, filas: int, segundos: float):
+    """Registra una subida de archivo: filas totales y filas por segundo."""
+    CARGA_FILAS_TOTAL.inc(filas, tabla=tabla)
+    if segundos > 0:
+        CARGA_FILAS_POR_SEGUNDO.observe(filas / segundos, tabla=tabla)
+
+
+def registrar_cache(nombre: str, acierto: bool):
+    """Cuenta un acierto/fallo de la cache `nombre` y actualiza su ratio."""
+    CACHE_SOLICITUDES_TOTAL.inc(cache=nombre, resultado='hit' if acierto else 'miss')
+    aciertos = CACHE_SOLICITUDES_TOTAL._series.get((nombre, 'hit'), 0.0)
+    fallos = CACHE_SOLICITUDES_TOTAL._series.get((nombre, 'miss'), 0.0)
+    CACHE_RATIO_ACIERTOS.set(aciertos / (aciertos + fallos), cache=nombre)
@@ -0,0 +1,205 @@
+# modules/modelo_global.py
+
+import time
+from typing import Dict, Tuple
+import numpy as np
+import pandas as pd
+from modules.core_analysis import clasificar_abc
+from modules.instrumentacion import medir
+
+# Regularización L2 (ridge) sobre características normalizadas por la escala del SKU
+ALFA_RIDGE = 10.0
+# Días para estimar la escala (venta media) de cada SKU
+VENTANA_ESCALA = 56
+# Filas (SKU x día) que se convierten a características a la vez al entrenar
+FILAS_POR_BLOQUE = 500_000
+
+# ============================================
+# MATRIZ DE DEMANDA Y CARACTERÍSTICAS
+# ============================================
+
+def matriz_ventas(df_ventas: pd.DataFrame) -> Tuple[pd.Index, pd.Timestamp, np.ndarray]:
+    """
+    Ventas diarias (SKUs x días) desde la primera fecha del tenant hasta la
+    última; los días anteriores a la primera venta de cada SKU quedan en NaN
+    (sin historia) y los días sin venta posteriores, en 0.
+    """
+    fechas = pd.to_datetime(df_ventas['fecha']).dt.normalize()
+    codigos, productos = pd.factorize(df_ventas['producto'], sort=False)
+    inicio = fechas.min()
+    dia = (fechas - inicio).dt.days.to_numpy()
+    n_productos, n_dias = len(productos), int(dia.max()) + 1
+
+    plana = np.bincount(
+        codigos * n_dias + dia, weights=df_ventas['cantidad_vendida'].to_numpy(dtype=float),
+        minlength=n_productos * n_dias
+    )
+    ventas = plana.reshape(n_productos, n_dias)
+    primer_dia = np.full(n_productos, n_dias)
+    np.minimum.at(primer_dia, codigos, dia)
+    ventas[np.arange(n_dias)[None, :] < primer_dia[:, None]] = np.nan
+    return pd.Index(productos, name='producto'), inicio, ventas
+
+
+def _escalas(ventas: np.ndarray, ventana: int = VENTANA_ESCALA) -> np.ndarray:
+    """Venta media de los últimos `ventana` días con historia (1 si el SKU no vende)."""
+    recientes = ventas[:, -ventana:]
+    dias = np.sum(~np.isnan(recientes), axis=1)
+    media = np.nansum(recientes, axis=1) / np.maximum(dias, 1)
+    return np.where(media > 0, media, 1.0)
+
+
+def _rezagos(frecuencia: int) -> Tuple[int, ...]:
+    return tuple(range(1, frecuencia + 1)) + (2 * frecuencia,)
+
+
+def _ventanas(frecuencia: int) -> Tuple[int, ...]:
+    return (frecuencia, 4 * frecuencia)
+
+
+def n_caracteristicas(frecuencia: int) -> int:
+    return len(_rezagos(frecuencia)) + len(_ventanas(frecuencia)) + frecuencia + 1
+
+
+def _caracteristicas(z: np.ndarray, posiciones: np.ndarray, fase: np.ndarray, log_escala: np.ndarray, frecuencia: int) -> np.ndarray:
+    """
+    Características (SKUs x posiciones x p) para predecir las columnas `posiciones`
+    de `z` (ventas / escala, NaN sin historia): rezagos, medias móviles, fase
+    estacional (one-hot, hace de intercepto) y log de la escala del SKU. Los
+    valores sin historia se completan con 1, la venta media del SKU.
+    """
+    observado = ~np.isnan(z)
+    valores = np.where(observado, z, 0.0)
+    # Sumas acumuladas con un 0 inicial: suma de [a, b) = acumulado[b] - acumulado[a]
+    acumulado = np.concatenate([np.zeros((len(z), 1)), np.cumsum(valores, axis=1)], axis=1)
+    conteo = np.concatenate([np.zeros((len(z), 1)), np.cumsum(observado, axis=1)], axis=1)
+
+    columnas = []
+    for rezago in _rezagos(frecuencia):
+        origen = posiciones - rezago
+        valido = origen >= 0
+        x = np.where(valido, z[:, np.clip(origen, 0, None)], np.nan)
+        columnas.append(np.where(np.isnan(x), 1.0, x))
+    for ventana in _ventanas(frecuencia):
+        desde = np.clip(posiciones - ventana, 0, None)
+        suma = acumulado[:, posiciones] - acumulado[:, desde]
+        dias = conteo[:, posiciones] - conteo[:, desde]
+        columnas.append(np.where(dias > 0, suma / np.maximum(dias, 1), 1.0))
+
+    forma = (len(z), len(posiciones))
+    estacion = np.zeros(forma + (frecuencia,))
+    estacion[:, np.arange(len(posiciones)), fase] = 1.0
+    escala = np.broadcast_to(log_escala[:, None, None], forma + (1,))
+    return np.concatenate([np.stack(columnas, axis=2), estacion, escala], axis=2)
+
+
+# ============================================
+# ENTRENAMIENTO Y PREDICCIÓN EN LOTE
+# ============================================
+
+def entrenar(ventas: np.ndarray, inicio: pd.Timestamp, frecuencia: int = 7, alfa: float = ALFA_RIDGE) -> Dict:
+    """
+    Ajusta una única regresión ridge para todos los SKUs del tenant. Las
+    ecuaciones normales (X'X, X'y) se acumulan por bloques de SKUs, así que el
+    costo crece con las filas SKU x día y la memoria queda acotada. Se entrena
+    con los días que tienen al menos una temporada de historia del SKU.
+    """
+    escala = _escalas(ventas)
+    z = ventas / escala[:, None]
+    log_escala = np.log1p(escala)
+    n_dias = ventas.shape[1]
+    posiciones = np.arange(n_dias)
+    fase = (inicio.toordinal() + posiciones) % frecuencia
+    con_historia = np.cumsum(~np.isnan(z), axis=1)
+
+    p = n_caracteristicas(frecuencia)
+    xtx = np.zeros((p, p))
+    xty = np.zeros(p)
+    filas = 0
+    skus_por_bloque = max(1, FILAS_POR_BLOQUE // max(n_dias, 1))
+    for desde in range(0, len(z), skus_por_bloque):
+        bloque = slice(desde, desde + skus_por_bloque)
+        x = _caracteristicas(z[bloque], posiciones, fase, log_escala[bloque], frecuencia)
+        y = z[bloque]
+        mascara = ~np.isnan(y) & (con_historia[bloque] > frecuencia)
+        x, y = x[mascara], y[mascara]
+        xtx += x.T @ x
+        xty += x.T @ y
+        filas += len(y)
+
+    coeficientes = np.linalg.solve(xtx + alfa * np.eye(p), xty)
+    return {'coeficientes': coeficientes, 'frecuencia': frecuencia, 'filas': filas}
+
+
+def predecir(modelo: Dict, ventas: np.ndarray, inicio: pd.Timestamp, horizonte: int) -> np.ndarray:
+    """
+    Pronóstico (SKUs x horizonte) de todos los SKUs a la vez: un producto
+    matricial por día, realimentando cada predicción como rezago del siguiente.
+    """
+    frecuencia = modelo['frecuencia']
+    beta = modelo['coeficientes']
+    escala = _escalas(ventas)
+    log_escala = np.log1p(escala)
+
+    # Solo hace falta la cola que cubre el rezago y la ventana más largos
+    cola = max(max(_rezagos(frecuencia)), max(_ventanas(frecuencia)))
+    desplazamiento = max(ventas.shape[1] - cola, 0)
+    z = ventas[:, desplazamiento:] / escala[:, None]
+    z = np.concatenate([z, np.full((len(z), horizonte), np.nan)], axis=1)
+
+    inicial = z.shape[1] - horizonte
+    for paso in range(horizonte):
+        posicion = np.array([inicial + paso])
+        fase = (inicio.toordinal() + desplazamiento + posicion) % frecuencia
+        x = _caracteristicas(z, posicion, fase, log_escala, frecuencia)[:, 0, :]
+        z[:, inicial + paso] = np.clip(x @ beta, 0, None)
+    return z[:, inicial:] * escala[:, None]
+
+
+# ============================================
+# OPTIMIZACIÓN DEL CATÁLOGO CON EL MODELO GLOBAL
+# ============================================
+
+@medir('modelo_global.catalogo')
+def procesar_modelo_global(
+    df: pd.DataFrame,
+    lead_time: int = 7,
+    stock_seguridad_dias: int = 3,
+    frecuencia_estacional: int = 7,
+    alfa: float = ALFA_RIDGE
+) -> pd.DataFrame:
+    """
+    Alternativa a `procesar_multiple_productos`: un solo modelo para todo el
+    catálogo en lugar de un Holt-Winters por producto. Misma salida (PR,
+    cantidad a ordenar, pronóstico y clasificación ABC) e incluye los productos
+    con menos de dos temporadas de historia.
+    """
+    productos, inicio, ventas = matriz_ventas(df)
+    modelo = entrenar(ventas, inicio, frecuencia_estacional, alfa)
+    pronostico = predecir(modelo, ventas, inicio, lead_time)
+
+    demanda_lead_time = pronostico.sum(axis=1)
+    promedio = pronostico.mean(axis=1)
+    df_resultados = pd.DataFrame({
+        'producto': productos,
+        'punto_reorden': np.round(demanda_lead_time + promedio * stock_seguridad_dias, 2),
+        'cantidad_a_ordenar': np.round(promedio * frecuencia_estacional / 2, 2),
+        'pronostico_diario_promedio': np.round(promedio, 2),
+        'volumen_total_vendido': np.nansum(ventas, axis=1),
+        'error': None,
+    })
+    return clasificar_abc(df_resultados)
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+if __name__ == "__main__":
+    from modules.backtesting import datos_sinteticos
+
+    df = datos_sinteticos(n_skus=5000, dias=365)
+    inicio_reloj = time.perf_counter()
+    resultado = procesar_modelo_global(df)
+    print(f"{len(df):,} filas, {len(resultado):,} SKUs en {time.perf_counter() - inicio_reloj:.2f} s")
+    print(resultado.head())
@@ -0,0 +1,185 @@
+# modules/optimizacion.py
+
+import streamlit as st
+import pandas as pd
+from modules.recursos import gobernar_memoria_sesion, obtener_gestor_trabajos
+from modules.trabajos import ESTADOS_FINALES, ESTADO_COMPLETADO
+from modules.panel_perfil import es_admin
+from modules.politica_inventario import NIVEL_SERVICIO_ABC, aplicar_politica
+from modules.inventario_store import generado_resultados, sellar_resultados
+from modules.modelo_global import procesar_modelo_global
+from modules.precalculo import MODELO_GLOBAL, MODELO_POR_PRODUCTO
+
+MODOS_PRONOSTICO = {
+    MODELO_POR_PRODUCTO: 'Holt-Winters por producto',
+    MODELO_GLOBAL: 'Modelo global del catálogo',
+}
+
+# Frecuencia de refresco del progreso mientras el trabajo corre
+INTERVALO_REFRESCO_S = 2
+
+ETIQUETAS_ESTADO = {
+    'pendiente': '⏳ En cola',
+    'en_curso': '⚙️ Calculando',
+    'completado': '✅ Completado',
+    'cancelado': '🛑 Cancelado',
+    'error': '❌ Error',
+    'interrumpido': '⚠️ Interrumpido (reinicio del servidor)',
+}
+
+COLUMNAS_RESULTADOS = [
+    'producto', 'clasificacion_abc', 'punto_reorden', 'cantidad_a_ordenar', 'stock_seguridad',
+    'nivel_maximo', 'pronostico_diario_promedio', 'volumen_total_vendido', 'error'
+]
+
+# ============================================
+# INTERFAZ DE OPTIMIZACIÓN
+# ============================================
+
+def optimizacion_app(lead_time: int, stock_seguridad: int, frecuencia: int):
+    """Página de optimización: envía el cálculo a segundo plano y muestra su avance."""
+    st.header("🎯 Optimización de Inventario")
+
+    df_ventas = st.session_state.get('df_ventas_trazabilidad')
+    if df_ventas is None or df_ventas.empty:
+        st.info("📤 Sube archivos desde el botón superior para comenzar.")
+        return
+
+    gestor = obtener_gestor_trabajos()
+    tenant = st.session_state.user.id
+    n_productos = df_ventas['producto'].nunique()
+
+    st.success(f"✅ Datos listos para optimización: {n_productos} productos")
+    servicio = " / ".join(f"{clase} {nivel:.0%}" for clase, nivel in NIVEL_SERVICIO_ABC.items())
+    st.caption(f"Lead time: {lead_time} días · Nivel de servicio: {servicio} · Estacionalidad: {frecuencia} días")
+
+    trabajo_id = st.session_state.get('trabajo_optimizacion_id')
+    trabajo = gestor.estado(trabajo_id) if trabajo_id else None
+
+    # Si la sesión se perdió (recarga del navegador) se recupera el trabajo del tenant que sigue corriendo
+    if trabajo is None:
+        previos = [t for t in gestor.trabajos_de(tenant) if t['estado'] not in ESTADOS_FINALES]
+        if previos:
+            trabajo = previos[0]
+            st.session_state['trabajo_optimizacion_id'] = trabajo['id']
+
+    en_curso = trabajo is not None and trabajo['estado'] not in ESTADOS_FINALES
+
+    modo = st.radio(
+        "Modelo de pronóstico", list(MODOS_PRONOSTICO), horizontal=True, key="modo_pronostico",
+        format_func=MODOS_PRONOSTICO.get,
+        help="El modelo global aprende de todo el catálogo a la vez: es mucho más rápido y también pronostica productos con poca historia."
+    )
+
+    if st.button("🚀 Ejecutar optimización", type="primary", disabled=en_curso):
+        if modo == MODELO_GLOBAL:
+            # Segundos incluso con miles de productos: se calcula en el mismo rerun
+            with st.spinner("Entrenando el modelo global..."):
+                df_global = procesar_modelo_global(df_ventas, lead_time, stock_seguridad, frecuencia)
+                st.session_state['df_resultados'] = sellar_resultados(aplicar_politica(
+                    df_global, df_ventas, st.session_state.get('inventario_df'), lead_time=lead_time
+                ))
+            st.success(f"✅ Modelo global: {len(df_global)} productos pronosticados")
+        else:
+            nuevo_id = gestor.enviar_optimizacion(df_ventas, tenant, lead_time, stock_seguridad, frecuencia)
+            st.session_state['trabajo_optimizacion_id'] = nuevo_id
+            st.session_state.pop('trabajo_optimizacion_aplicado', None)
+            st.rerun()
+
+    if trabajo is not None:
+        # Solo se sondea mientras el trabajo está activo
+        panel = st.fragment(run_every=INTERVALO_REFRESCO_S if en_curso else None)(_panel_progreso)
+        panel(trabajo['id'])
+
+    if st.session_state.get('df_resultados') is not None:
+        _barrido_politicas(df_ventas, lead_time)
+
+
+def _barrido_politicas(df_ventas: pd.DataFrame, lead_time: int):
+    """Frontera costo / nivel de servicio de las políticas de reorden de cada producto."""
+    from modules.barrido_politicas import LEAD_TIMES, barrido_politicas, politica_recomendada
+
+    with st.expander("📐 Barrido de políticas (lead time, días de seguridad, horizonte)"):
+        col1, col2 = st.columns(2)
+        lead_times = sorted(set(LEAD_TIMES) | {lead_time})
+        lead_elegido = col1.selectbox("Lead time del proveedor", lead_times, index=lead_times.index(lead_time), key="barrido_lead_time")
+        objetivo = col2.slider("Nivel de servicio objetivo", 0.80, 0.999, 0.95, step=0.005, key="barrido_objetivo")
+
+        if st.button("Evaluar políticas", key="barrido_ejecutar"):
+            with st.spinner("Simulando políticas..."):
+                st.session_state['df_barrido'] = barrido_politicas(
+                    df_ventas, st.session_state.get('df_resultados'), st.session_state.get('inventario_df')
+                )
+
+        df_barrido = st.session_state.get('df_barrido')
+        if df_barrido is None:
+            return
+        df_lead = df_barrido[df_barrido['lead_time'] == lead_elegido]
+        if df_lead.empty:
+            st.info("Vuelve a evaluar para incluir este lead time.")
+            return
+        recomendadas = politica_recomendada(df_lead, objetivo)
+        columnas = ['producto', 'dias_seguridad', 'horizonte_pedido', 'punto_reorden', 'cantidad_a_ordenar',
+                    'nivel_servicio', 'costo_total', 'pedidos', 'stock_medio']
+        st.dataframe(recomendadas[columnas].round(2), width='stretch', hide_index=True)
+        st.caption(f"{len(df_barrido):,} combinaciones producto-política evaluadas; "
+                   f"{int(df_lead['eficiente'].sum()):,} en la frontera eficiente para lead time {lead_elegido}.")
+
+
+def _panel_progreso(trabajo_id: str):
+    """Progreso y resultados parciales; se refresca solo, sin rerun de toda la app."""
+    # Los reruns del fragmento no pasan por el inicio de la página: cuentan como actividad
+    # y recargan lo que la sesión tuviera en disco antes de leer session_state
+    gobernar_memoria_sesion()
+    gestor = obtener_gestor_trabajos()
+    trabajo = gestor.estado(trabajo_id)
+    if trabajo is None:
+        return
+
+    total = max(trabajo['total'], 1)
+    st.markdown(f"**Estado:** {ETIQUETAS_ESTADO.get(trabajo['estado'], trabajo['estado'])}")
+    st.progress(trabajo['completados'] / total, text=f"{trabajo['completados']} / {trabajo['total']} productos")
+
+    if trabajo['estado'] not in ESTADOS_FINALES:
+        _estado_cola(gestor, trabajo['tenant'])
+        if st.button("🛑 Cancelar", key=f"cancelar_{trabajo_id}"):
+            gestor.cancelar(trabajo_id)
+    elif trabajo['error']:
+        st.error(f"Error en la optimización: {trabajo['error']}")
+
+    df_parcial = gestor.resultados(trabajo_id)
+    if not df_parcial.empty:
+        columnas = [c for c in COLUMNAS_RESULTADOS if c in df_parcial.columns]
+        st.dataframe(df_parcial[columnas], width='stretch', hide_index=True)
+
+    # Al terminar: un rerun completo detiene el sondeo y, si el trabajo se completó,
+    # sus resultados alimentan el dashboard y el control de inventario
+    if trabajo['estado'] in ESTADOS_FINALES and st.session_state.get('trabajo_optimizacion_aplicado') != trabajo_id:
+        actuales = st.session_state.get('df_resultados')
+        # Resultados más recientes en la sesión (p. ej. el precálculo del batch) no se pisan
+        mas_nuevo = actuales is None or generado_resultados(actuales) < trabajo['actualizado']
+        if trabajo['estado'] == ESTADO_COMPLETADO and not df_parcial.empty and mas_nuevo:
+            # PR y cantidad a ordenar salen del motor (s, S)/EOQ con costos del inventario
+            st.session_state['df_resultados'] = sellar_resultados(aplicar_politica(
+                df_parcial, st.session_state['df_ventas_trazabilidad'], st.session_state.get('inventario_df'),
+                lead_time=trabajo['parametros']['lead_time']
+            ), generado=trabajo['actualizado'])
+        st.session_state['trabajo_optimizacion_aplicado'] = trabajo_id
+        st.rerun()
+
+
+def _estado_cola(gestor, tenant: str):
+    """Profundidad de cola y esperas del planificador compartido entre tenants."""
+    df_colas = gestor.resumen_colas()
+    if df_colas.empty:
+        return
+    propia = df_colas[df_colas['tenant'] == tenant]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("En cola (todas las cuentas)", int(df_colas['cola_interactiva'].sum() + df_colas['cola_lote'].sum()))
+    if not propia.empty:
+        col2.metric("Tus productos en cola", int(propia['cola_interactiva'].iloc[0] + propia['cola_lote'].iloc[0]))
+        col3.metric("Espera media", f"{propia['espera_media_s'].iloc[0]:.1f} s")
+
+    if es_admin():
+        with st.expander("🧮 Planificador (todas las cuentas)"):
+            st.dataframe(df_colas, width='stretch', hide_index=True)
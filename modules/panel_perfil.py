@@ -0,0 +1,59 @@
+# modules/panel_perfil.py
+
+import os
+import streamlit as st
+import pandas as pd
+from modules.instrumentacion import iniciar_rerun, finalizar_rerun, cancelar_rerun, arbol_a_filas
+
+# Emails (separados por coma) que pueden ver el panel de perfilado
+ADMINS = [e.strip().lower() for e in os.getenv("STOCK_ZERO_ADMINS", "").split(",") if e.strip()]
+
+# ============================================
+# PANEL DE PERFILADO (SOLO ADMIN)
+# ============================================
+
+def es_admin() -> bool:
+    """True si el usuario de la sesión está en STOCK_ZERO_ADMINS."""
+    user = st.session_state.get('user')
+    email = getattr(user, 'email', None) or ''
+    return email.lower() in ADMINS
+
+
+def controles_perfil():
+    """Interruptores del sidebar; deben llamarse antes de `comenzar_perfil_rerun`."""
+    if not es_admin():
+        return
+    with st.sidebar:
+        st.markdown("---")
+        st.markdown("### ⏱️ Perfilado")
+        st.toggle("Perfilar reruns", key="perfil_activo")
+        st.toggle("Medir memoria (más lento)", key="perfil_memoria", disabled=not st.session_state.get('perfil_activo'))
+
+
+def comenzar_perfil_rerun():
+    """Abre el árbol del rerun si el perfilado está activo para esta sesión."""
+    if es_admin() and st.session_state.get('perfil_activo'):
+        iniciar_rerun('rerun', medir_memoria=bool(st.session_state.get('perfil_memoria')))
+    else:
+        cancelar_rerun()
+
+
+def panel_perfil():
+    """Cierra el árbol del rerun y lo muestra en un expander al final de la página."""
+    raiz = finalizar_rerun()
+    if raiz is None:
+        return
+    st.session_state['perfil_ultimo_rerun'] = arbol_a_filas(raiz)
+
+    st.markdown("---")
+    with st.expander(f"⏱️ Perfil del rerun: {raiz.segundos * 1000:,.0f} ms", expanded=False):
+        df = pd.DataFrame(st.session_state['perfil_ultimo_rerun'])
+        st.dataframe(df, width='stretch', hide_index=True)
+
+    from modules.recursos import obtener_gestor_memoria
+
+    gestor = obtener_gestor_memoria()
+    memoria = gestor.resumen()
+    with st.expander(f"🧠 Memoria de sesiones: {memoria['memoria_mb'].sum():,.1f} MB en memoria, {memoria['disco_mb'].sum():,.1f} MB en disco", expanded=False):
+        st.caption(f"Presupuesto del proceso: {gestor.presupuesto_bytes / 2**20:,.0f} MB")
+        st.dataframe(memoria, width='stretch', hide_index=True)
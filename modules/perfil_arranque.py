@@ -0,0 +1,71 @@
+# modules/perfil_arranque.py
+
+import subprocess
+import sys
+from typing import Dict, List
+
+# Librerías cuyo costo de importación se paga en segundos
+LIBRERIAS_PESADAS = ['statsmodels', 'matplotlib', 'plotly']
+
+# Módulos que participan en el arranque de la app (antes y después del login)
+MODULOS_APP = [
+    'streamlit',
+    'pandas',
+    'supabase',
+    'statsmodels.tsa.holtwinters',
+    'matplotlib.pyplot',
+    'plotly.graph_objects',
+    'modules.core_analysis',
+    'modules.trazability',
+    'modules.components',
+    'modules.recipes',
+    'modules.analytics',
+    'modules.dashboard_analytics',
+    'pages._0_Dashboard_Enhanced',
+]
+
+# ============================================
+# REPORTE DE COSTO DE IMPORTACIÓN
+# ============================================
+
+def medir_importacion(modulo: str) -> Dict:
+    """
+    Importa `modulo` en un intérprete limpio con `-X importtime` y devuelve su
+    costo acumulado (ms) y qué librerías pesadas arrastra consigo.
+    """
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+        capture_output=True, text=True
+    )
+    if proceso.returncode != 0:
+        error = proceso.stderr.strip().splitlines()[-1] if proceso.stderr.strip() else 'error'
+        return {'modulo': modulo, 'ms': None, 'pesadas': '', 'error': error}
+
+    acumulado_us = 0
+    cargados = set()
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith('import time:'):
+            continue
+        partes = linea[len('import time:'):].split('|')
+        if len(partes) != 3 or not partes[1].strip().isdigit():
+            continue
+        nombre = partes[2].strip()
+        cargados.add(nombre.split('.')[0])
+        if nombre == modulo:
+            acumulado_us = int(partes[1])
+
+    pesadas = [lib for lib in LIBRERIAS_PESADAS if lib in cargados and not modulo.startswith(lib)]
+    return {'modulo': modulo, 'ms': acumulado_us / 1000, 'pesadas': ', '.join(pesadas), 'error': None}
+
+
+def reporte_arranque(modulos: List[str] = None) -> List[Dict]:
+    """Costo de importación por módulo, ordenado de mayor a menor."""
+    filas = [medir_importacion(m) for m in (modulos or MODULOS_APP)]
+    return sorted(filas, key=lambda f: -(f['ms'] or 0))
+
+
+if __name__ == "__main__":
+    print(f"{'Módulo':<32} {'ms':>10}  Arrastra")
+    for fila in reporte_arranque():
+        ms = f"{fila['ms']:.1f}" if fila['ms'] is not None else 'N/A'
+        print(f"{fila['modulo']:<32} {ms:>10}  {fila['pesadas'] or fila['error'] or '-'}")
@@ -0,0 +1,210 @@
+# modules/planificador.py
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, List, Optional, Tuple
+from modules.metricas import histograma, medidor
+
+CLASE_INTERACTIVA = 'interactiva'
+CLASE_LOTE = 'lote'
+# Orden de despacho: una unidad interactiva siempre sale antes que una de lote
+CLASES = (CLASE_INTERACTIVA, CLASE_LOTE)
+
+PESO_DEFECTO = 1.0
+
+ESPERA_SEGUNDOS = histograma(
+    'stockzero_scheduler_wait_seconds', 'Espera en cola de cada unidad de trabajo antes de ejecutarse', ('clase',)
+)
+PROFUNDIDAD_COLA = medidor(
+    'stockzero_scheduler_queue_depth', 'Unidades de trabajo en cola por clase', ('clase',)
+)
+
+# ============================================
+# PLANIFICADOR JUSTO MULTI-TENANT
+# ============================================
+
+class _Unidad:
+    __slots__ = ('funcion', 'args', 'futuro', 'encolado')
+
+    def __init__(self, funcion: Callable, args: Tuple):
+        self.funcion = funcion
+        self.args = args
+        self.futuro = Future()
+        self.encolado = time.monotonic()
+
+
+class _ColaTenant:
+    __slots__ = ('colas', 'tiempo_virtual', 'en_curso', 'despachadas', 'espera_total', 'espera_max')
+
+    def __init__(self):
+        self.colas = {clase: deque() for clase in CLASES}
+        self.tiempo_virtual = 0.0
+        self.en_curso = 0
+        self.despachadas = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+
+class PlanificadorJusto:
+    """
+    Reparte unidades de trabajo (p. ej. un producto de `calcular_orden_optima_producto`)
+    de varios tenants sobre un mismo pool, con una cola por tenant y clase.
+
+    - Prioridad: mientras haya unidades interactivas ("recalcular ahora"), no se
+      despacha ninguna de lote (nocturna); las que ya corren no se interrumpen.
+    - Reparto justo ponderado: dentro de una clase se despacha el tenant con menor
+      tiempo virtual (servicio recibido / peso). Un tenant que vuelve a tener
+      trabajo arranca en el tiempo virtual actual, sin acumular crédito.
+    - Solo hay `max_en_vuelo` unidades en el pool a la vez; el resto espera aquí,
+      de modo que un catálogo de 20k productos no bloquea a los demás.
+
+    `enviar` devuelve un Future propio: cancelarlo antes del despacho retira la unidad.
+    """
+
+    def __init__(self, ejecutor: Executor, max_en_vuelo: int, pesos: Optional[Dict[str, float]] = None):
+        self.ejecutor = ejecutor
+        self.max_en_vuelo = max(1, max_en_vuelo)
+        self.pesos: Dict[str, float] = dict(pesos or {})
+        self._tenants: Dict[str, _ColaTenant] = {}
+        self._tiempo_virtual = 0.0
+        self._en_vuelo = 0
+        self._cerrado = False
+        self._condicion = threading.Condition()
+        self._despachador = threading.Thread(target=self._despachar, name="planificador", daemon=True)
+        self._despachador.start()
+
+    # --- API pública ---
+
+    def asignar_peso(self, tenant: str, peso: float):
+        """Peso relativo del tenant en el reparto (p. ej. según su plan)."""
+        with self._condicion:
+            self.pesos[tenant] = max(peso, 1e-6)
+
+    def enviar(self, tenant: str, funcion: Callable, *args, interactivo: bool = False) -> Future:
+        """Encola `funcion(*args)` para el tenant y devuelve el Future de su resultado."""
+        unidad = _Unidad(funcion, args)
+        clase = CLASE_INTERACTIVA if interactivo else CLASE_LOTE
+        with self._condicion:
+            if self._cerrado:
+                raise RuntimeError("El planificador está cerrado")
+            cola = self._tenants.get(tenant)
+            if cola is None:
+                cola = self._tenants[tenant] = _ColaTenant()
+            if not self._pendientes(cola):
+                # Tenant que (re)entra: no hereda crédito de cuando estaba inactivo
+                cola.tiempo_virtual = max(cola.tiempo_virtual, self._tiempo_virtual)
+            cola.colas[clase].append(unidad)
+            self._condicion.notify()
+        return unidad.futuro
+
+    def resumen(self) -> List[Dict]:
+        """Profundidad de cola, unidades en curso y esperas por tenant."""
+        ahora = time.monotonic()
+        filas = []
+        with self._condicion:
+            for tenant, cola in self._tenants.items():
+                fila = {'tenant': tenant, 'peso': self.pesos.get(tenant, PESO_DEFECTO), 'en_curso': cola.en_curso}
+                espera_actual = 0.0
+                for clase in CLASES:
+                    vivas = [u for u in cola.colas[clase] if not u.futuro.cancelled()]
+                    fila[f'cola_{clase}'] = len(vivas)
+                    if vivas:
+                        espera_actual = max(espera_actual, ahora - vivas[0].encolado)
+                fila['despachadas'] = cola.despachadas
+                fila['espera_media_s'] = round(cola.espera_total / cola.despachadas, 3) if cola.despachadas else 0.0
+                fila['espera_max_s'] = round(cola.espera_max, 3)
+                fila['espera_actual_s'] = round(espera_actual, 3)
+                filas.append(fila)
+        return filas
+
+    def profundidad(self, clase: Optional[str] = None) -> int:
+        """Unidades pendientes (de una clase o de todas)."""
+        clases = (clase,) if clase else CLASES
+        with self._condicion:
+            return sum(
+                1 for cola in self._tenants.values() for c in clases
+                for u in cola.colas[c] if not u.futuro.cancelled()
+            )
+
+    def cerrar(self):
+        """Detiene el despacho; las unidades pendientes se cancelan."""
+        with self._condicion:
+            self._cerrado = True
+            for cola in self._tenants.values():
+                for c in CLASES:
+                    for unidad in cola.colas[c]:
+                        unidad.futuro.cancel()
+                    cola.colas[c].clear()
+            self._condicion.notify_all()
+
+    # --- Despacho ---
+
+    def _pendientes(self, cola: _ColaTenant) -> bool:
+        return any(cola.colas[c] for c in CLASES)
+
+    def _elegir(self) -> Optional[Tuple[str, str, _Unidad]]:
+        """Siguiente unidad a despachar según clase y tiempo virtual (con el lock tomado)."""
+        for clase in CLASES:
+            candidato = None
+            for tenant, cola in self._tenants.items():
+                pendientes = cola.colas[clase]
+                # Las unidades canceladas se descartan al llegar al frente
+                while pendientes and pendientes[0].futuro.cancelled():
+                    pendientes.popleft()
+                if pendientes and (candidato is None or cola.tiempo_virtual < self._tenants[candidato].tiempo_virtual):
+                    candidato = tenant
+            if candidato is not None:
+                return candidato, clase, self._tenants[candidato].colas[clase].popleft()
+        return None
+
+    def _actualizar_profundidad(self):
+        for clase in CLASES:
+            PROFUNDIDAD_COLA.set(sum(len(cola.colas[clase]) for cola in self._tenants.values()), clase=clase)
+
+    def _despachar(self):
+        while True:
+            with self._condicion:
+                while True:
+                    if self._cerrado:
+                        return
+                    eleccion = self._elegir() if self._en_vuelo < self.max_en_vuelo else None
+                    if eleccion is not None:
+                        tenant, clase, unidad = eleccion
+                        if unidad.futuro.set_running_or_notify_cancel():
+                            break
+                        continue
+                    self._actualizar_profundidad()
+                    self._condicion.wait()
+
+                cola = self._tenants[tenant]
+                self._tiempo_virtual = cola.tiempo_virtual
+                cola.tiempo_virtual += 1.0 / self.pesos.get(tenant, PESO_DEFECTO)
+                cola.en_curso += 1
+                self._en_vuelo += 1
+                espera = time.monotonic() - unidad.encolado
+                cola.despachadas += 1
+                cola.espera_total += espera
+                cola.espera_max = max(cola.espera_max, espera)
+                self._actualizar_profundidad()
+
+            ESPERA_SEGUNDOS.observe(espera, clase=clase)
+            try:
+                interno = self.ejecutor.submit(unidad.funcion, *unidad.args)
+            except Exception as e:
+                self._terminar(tenant, unidad, None, e)
+                continue
+            interno.add_done_callback(lambda f, t=tenant, u=unidad: self._terminar(t, u, f))
+
+    def _terminar(self, tenant: str, unidad: _Unidad, interno: Optional[Future], error: Exception = None):
+        with self._condicion:
+            self._tenants[tenant].en_curso -= 1
+            self._en_vuelo -= 1
+            self._condicion.notify()
+        if error is None:
+            error = interno.exception()
+        if error is not None:
+            unidad.futuro.set_exception(error)
+        else:
+            unidad.futuro.set_result(interno.result())
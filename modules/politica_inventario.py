@@ -0,0 +1,176 @@
+# modules/politica_inventario.py
+
+import time
+from statistics import NormalDist
+from typing import Dict, Optional, Union
+import numpy as np
+import pandas as pd
+from modules.instrumentacion import medir
+from modules.barrido_politicas import COSTO_PEDIDO, TASA_MANTENIMIENTO_ANUAL, COSTO_UNITARIO_DEFECTO, DIAS_SIMULACION
+
+# Nivel de servicio (probabilidad de no quebrar en el ciclo) por clase ABC
+NIVEL_SERVICIO_ABC = {'A': 0.98, 'B': 0.95, 'C': 0.90}
+NIVEL_SERVICIO_DEFECTO = 0.95
+
+# Límites de cobertura del pedido en días de demanda: evitan pedidos absurdos
+# cuando el costo unitario es un placeholder (1.0) o la demanda es casi nula,
+# y acotan la vida útil de insumos perecederos
+CICLO_MINIMO_DIAS = 1
+CICLO_MAXIMO_DIAS = 30
+
+# ============================================
+# MOTOR VECTORIZADO EOQ / (s, S)
+# ============================================
+
+def politica_optima(
+    demanda_diaria: np.ndarray,
+    desviacion_diaria: np.ndarray,
+    costo_unitario: np.ndarray,
+    lead_time: Union[float, np.ndarray] = 7,
+    nivel_servicio: Union[float, np.ndarray] = NIVEL_SERVICIO_DEFECTO,
+    costo_pedido: float = COSTO_PEDIDO,
+    tasa_mantenimiento_anual: float = TASA_MANTENIMIENTO_ANUAL,
+    desviacion_lead_time: float = 0.0
+) -> Dict[str, np.ndarray]:
+    """
+    Parámetros (s, S) de todo el catálogo en una sola pasada vectorizada:
+
+    - Q (EOQ) = sqrt(2 · D · K / h), con D demanda anual, K costo por pedido y
+      h = costo unitario · tasa de mantenimiento; acotado a [CICLO_MINIMO_DIAS,
+      CICLO_MAXIMO_DIAS] días de demanda.
+    - Stock de seguridad = z(nivel de servicio) · σ del lead time, con
+      σ_LT = sqrt(L · σ² + μ² · σ_L²).
+    - s (punto de reorden) = μ · L + stock de seguridad; S = s + Q.
+    """
+    mu = np.clip(np.asarray(demanda_diaria, dtype=float), 0, None)
+    sigma = np.nan_to_num(np.asarray(desviacion_diaria, dtype=float), nan=0.0)
+    costo = np.asarray(costo_unitario, dtype=float)
+    lead = np.broadcast_to(np.asarray(lead_time, dtype=float), mu.shape)
+    servicio = np.clip(np.broadcast_to(np.asarray(nivel_servicio, dtype=float), mu.shape), 0.5, 0.9999)
+
+    demanda_anual = mu * 365
+    h = np.where(costo > 0, costo, COSTO_UNITARIO_DEFECTO) * tasa_mantenimiento_anual
+    eoq = np.sqrt(2 * demanda_anual * costo_pedido / h)
+    eoq = np.clip(eoq, mu * CICLO_MINIMO_DIAS, mu * CICLO_MAXIMO_DIAS)
+
+    # Cuantil normal solo de los niveles distintos (pocos: uno por clase ABC)
+    niveles, inversa = np.unique(servicio, return_inverse=True)
+    z = np.array([NormalDist().inv_cdf(nivel) for nivel in niveles])[inversa].reshape(mu.shape)
+    sigma_lead = np.sqrt(lead * sigma ** 2 + (mu * desviacion_lead_time) ** 2)
+    stock_seguridad = z * sigma_lead
+    punto_reorden = mu * lead + stock_seguridad
+    nivel_maximo = punto_reorden + eoq
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pedidos_anuales = np.where(eoq > 0, demanda_anual / eoq, 0.0)
+        ciclo_dias = np.where(mu > 0, eoq / mu, 0.0)
+    costo_pedidos = pedidos_anuales * costo_pedido
+    costo_mantenimiento = (eoq / 2 + stock_seguridad) * h
+
+    return {
+        'eoq': eoq,
+        'stock_seguridad': stock_seguridad,
+        'punto_reorden': punto_reorden,
+        'nivel_maximo': nivel_maximo,
+        'ciclo_dias': ciclo_dias,
+        'costo_anual_pedidos': costo_pedidos,
+        'costo_anual_mantenimiento': costo_mantenimiento,
+        'costo_anual_total': costo_pedidos + costo_mantenimiento,
+    }
+
+
+# ============================================
+# ENTRADAS DESDE LOS DATOS DE LA APP
+# ============================================
+
+def estadisticas_demanda(df_ventas: pd.DataFrame, dias: int = DIAS_SIMULACION) -> pd.DataFrame:
+    """
+    Media y desviación de la demanda diaria por producto en los últimos `dias`
+    días (o desde su primera venta, si es posterior), contando los días sin
+    venta como cero, a partir de sumas y sumas de cuadrados por producto.
+    """
+    fechas = pd.to_datetime(df_ventas['fecha']).dt.normalize()
+    fin = fechas.max()
+    recientes = df_ventas.assign(fecha=fechas)[fechas >= fin - pd.Timedelta(days=dias - 1)]
+    diario = recientes.groupby(['producto', 'fecha'], sort=False)['cantidad_vendida'].sum().to_frame('x')
+    diario['x2'] = diario['x'] ** 2
+    diario['primera'] = diario.index.get_level_values('fecha')
+    por_producto = diario.groupby(level='producto', sort=False).agg({'x': 'sum', 'x2': 'sum', 'primera': 'min'})
+
+    n = ((fin - por_producto['primera']).dt.days + 1).astype(float)
+    media = por_producto['x'] / n
+    varianza = (por_producto['x2'] - n * media ** 2) / (n - 1).clip(lower=1)
+    return pd.DataFrame({'demanda_diaria': media, 'desviacion_diaria': np.sqrt(varianza.clip(lower=0))})
+
+
+@medir('politicas.eoq')
+def aplicar_politica(
+    df_resultados: pd.DataFrame,
+    df_ventas: pd.DataFrame,
+    inventario_df: Optional[pd.DataFrame] = None,
+    lead_time: int = 7,
+    nivel_servicio: Union[float, Dict[str, float]] = None,
+    costo_pedido: float = COSTO_PEDIDO,
+    tasa_mantenimiento_anual: float = TASA_MANTENIMIENTO_ANUAL
+) -> pd.DataFrame:
+    """
+    Reemplaza `punto_reorden` y `cantidad_a_ordenar` de los resultados por la
+    política (s, S)/EOQ. La demanda media es el pronóstico Holt-Winters del
+    producto; la variabilidad sale de las ventas recientes y el costo unitario
+    del inventario. `nivel_servicio` puede ser un valor o un dict por clase ABC.
+    """
+    if df_resultados is None or df_resultados.empty:
+        return df_resultados
+
+    df = df_resultados.copy()
+    validos = df['error'].isnull().to_numpy() if 'error' in df.columns else np.ones(len(df), dtype=bool)
+    if not validos.any():
+        return df
+
+    estadisticas = estadisticas_demanda(df_ventas).reindex(df['producto'])
+    mu = df['pronostico_diario_promedio'].to_numpy(dtype=float)
+    mu = np.where(np.isnan(mu), estadisticas['demanda_diaria'].to_numpy(dtype=float), mu)
+    sigma = estadisticas['desviacion_diaria'].fillna(0).to_numpy(dtype=float)
+
+    costo = np.full(len(df), COSTO_UNITARIO_DEFECTO)
+    if inventario_df is not None and not inventario_df.empty and 'Costo Unitario' in inventario_df.columns:
+        costos = pd.to_numeric(inventario_df.drop_duplicates('Producto').set_index('Producto')['Costo Unitario'], errors='coerce')
+        costo = costos.reindex(df['producto']).fillna(COSTO_UNITARIO_DEFECTO).to_numpy(dtype=float)
+
+    niveles = nivel_servicio if nivel_servicio is not None else NIVEL_SERVICIO_ABC
+    if isinstance(niveles, dict):
+        clases = df['clasificacion_abc'] if 'clasificacion_abc' in df.columns else pd.Series('N/A', index=df.index)
+        servicio = clases.map(niveles).fillna(NIVEL_SERVICIO_DEFECTO).to_numpy(dtype=float)
+    else:
+        servicio = float(niveles)
+
+    politica = politica_optima(mu, sigma, costo, lead_time, servicio, costo_pedido, tasa_mantenimiento_anual)
+
+    df['nivel_servicio_objetivo'] = servicio
+    for columna in ('stock_seguridad', 'nivel_maximo', 'costo_anual_total'):
+        df[columna] = np.where(validos, np.round(politica[columna], 2), 0.0)
+    df['punto_reorden'] = np.where(validos, np.round(politica['punto_reorden'], 2), df['punto_reorden'])
+    df['cantidad_a_ordenar'] = np.where(validos, np.round(politica['eoq'], 2), df['cantidad_a_ordenar'])
+    return df
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def benchmark_politica(n_skus: int = 50000, repeticiones: int = 5) -> Dict[str, float]:
+    """Tiempo medio (ms) del motor sobre un catálogo sintético."""
+    rng = np.random.default_rng(0)
+    mu = rng.gamma(2.0, 5.0, n_skus)
+    sigma = mu * rng.uniform(0.2, 1.0, n_skus)
+    costo = rng.uniform(0.5, 50, n_skus)
+    servicio = rng.choice([0.9, 0.95, 0.98], n_skus)
+    politica_optima(mu, sigma, costo, 7, servicio)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        politica_optima(mu, sigma, costo, 7, servicio)
+    return {'n_skus': n_skus, 'ms': (time.perf_counter() - inicio) / repeticiones * 1000}
+
+
+if __name__ == "__main__":
+    print(benchmark_politica())
@@ -0,0 +1,241 @@
+# modules/precalculo.py
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from modules.core_analysis import (
+    calcular_orden_optima_compartida,
+    clasificar_abc,
+    procesar_multiple_productos
+)
+from modules.matriz_compartida import MatrizDemanda, construir_matriz, liberar_matriz, publicar_matriz
+from modules.modelo_global import procesar_modelo_global
+from modules.trazability import calcular_trazabilidad_inventario
+from modules.libro_movimientos import construir_libro
+from modules.politica_inventario import aplicar_politica
+
+# Sin imports de streamlit: este módulo lo usan tanto la app como el batch nocturno
+DIRECTORIO_DATOS = os.getenv("STOCK_ZERO_DATA_DIR", ".stock_zero")
+DIRECTORIO_PRECALCULO = os.path.join(DIRECTORIO_DATOS, "precalculo")
+
+ARCHIVO_RESULTADOS = "resultados.csv"
+ARCHIVO_TRAZABILIDAD = "trazabilidad.csv"
+ARCHIVO_META = "meta.json"
+
+# Modos de pronóstico: un Holt-Winters por producto o un modelo global del tenant
+MODELO_POR_PRODUCTO = 'holt_winters'
+MODELO_GLOBAL = 'global'
+MODELOS_PRONOSTICO = (MODELO_POR_PRODUCTO, MODELO_GLOBAL)
+
+# ============================================
+# CÁLCULO COMPLETO DE UN TENANT
+# ============================================
+
+def _optimizar_en_paralelo(matriz: MatrizDemanda, nombre_matriz: str, workers: int, lead_time: int, stock_seguridad_dias: int, frecuencia_estacional: int) -> pd.DataFrame:
+    """
+    Igual que `procesar_multiple_productos`, repartiendo productos entre procesos.
+    Los workers adjuntan la matriz publicada: a cada uno solo viaja (tenant, versión, producto).
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = [
+            pool.submit(calcular_orden_optima_compartida, nombre_matriz, matriz.version, producto, lead_time, stock_seguridad_dias, frecuencia_estacional)
+            for producto in matriz.productos
+        ]
+        resultados = [f.result() for f in futuros]
+    return clasificar_abc(pd.DataFrame(resultados))
+
+
+def _optimizar_planificado(matriz: MatrizDemanda, planificador, tenant: str, nombre_matriz: str, lead_time: int, stock_seguridad_dias: int, frecuencia_estacional: int) -> pd.DataFrame:
+    """Envía cada producto como unidad de lote al planificador compartido entre tenants."""
+    futuros = [
+        planificador.enviar(tenant, calcular_orden_optima_compartida, nombre_matriz, matriz.version, producto, lead_time, stock_seguridad_dias, frecuencia_estacional)
+        for producto in matriz.productos
+    ]
+    return clasificar_abc(pd.DataFrame([f.result() for f in futuros]))
+
+
+def calcular_tenant(
+    df_ventas: pd.DataFrame,
+    df_stock: Optional[pd.DataFrame],
+    lead_time: int = 7,
+    stock_seguridad_dias: int = 3,
+    frecuencia_estacional: int = 7,
+    stock_inicial: float = 0.0,
+    workers: int = 1,
+    planificador=None,
+    tenant: str = None,
+    modelo: str = MODELO_POR_PRODUCTO
+) -> Dict[str, pd.DataFrame]:
+    """
+    Optimización del catálogo y proyección de trazabilidad de cada producto.
+    La trazabilidad lee el stock de un libro de movimientos del tenant (entradas
+    y ventas registradas) que abre con `stock_inicial` en el primer movimiento
+    de cada producto. Con `planificador`
+    los ajustes comparten pool (con reparto justo) con los demás tenants. Con
+    `modelo='global'` se entrena un único modelo para todo el catálogo.
+
+    Cuando hay otros procesos, la matriz de demanda diaria se publica en disco
+    y los workers la adjuntan (mapa de memoria) en lugar de recibir DataFrames.
+    """
+    en_procesos = modelo != MODELO_GLOBAL and (planificador is not None or workers > 1)
+    nombre_matriz = str(tenant or 'local')
+    if en_procesos:
+        matriz = publicar_matriz(nombre_matriz, df_ventas, arrendar=True)
+    else:
+        matriz = construir_matriz(df_ventas)
+
+    try:
+        if modelo == MODELO_GLOBAL:
+            df_resultados = procesar_modelo_global(df_ventas, lead_time, stock_seguridad_dias, frecuencia_estacional)
+        elif planificador is not None:
+            df_resultados = _optimizar_planificado(matriz, planificador, tenant, nombre_matriz, lead_time, stock_seguridad_dias, frecuencia_estacional)
+        elif workers > 1:
+            df_resultados = _optimizar_en_paralelo(matriz, nombre_matriz, workers, lead_time, stock_seguridad_dias, frecuencia_estacional)
+        else:
+            df_resultados = procesar_multiple_productos(df_ventas, lead_time, stock_seguridad_dias, frecuencia_estacional)
+    finally:
+        liberar_matriz(matriz)
+
+    df_resultados = aplicar_politica(df_resultados, df_ventas, lead_time=lead_time)
+
+    if df_stock is None:
+        df_stock = pd.DataFrame(columns=['fecha', 'producto', 'cantidad_recibida'])
+
+    # Un libro de movimientos para todo el tenant: la trazabilidad consulta stock por fecha
+    libro = construir_libro(df_ventas, df_stock, stock_inicial=stock_inicial)
+    trazas = []
+    for fila in df_resultados[df_resultados['error'].isnull()].itertuples(index=False):
+        df_traza = calcular_trazabilidad_inventario(
+            df_ventas, df_stock, fila.producto, stock_inicial,
+            fila.punto_reorden, fila.cantidad_a_ordenar, fila.pronostico_diario_promedio, lead_time,
+            ventas_diarias=matriz.serie(fila.producto), libro=libro
+        )
+        if df_traza is not None:
+            df_traza.insert(0, 'producto', fila.producto)
+            trazas.append(df_traza)
+
+    df_trazabilidad = pd.concat(trazas, ignore_index=True) if trazas else pd.DataFrame()
+    return {'resultados': df_resultados, 'trazabilidad': df_trazabilidad}
+
+
+# ============================================
+# HUELLA DE LOS DATOS
+# ============================================
+
+def _hash_movimientos(df: Optional[pd.DataFrame], columna_valor: str) -> bytes:
+    if df is None or df.empty:
+        return b''
+    filas = pd.DataFrame({
+        'fecha': pd.to_datetime(df['fecha']).dt.normalize(),
+        'producto': df['producto'].astype(str),
+        'valor': pd.to_numeric(df[columna_valor], errors='coerce').astype(float),
+    })
+    # Hash por fila ordenado: el orden de descarga no cambia la huella
+    return np.sort(pd.util.hash_pandas_object(filas, index=False).to_numpy()).tobytes()
+
+
+def huella_datos(df_ventas: Optional[pd.DataFrame], df_stock: Optional[pd.DataFrame] = None) -> str:
+    """
+    Hash del contenido (fecha, producto, cantidad) de ventas y entradas de stock,
+    independiente del orden de las filas. Detecta también las correcciones en
+    el lugar, que no cambian la cantidad de filas.
+    """
+    digest = hashlib.sha256()
+    digest.update(_hash_movimientos(df_ventas, 'cantidad_vendida'))
+    digest.update(b'\0stock\0')
+    digest.update(_hash_movimientos(df_stock, 'cantidad_recibida'))
+    return digest.hexdigest()
+
+
+# ============================================
+# ALMACENAMIENTO
+# ============================================
+
+def _directorio_tenant(tenant_id: str, directorio: str) -> str:
+    return os.path.join(directorio, str(tenant_id))
+
+
+def _escribir_csv(df: pd.DataFrame, ruta: str):
+    df.to_csv(ruta, index=False)
+
+
+def _escribir_atomico(ruta: str, escribir):
+    temporal = ruta + '.tmp'
+    escribir(temporal)
+    os.replace(temporal, ruta)
+
+
+def guardar_precalculo(tenant_id: str, calculo: Dict[str, pd.DataFrame], meta: Dict, directorio: str = DIRECTORIO_PRECALCULO) -> str:
+    """Guarda resultados, trazabilidad y metadatos del tenant; meta.json se escribe al final."""
+    carpeta = _directorio_tenant(tenant_id, directorio)
+    os.makedirs(carpeta, exist_ok=True)
+    _escribir_atomico(os.path.join(carpeta, ARCHIVO_RESULTADOS), lambda r: _escribir_csv(calculo['resultados'], r))
+    _escribir_atomico(os.path.join(carpeta, ARCHIVO_TRAZABILIDAD), lambda r: _escribir_csv(calculo['trazabilidad'], r))
+
+    meta = dict(meta, tenant=str(tenant_id), generado=datetime.now().isoformat(timespec='seconds'))
+
+    def escribir_meta(ruta):
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    _escribir_atomico(os.path.join(carpeta, ARCHIVO_META), escribir_meta)
+    return carpeta
+
+
+def guardar_backtesting(tenant_id: str, backtesting: Dict[str, pd.DataFrame], directorio: str = DIRECTORIO_PRECALCULO) -> str:
+    """Guarda las métricas de backtesting (por producto y por clase ABC) junto al precálculo."""
+    carpeta = _directorio_tenant(tenant_id, directorio)
+    os.makedirs(carpeta, exist_ok=True)
+    for nombre, df in backtesting.items():
+        _escribir_atomico(os.path.join(carpeta, f"backtesting_{nombre}.csv"), lambda r, df=df: _escribir_csv(df, r))
+    return carpeta
+
+
+def leer_meta(tenant_id: str, directorio: str = DIRECTORIO_PRECALCULO) -> Optional[Dict]:
+    """Metadatos del último precálculo del tenant, o None si no existe."""
+    ruta = os.path.join(_directorio_tenant(tenant_id, directorio), ARCHIVO_META)
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def cargar_precalculo(
+    tenant_id: str,
+    huella: Optional[str] = None,
+    parametros: Optional[Dict] = None,
+    directorio: str = DIRECTORIO_PRECALCULO
+) -> Optional[Dict[str, pd.DataFrame]]:
+    """
+    Resultados precalculados del tenant. Si se indica la `huella` de los datos
+    actuales (`huella_datos`) o los `parametros` de la sesión (lead_time,
+    frecuencia_estacional, modelo) y alguno no coincide con los del
+    precálculo, se consideran desactualizados (None).
+    """
+    meta = leer_meta(tenant_id, directorio)
+    if meta is None:
+        return None
+    if huella is not None and meta.get('huella_datos') != huella:
+        return None
+    if parametros and any(meta.get(nombre) != valor for nombre, valor in parametros.items()):
+        return None
+
+    carpeta = _directorio_tenant(tenant_id, directorio)
+    try:
+        df_resultados = pd.read_csv(os.path.join(carpeta, ARCHIVO_RESULTADOS), dtype={'producto': str})
+    except (OSError, ValueError):
+        return None
+    try:
+        df_trazabilidad = pd.read_csv(os.path.join(carpeta, ARCHIVO_TRAZABILIDAD), parse_dates=['Fecha'], dtype={'producto': str})
+    except (OSError, ValueError):
+        # Sin productos proyectables el CSV queda vacío
+        df_trazabilidad = pd.DataFrame()
+    # Las filas sin error se leen como NaN; el resto del código espera None
+    df_resultados['error'] = df_resultados['error'].astype(object).where(df_resultados['error'].notna(), None)
+    return {'resultados': df_resultados, 'trazabilidad': df_trazabilidad, 'meta': meta}
@@ -0,0 +1,204 @@
+# modules/recetas_store.py
+
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+COLUMNAS_RECETAS = ['Producto Final', 'Categoría', 'Precio Venta', 'Tiempo Prep (min)', 'Activo']
+COLUMNAS_INGREDIENTES = ['Producto Final', 'Ingrediente', 'Cantidad Requerida', 'Unidad']
+
+# ============================================
+# REPOSITORIO INDEXADO DE RECETAS
+# ============================================
+
+class RepositorioRecetas:
+    """
+    Almacén de recetas e ingredientes indexado por receta y por (receta, ingrediente).
+
+    Las altas, modificaciones y bajas son O(1) sobre diccionarios; los DataFrames
+    solo se materializan cuando una vista los pide y se cachean por versión.
+    """
+
+    def __init__(self):
+        self._recetas: Dict[str, Dict] = {}
+        self._ingredientes: Dict[Tuple[str, str], Dict] = {}
+        # Índice receta -> ingredientes (dict para conservar el orden de inserción)
+        self._por_receta: Dict[str, Dict[str, None]] = {}
+        self.version = 0
+        self._cache: Dict[str, pd.DataFrame] = {}
+
+    @classmethod
+    def desde_dataframes(cls, df_recetas: pd.DataFrame, df_ingredientes: pd.DataFrame) -> 'RepositorioRecetas':
+        """Construye el repositorio a partir de los DataFrames de recetas e ingredientes."""
+        repo = cls()
+        if df_recetas is not None:
+            for fila in df_recetas.to_dict('records'):
+                repo.upsert_receta(fila)
+        if df_ingredientes is not None:
+            for fila in df_ingredientes.to_dict('records'):
+                repo.upsert_ingrediente(fila)
+        return repo
+
+    def _marcar_cambio(self):
+        self.version += 1
+        self._cache.clear()
+
+    # --- Recetas ---
+
+    def upsert_receta(self, fila: Dict) -> bool:
+        """Inserta o actualiza una receta. Devuelve True si hubo cambios."""
+        nombre = fila.get('Producto Final')
+        if nombre is None or pd.isna(nombre) or str(nombre).strip() == '':
+            return False
+        nueva = {col: fila.get(col) for col in COLUMNAS_RECETAS}
+        if _filas_iguales(self._recetas.get(nombre), nueva):
+            return False
+        self._recetas[nombre] = nueva
+        self._por_receta.setdefault(nombre, {})
+        self._marcar_cambio()
+        return True
+
+    def eliminar_receta(self, nombre: str) -> bool:
+        """Elimina una receta junto con sus ingredientes."""
+        if nombre not in self._recetas:
+            return False
+        del self._recetas[nombre]
+        for ingrediente in self._por_receta.pop(nombre, {}):
+            self._ingredientes.pop((nombre, ingrediente), None)
+        self._marcar_cambio()
+        return True
+
+    def existe_receta(self, nombre: str) -> bool:
+        return nombre in self._recetas
+
+    def nombres_recetas(self) -> List[str]:
+        return list(self._recetas.keys())
+
+    # --- Ingredientes ---
+
+    def upsert_ingrediente(self, fila: Dict) -> bool:
+        """Inserta o actualiza un ingrediente de una receta. Devuelve True si hubo cambios."""
+        receta = fila.get('Producto Final')
+        ingrediente = fila.get('Ingrediente')
+        if receta is None or ingrediente is None or pd.isna(receta) or pd.isna(ingrediente):
+            return False
+        clave = (receta, ingrediente)
+        nueva = {col: fila.get(col) for col in COLUMNAS_INGREDIENTES}
+        if _filas_iguales(self._ingredientes.get(clave), nueva):
+            return False
+        self._ingredientes[clave] = nueva
+        self._por_receta.setdefault(receta, {})[ingrediente] = None
+        self._marcar_cambio()
+        return True
+
+    def eliminar_ingrediente(self, receta: str, ingrediente: str) -> bool:
+        """Elimina un ingrediente de una receta."""
+        if self._ingredientes.pop((receta, ingrediente), None) is None:
+            return False
+        self._por_receta.get(receta, {}).pop(ingrediente, None)
+        self._marcar_cambio()
+        return True
+
+    def aplicar_edicion_ingredientes(self, receta: str, df_editado: pd.DataFrame) -> bool:
+        """
+        Aplica el resultado de un editor de ingredientes de UNA receta como diferencias:
+        solo se tocan las filas agregadas, modificadas o eliminadas.
+        """
+        filas_editadas = {}
+        for fila in df_editado.to_dict('records'):
+            ingrediente = fila.get('Ingrediente')
+            if ingrediente is None or pd.isna(ingrediente):
+                continue
+            fila['Producto Final'] = receta
+            filas_editadas[ingrediente] = fila
+
+        hubo_cambios = False
+        for ingrediente in list(self._por_receta.get(receta, {})):
+            if ingrediente not in filas_editadas:
+                hubo_cambios |= self.eliminar_ingrediente(receta, ingrediente)
+        for fila in filas_editadas.values():
+            hubo_cambios |= self.upsert_ingrediente(fila)
+        return hubo_cambios
+
+    def _renombres(self, filas: List[Dict]) -> List[Tuple[int, str, str]]:
+        """(posición, nombre previo, nombre nuevo) de las filas renombradas en el editor."""
+        nombres_previos = self.nombres_recetas()
+        # El editor conserva el orden de recetas_df(): un nombre distinto en la misma posición es un renombre
+        if len(filas) != len(nombres_previos):
+            return []
+        return [
+            (i, previo, fila.get('Producto Final'))
+            for i, (previo, fila) in enumerate(zip(nombres_previos, filas))
+            if fila.get('Producto Final') != previo and not pd.isna(fila.get('Producto Final'))
+        ]
+
+    def renombres_en_conflicto(self, df_editado: pd.DataFrame) -> List[Tuple[str, str]]:
+        """Renombres del editor a un nombre que ya usa otra receta (no se aplican)."""
+        return [(previo, nuevo) for _, previo, nuevo in self._renombres(df_editado.to_dict('records')) if nuevo in self._recetas]
+
+    def aplicar_edicion_recetas(self, df_editado: pd.DataFrame) -> bool:
+        """
+        Aplica la edición de la tabla de recetas (las columnas calculadas se ignoran).
+        Las filas renombradas a un nombre existente se descartan enteras: ni se
+        pisa la otra receta ni cambia la original (ver `renombres_en_conflicto`).
+        """
+        hubo_cambios = False
+        filas = df_editado.to_dict('records')
+        descartadas = set()
+        for posicion, previo, nuevo in self._renombres(filas):
+            if nuevo in self._recetas:
+                descartadas.add(posicion)
+            else:
+                hubo_cambios |= self.renombrar_receta(previo, nuevo)
+        for posicion, fila in enumerate(filas):
+            if posicion not in descartadas:
+                hubo_cambios |= self.upsert_receta(fila)
+        return hubo_cambios
+
+    def renombrar_receta(self, nombre: str, nuevo_nombre: str) -> bool:
+        """Renombra una receta y mueve sus ingredientes a la nueva clave."""
+        if nombre not in self._recetas or nuevo_nombre in self._recetas:
+            return False
+        # Se conserva la posición: el editor re-aplica sus cambios por índice de fila
+        receta = self._recetas[nombre]
+        receta['Producto Final'] = nuevo_nombre
+        self._recetas = {(nuevo_nombre if k == nombre else k): v for k, v in self._recetas.items()}
+        ingredientes = self._por_receta.pop(nombre, {})
+        for ingrediente in ingredientes:
+            fila = self._ingredientes.pop((nombre, ingrediente))
+            fila['Producto Final'] = nuevo_nombre
+            self._ingredientes[(nuevo_nombre, ingrediente)] = fila
+        self._por_receta[nuevo_nombre] = ingredientes
+        self._marcar_cambio()
+        return True
+
+    # --- Vistas materializadas ---
+
+    def recetas_df(self) -> pd.DataFrame:
+        """DataFrame de recetas, cacheado hasta el próximo cambio."""
+        if 'recetas' not in self._cache:
+            self._cache['recetas'] = pd.DataFrame(list(self._recetas.values()), columns=COLUMNAS_RECETAS)
+        return self._cache['recetas']
+
+    def ingredientes_df(self) -> pd.DataFrame:
+        """DataFrame con todos los ingredientes, cacheado hasta el próximo cambio."""
+        if 'ingredientes' not in self._cache:
+            self._cache['ingredientes'] = pd.DataFrame(list(self._ingredientes.values()), columns=COLUMNAS_INGREDIENTES)
+        return self._cache['ingredientes']
+
+    def ingredientes_de(self, receta: str) -> pd.DataFrame:
+        """DataFrame con los ingredientes de una sola receta (sin recorrer el resto)."""
+        filas = [self._ingredientes[(receta, ing)] for ing in self._por_receta.get(receta, {})]
+        return pd.DataFrame(filas, columns=COLUMNAS_INGREDIENTES)
+
+
+def _filas_iguales(actual: Optional[Dict], nueva: Dict) -> bool:
+    """Compara dos filas tratando NaN == NaN como iguales."""
+    if actual is None:
+        return False
+    for col, valor in nueva.items():
+        previo = actual.get(col)
+        if pd.isna(previo) and pd.isna(valor):
+            continue
+        if previo != valor:
+            return False
+    return True
@@ -4,6 +4,8 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from typing import Dict, List
+from modules.recetas_store import RepositorioRecetas
+from modules.instrumentacion import medir
 
 # ============================================
 # FUNCIONES AUXILIARES PARA RECETAS
@@ -49,6 +51,7 @@ def generar_ingredientes_base(use_example_data: bool = False) -> pd.DataFrame:
     return pd.DataFrame(columns=['Producto Final', 'Ingrediente', 'Cantidad Requerida', 'Unidad'])
 
 
+@medir()
 def calcular_costo_receta(
     df_receta_ingredientes: pd.DataFrame,
     df_inventario: pd.DataFrame,
@@ -101,6 +104,7 @@ def calcular_margen_utilidad(precio_venta: float, costo_total: float) -> Dict[st
     }
 
 
+@medir()
 def verificar_disponibilidad_receta(
     df_receta_ingredientes: pd.DataFrame,
     df_inventario: pd.DataFrame,
@@ -163,20 +167,22 @@ def verificar_disponibilidad_receta(
 # INTERFAZ DE RECETAS
 # ============================================
 
+@medir()
 def recetas_app():
     """Componente completo para la gestión de recetas y productos."""
     
     st.header("👨‍🍳 Gestión de Recetas y Productos")
     
     # Inicializar session state
-    if 'recetas_df' not in st.session_state:
-        st.session_state['recetas_df'] = generar_recetas_base(use_example_data=True)
+    if 'recetas_repo' not in st.session_state:
+        st.session_state['recetas_repo'] = RepositorioRecetas.desde_dataframes(
+            generar_recetas_base(use_example_data=True),
+            generar_ingredientes_base(use_example_data=True)
+        )
     
-    if 'ingredientes_recetas_df' not in st.session_state:
-        st.session_state['ingredientes_recetas_df'] = generar_ingredientes_base(use_example_data=True)
-    
-    df_recetas = st.session_state['recetas_df']
-    df_ingredientes = st.session_state['ingredientes_recetas_df']
+    repo: RepositorioRecetas = st.session_state['recetas_repo']
+    df_recetas = repo.recetas_df()
+    df_ingredientes = repo.ingredientes_df()
     df_inventario = st.session_state.get('inventario_df', pd.DataFrame())
     
     # Crear pestañas internas
@@ -246,10 +252,11 @@ def recetas_app():
                 }
             )
             
-            if not edited_recetas.equals(df_recetas):
-                # Eliminar columnas calculadas antes de guardar
-                cols_to_keep = ['Producto Final', 'Categoría', 'Precio Venta', 'Tiempo Prep (min)', 'Activo']
-                st.session_state['recetas_df'] = edited_recetas[[col for col in cols_to_keep if col in edited_recetas.columns]]
+            # Un nombre que ya existe no se aplica: pisaría la otra receta
+            for previo, nuevo in repo.renombres_en_conflicto(edited_recetas):
+                st.warning(f"⚠️ No se puede renombrar '{previo}' a '{nuevo}': ya existe una receta con ese nombre.")
+            # Solo se aplican las filas que cambiaron (las columnas calculadas se ignoran)
+            repo.aplicar_edicion_recetas(edited_recetas)
         
         st.markdown("---")
         st.subheader("➕ Agregar Nueva Receta")
@@ -264,14 +271,13 @@ def recetas_app():
         
         if st.button("➕ Agregar Receta", type="primary"):
             if nuevo_nombre:
-                nueva_receta = pd.DataFrame([{
+                repo.upsert_receta({
                     'Producto Final': nuevo_nombre,
                     'Categoría': nueva_categoria,
                     'Precio Venta': nuevo_precio,
                     'Tiempo Prep (min)': nuevo_tiempo,
                     'Activo': True
-                }])
-                st.session_state['recetas_df'] = pd.concat([df_recetas, nueva_receta], ignore_index=True)
+                })
                 st.success(f"✅ Receta '{nuevo_nombre}' agregada exitosamente!")
                 st.rerun()
             else:
@@ -296,9 +302,7 @@ def recetas_app():
                 st.markdown(f"### Ingredientes de: **{producto_seleccionado}**")
                 
                 # Mostrar ingredientes actuales
-                ingredientes_producto = df_ingredientes[
-                    df_ingredientes['Producto Final'] == producto_seleccionado
-                ]
+                ingredientes_producto = repo.ingredientes_de(producto_seleccionado)
                 
                 if ingredientes_producto.empty:
                     st.info("Esta receta no tiene ingredientes asignados todavía.")
@@ -311,14 +315,8 @@ def recetas_app():
                         num_rows="dynamic"
                     )
                     
-                    # Actualizar en session state
-                    otros_ingredientes = df_ingredientes[
-                        df_ingredientes['Producto Final'] != producto_seleccionado
-                    ]
-                    st.session_state['ingredientes_recetas_df'] = pd.concat(
-                        [otros_ingredientes, edited_ingredientes], 
-                        ignore_index=True
-                    )
+                    # Actualizar en el repositorio solo las filas que cambiaron
+                    repo.aplicar_edicion_ingredientes(producto_seleccionado, edited_ingredientes)
                 
                 st.markdown("---")
                 st.markdown("### ➕ Agregar Ingrediente a esta Receta")
@@ -356,16 +354,12 @@ def recetas_app():
                         nueva_unidad = st.text_input("Unidad", value=unidad_detectada, disabled=True)
                     
                     if st.button("➕ Agregar Ingrediente"):
-                        nuevo_ing_df = pd.DataFrame([{
+                        repo.upsert_ingrediente({
                             'Producto Final': producto_seleccionado,
                             'Ingrediente': nuevo_ingrediente,
                             'Cantidad Requerida': nueva_cantidad,
                             'Unidad': nueva_unidad
-                        }])
-                        st.session_state['ingredientes_recetas_df'] = pd.concat(
-                            [df_ingredientes, nuevo_ing_df], 
-                            ignore_index=True
-                        )
+                        })
                         st.success(f"✅ Ingrediente agregado a {producto_seleccionado}")
                         st.rerun()
     
@@ -0,0 +1,163 @@
+# modules/recursos.py
+
+import uuid
+import streamlit as st
+from typing import Dict
+import pandas as pd
+from modules.cache_tenant import CacheDatasetsTenant
+from modules.memoria_sesiones import GestorMemoriaSesiones
+from modules.datos_supabase import descargar_datos_tenant
+from modules.trabajos import GestorTrabajos
+from modules.metricas import iniciar_exportacion, medidor, registrar_colector
+
+# Conexiones HTTP keep-alive reutilizadas por todas las sesiones del proceso
+MAX_CONEXIONES = 20
+MAX_CONEXIONES_KEEPALIVE = 10
+
+# ============================================
+# RECURSOS DE PROCESO (COMPARTIDOS ENTRE SESIONES)
+# ============================================
+
+@st.cache_resource
+def obtener_pool_http():
+    """Cliente httpx único del proceso, con pool de conexiones keep-alive."""
+    import httpx
+
+    return httpx.Client(
+        limits=httpx.Limits(max_connections=MAX_CONEXIONES, max_keepalive_connections=MAX_CONEXIONES_KEEPALIVE),
+        timeout=httpx.Timeout(120.0)
+    )
+
+
+@st.cache_resource
+def obtener_cache_datasets() -> CacheDatasetsTenant:
+    """Cache de datasets por tenant, única para todo el proceso."""
+    return CacheDatasetsTenant()
+
+
+@st.cache_resource
+def obtener_gestor_trabajos() -> GestorTrabajos:
+    """Registro de trabajos en segundo plano, único para todo el proceso."""
+    return GestorTrabajos()
+
+
+@st.cache_resource
+def obtener_gestor_memoria() -> GestorMemoriaSesiones:
+    """Gobernador de memoria de las sesiones, único para todo el proceso."""
+    from streamlit.runtime import Runtime
+
+    def activa(sesion_id: str) -> bool:
+        return not Runtime.exists() or Runtime.instance().is_active_session(sesion_id)
+
+    return GestorMemoriaSesiones(compartidos=obtener_cache_datasets().ids_frames, activa=activa)
+
+
+@st.cache_resource
+def iniciar_metricas() -> Dict:
+    """
+    Arranca (una vez por proceso) la exportación de métricas Prometheus según
+    STOCK_ZERO_METRICS_FILE / STOCK_ZERO_METRICS_PORT / STOCK_ZERO_METRICS_HOST,
+    y publica el estado de la cache de datasets en cada exportación. Un puerto
+    ocupado no rompe la app: queda cacheado un exportador sin servidor HTTP.
+    """
+    tenants = medidor('stockzero_cache_tenants', 'Tenants con dataset en la cache compartida')
+    filas = medidor('stockzero_cache_rows', 'Filas en memoria en la cache compartida')
+    sesiones = medidor('stockzero_sessions', 'Sesiones registradas en el gestor de memoria')
+    memoria_sesiones = medidor('stockzero_session_frames_bytes', 'Bytes de frames de sesión por ubicación', ('ubicacion',))
+
+    def colectar_cache():
+        resumen = obtener_cache_datasets().resumen()
+        tenants.set(len(resumen))
+        filas.set(resumen['filas'].sum() if not resumen.empty else 0)
+
+    def colectar_memoria():
+        resumen = obtener_gestor_memoria().resumen()
+        sesiones.set(len(resumen))
+        memoria_sesiones.set(resumen['memoria_mb'].sum() * 2**20, ubicacion='memoria')
+        memoria_sesiones.set(resumen['disco_mb'].sum() * 2**20, ubicacion='disco')
+
+    registrar_colector(colectar_cache)
+    registrar_colector(colectar_memoria)
+    return iniciar_exportacion()
+
+
+def crear_cliente_supabase(url: str, key: str):
+    """Crea un cliente Supabase que reutiliza el pool HTTP del proceso."""
+    from supabase import create_client, ClientOptions
+
+    try:
+        opciones = ClientOptions(httpx_client=obtener_pool_http())
+    except TypeError:
+        # Versiones de supabase sin soporte para inyectar el cliente httpx
+        opciones = ClientOptions()
+    return create_client(url, key, options=opciones)
+
+
+def cliente_supabase(url: str, key: str):
+    """
+    Cliente Supabase de la sesión. Se crea una sola vez por sesión (no en cada
+    rerun) sobre el pool HTTP compartido; no se comparte entre sesiones porque
+    guarda el token del usuario autenticado.
+    """
+    if st.session_state.get('_supabase_cliente') is None:
+        st.session_state['_supabase_cliente'] = crear_cliente_supabase(url, key)
+    return st.session_state['_supabase_cliente']
+
+
+def id_sesion() -> str:
+    """Identificador estable de la sesión de navegador actual."""
+    if 'sesion_id' not in st.session_state:
+        st.session_state['sesion_id'] = uuid.uuid4().hex
+    return st.session_state['sesion_id']
+
+
+def gobernar_memoria_sesion():
+    """
+    Al inicio de cada rerun: devuelve a memoria los frames que esta sesión tenía
+    en disco, registra su huella y baja a disco sesiones inactivas si el
+    proceso supera el presupuesto.
+    """
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    # El SafeSessionState del contexto cambia en cada rerun; el estado de la sesión es el que envuelve
+    estado = getattr(ctx.session_state, '_state', ctx.session_state)
+    usuario = getattr(st.session_state.get('user'), 'email', None)
+    obtener_gestor_memoria().acceder(ctx.session_id, estado, usuario)
+
+
+# ============================================
+# DATASETS DEL TENANT
+# ============================================
+
+def cargar_datos_compartidos(cliente, user_id: str) -> Dict[str, pd.DataFrame]:
+    """
+    Datasets `ventas` y `stock` del tenant desde la cache compartida: la primera
+    sesión los descarga y el resto recibe las mismas instancias (solo lectura).
+    """
+    cache = obtener_cache_datasets()
+    datos = cache.obtener(user_id, lambda: descargar_datos_tenant(cliente, user_id), id_sesion())
+    st.session_state['datos_version'] = cache.version(user_id)
+    return datos
+
+
+def datos_compartidos_vigentes(user_id: str) -> bool:
+    """True si la sesión sigue con la versión vigente del dataset de su tenant."""
+    return obtener_cache_datasets().vigente(user_id, st.session_state.get('datos_version'))
+
+
+def invalidar_datos_tenant(user_id: str):
+    """Fuerza la recarga del dataset del tenant en todas sus sesiones."""
+    obtener_cache_datasets().invalidar(user_id)
+
+
+def liberar_datos_sesion(user_id: str):
+    """Libera la referencia de esta sesión al dataset compartido y sus frames en disco (logout)."""
+    obtener_cache_datasets().liberar(user_id, id_sesion())
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        obtener_gestor_memoria().liberar(ctx.session_id)
@@ -0,0 +1,151 @@
+# modules/reduccion_series.py
+
+import pandas as pd
+import numpy as np
+from typing import List, Optional, Union
+
+# Por encima de este número de puntos se usan trazas WebGL (Scattergl) en Plotly
+UMBRAL_WEBGL = 1000
+# Presupuesto de puntos por serie (~1 punto por píxel horizontal)
+PUNTOS_GRAFICO_DEFECTO = UMBRAL_WEBGL
+
+# ============================================
+# LARGEST-TRIANGLE-THREE-BUCKETS (LTTB)
+# ============================================
+
+def puntos_por_ancho(ancho_px: int, puntos_por_px: float = 1.0) -> int:
+    """Presupuesto de puntos para un gráfico de `ancho_px` píxeles."""
+    return max(3, int(ancho_px * puntos_por_px))
+
+
+def _a_numerico(x) -> np.ndarray:
+    """Convierte el eje X (fechas o números) a float para el cálculo de áreas."""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    if x.dtype == object:
+        return pd.to_datetime(pd.Series(x)).to_numpy().astype('datetime64[ns]').astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+def lttb_indices(x, y, n_puntos: int) -> np.ndarray:
+    """
+    Índices elegidos por Largest-Triangle-Three-Buckets: conserva el primer y último
+    punto y, en cada bucket, el punto que forma el triángulo de mayor área con el
+    punto elegido anterior y el promedio del bucket siguiente.
+    """
+    n = len(y)
+    if n_puntos >= n or n_puntos < 3:
+        return np.arange(n)
+
+    xs = _a_numerico(x)
+    ys = np.nan_to_num(np.asarray(y, dtype=float))
+
+    limites = np.linspace(1, n - 1, n_puntos - 1).astype(int)
+    seleccion = np.empty(n_puntos, dtype=np.int64)
+    seleccion[0] = 0
+    seleccion[-1] = n - 1
+    anterior = 0
+
+    for i in range(n_puntos - 2):
+        inicio, fin = limites[i], limites[i + 1]
+        sig_inicio, sig_fin = limites[i + 1], (limites[i + 2] if i + 2 < len(limites) else n)
+        x_prom = xs[sig_inicio:sig_fin].mean()
+        y_prom = ys[sig_inicio:sig_fin].mean()
+
+        xa, ya = xs[anterior], ys[anterior]
+        areas = np.abs((xa - x_prom) * (ys[inicio:fin] - ya) - (xa - xs[inicio:fin]) * (y_prom - ya))
+        anterior = inicio + int(np.argmax(areas))
+        seleccion[i + 1] = anterior
+
+    return seleccion
+
+
+def indices_reducidos(x, y, n_puntos: int = PUNTOS_GRAFICO_DEFECTO, preservar_extremos: bool = True) -> np.ndarray:
+    """
+    Índices a graficar dentro del presupuesto `n_puntos`. Con `preservar_extremos`
+    se añade el mínimo y el máximo de cada bucket, de modo que los valles de
+    quiebre de stock (stock en cero) y los picos de venta nunca desaparecen.
+    """
+    n = len(y)
+    if n <= n_puntos:
+        return np.arange(n)
+    if not preservar_extremos:
+        return lttb_indices(x, y, n_puntos)
+
+    # Un tercio del presupuesto para LTTB y el resto para mínimos/máximos por bucket
+    n_buckets = max(3, n_puntos // 3)
+    base = lttb_indices(x, y, n_buckets)
+
+    ys = np.nan_to_num(np.asarray(y, dtype=float))
+    limites = np.linspace(0, n, n_buckets + 1).astype(int)
+    segmentos = [(a, b) for a, b in zip(limites[:-1], limites[1:]) if b > a]
+    minimos = [a + int(np.argmin(ys[a:b])) for a, b in segmentos]
+    maximos = [a + int(np.argmax(ys[a:b])) for a, b in segmentos]
+
+    return np.unique(np.concatenate([base, minimos, maximos]))
+
+
+def reducir_serie(serie: pd.Series, n_puntos: int = PUNTOS_GRAFICO_DEFECTO, preservar_extremos: bool = True) -> pd.Series:
+    """Reduce una Serie indexada por fecha conservando su forma visual."""
+    if len(serie) <= n_puntos:
+        return serie
+    idx = indices_reducidos(serie.index.to_numpy(), serie.to_numpy(), n_puntos, preservar_extremos)
+    return serie.iloc[idx]
+
+
+def reducir_dataframe(
+    df: pd.DataFrame,
+    x_col: str,
+    y_cols: Union[str, List[str]],
+    n_puntos: int = PUNTOS_GRAFICO_DEFECTO,
+    preservar_extremos: bool = True
+) -> pd.DataFrame:
+    """
+    Reduce un DataFrame a las filas necesarias para dibujar `y_cols` contra `x_col`.
+    Con varias columnas se toma la unión de los índices elegidos para cada una.
+    """
+    if len(df) <= n_puntos:
+        return df
+    if isinstance(y_cols, str):
+        y_cols = [y_cols]
+    x = df[x_col].to_numpy()
+    presupuesto = max(3, n_puntos // len(y_cols))
+    idx = np.unique(np.concatenate([
+        indices_reducidos(x, df[col].to_numpy(), presupuesto, preservar_extremos) for col in y_cols
+    ]))
+    return df.iloc[idx]
+
+
+def anchos_barras(x) -> np.ndarray:
+    """
+    Ancho de cada barra de una serie con espaciado irregular (p. ej. reducida
+    con LTTB): cada barra cubre desde el punto medio con su vecino anterior
+    hasta el punto medio con el siguiente, de modo que las barras se tocan sin
+    solaparse. En días para fechas; en unidades de `x` para números.
+    """
+    xs = _a_numerico(x)
+    if np.issubdtype(np.asarray(x).dtype, np.datetime64) or np.asarray(x).dtype == object:
+        xs = xs / 86_400e9
+    if len(xs) < 2:
+        return np.ones(len(xs))
+    pasos = np.diff(xs)
+    # En los extremos la barra es simétrica con su único vecino
+    return (np.concatenate([pasos[:1], pasos]) + np.concatenate([pasos, pasos[-1:]])) / 2
+
+
+# ============================================
+# TRAZAS PLOTLY
+# ============================================
+
+def scatter_trace(x, y, umbral_webgl: int = UMBRAL_WEBGL, n_original: Optional[int] = None, **kwargs):
+    """
+    Crea una traza Scatter o, por encima del umbral, una traza WebGL (Scattergl).
+    Para una serie reducida, `n_original` (su largo antes de reducir) decide el
+    tipo de traza: la reducida queda en el presupuesto, que no supera el umbral.
+    """
+    import plotly.graph_objects as go
+
+    if (len(x) if n_original is None else n_original) > umbral_webgl:
+        return go.Scattergl(x=x, y=y, **kwargs)
+    return go.Scatter(x=x, y=y, **kwargs)
@@ -0,0 +1,197 @@
+# modules/sincronizacion.py
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+import pandas as pd
+from modules.precalculo import DIRECTORIO_DATOS
+
+ARCHIVO_SINCRONIZACION = os.path.join(DIRECTORIO_DATOS, "sincronizacion.db")
+
+# Tablas sincronizables y columnas que identifican una fila (sin el tenant); el resto se guarda tal cual
+CLAVES_TABLAS = {
+    'ventas': ('fecha', 'producto'),
+    'stock': ('fecha', 'producto'),
+    'inventario': ('producto',),
+    'clients': ('id',),
+}
+
+# Filas devueltas por respuesta; el cliente pide de nuevo mientras `hay_mas`
+MAX_FILAS_POR_RESPUESTA = 5000
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS filas (
+    tenant TEXT NOT NULL,
+    tabla TEXT NOT NULL,
+    clave TEXT NOT NULL,
+    datos TEXT,
+    seq INTEGER NOT NULL,
+    borrada INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (tenant, tabla, clave)
+);
+CREATE INDEX IF NOT EXISTS filas_por_seq ON filas (tenant, tabla, seq);
+CREATE TABLE IF NOT EXISTS secuencias (
+    tenant TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+"""
+
+# ============================================
+# FORMATO COLUMNAR
+# ============================================
+
+def columnas_a_filas(columnar: Dict[str, list]) -> List[Dict]:
+    """{'col': [v1, v2], ...} -> [{'col': v1}, {'col': v2}]."""
+    if not columnar:
+        return []
+    nombres = list(columnar)
+    largos = {len(columnar[c]) for c in nombres}
+    if len(largos) != 1:
+        raise ValueError("Las columnas deben tener el mismo largo")
+    return [dict(zip(nombres, valores)) for valores in zip(*(columnar[c] for c in nombres))]
+
+
+def filas_a_columnas(filas: List[Dict]) -> Dict[str, list]:
+    """Inverso de `columnas_a_filas`; las columnas ausentes en una fila quedan en None."""
+    nombres = []
+    for fila in filas:
+        for nombre in fila:
+            if nombre not in nombres:
+                nombres.append(nombre)
+    return {nombre: [fila.get(nombre) for fila in filas] for nombre in nombres}
+
+
+def _clave(fila: Dict, columnas_clave: Sequence[str]) -> str:
+    try:
+        return json.dumps([fila[c] for c in columnas_clave], ensure_ascii=False)
+    except KeyError as e:
+        raise ValueError(f"Falta la columna clave {e}")
+
+
+# ============================================
+# ALMACÉN CON SECUENCIA POR TENANT
+# ============================================
+
+class AlmacenSincronizacion:
+    """
+    Filas de cada tenant en SQLite con un número de secuencia por tenant que
+    crece en cada cambio. Los borrados quedan como lápidas con su secuencia
+    para que los clientes también los reciban. Pedir los cambios desde una
+    secuencia usa el índice (tenant, tabla, seq): el costo depende de los
+    cambios, no del tamaño de la tabla.
+    """
+
+    def __init__(self, ruta: str = ARCHIVO_SINCRONIZACION):
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.executescript(_ESQUEMA)
+        self._lock = threading.Lock()
+
+    def secuencia(self, tenant: str) -> int:
+        fila = self._conexion.execute("SELECT seq FROM secuencias WHERE tenant = ?", (tenant,)).fetchone()
+        return fila[0] if fila else 0
+
+    def sincronizar(
+        self,
+        tenant: str,
+        tabla: str,
+        desde: int = 0,
+        cambios: Optional[Dict[str, list]] = None,
+        borradas: Optional[Dict[str, list]] = None,
+        limite: int = MAX_FILAS_POR_RESPUESTA
+    ) -> Dict:
+        """
+        Aplica los cambios del cliente (filas y claves borradas, en columnas) y
+        devuelve las filas del servidor con secuencia mayor que `desde`, sin
+        repetir las que el cliente acaba de enviar. Las filas idénticas a las
+        guardadas no generan secuencia nueva. Con `reiniciar`, el cliente debe
+        descartar su copia local y quedarse con lo recibido.
+        """
+        columnas_clave = CLAVES_TABLAS.get(tabla)
+        if columnas_clave is None:
+            raise ValueError(f"Tabla no sincronizable: {tabla}")
+        filas = columnas_a_filas(cambios or {})
+        claves_borradas = [_clave(f, columnas_clave) for f in columnas_a_filas(borradas or {})]
+
+        with self._lock, self._conexion:
+            seq = self.secuencia(tenant)
+            seq_inicial = seq
+            # Un cursor adelantado (almacén recreado) obliga al cliente a recargar todo
+            reiniciar = desde > seq_inicial
+            if reiniciar:
+                desde = 0
+            for fila in filas:
+                clave = _clave(fila, columnas_clave)
+                datos = json.dumps(fila, ensure_ascii=False, sort_keys=True)
+                actual = self._conexion.execute(
+                    "SELECT datos, borrada FROM filas WHERE tenant = ? AND tabla = ? AND clave = ?", (tenant, tabla, clave)
+                ).fetchone()
+                if actual is not None and actual[0] == datos and not actual[1]:
+                    continue
+                seq += 1
+                self._conexion.execute(
+                    "INSERT OR REPLACE INTO filas (tenant, tabla, clave, datos, seq, borrada) VALUES (?, ?, ?, ?, ?, 0)",
+                    (tenant, tabla, clave, datos, seq)
+                )
+            for clave in claves_borradas:
+                seq += 1
+                cursor = self._conexion.execute(
+                    "UPDATE filas SET datos = NULL, borrada = 1, seq = ? WHERE tenant = ? AND tabla = ? AND clave = ? AND borrada = 0",
+                    (seq, tenant, tabla, clave)
+                )
+                if cursor.rowcount == 0:
+                    seq -= 1
+            if seq != seq_inicial:
+                self._conexion.execute(
+                    "INSERT OR REPLACE INTO secuencias (tenant, seq) VALUES (?, ?)", (tenant, seq)
+                )
+
+            # Cambios del servidor posteriores a `desde`, salvo los recién aplicados
+            nuevas = self._conexion.execute(
+                "SELECT clave, datos, seq, borrada FROM filas WHERE tenant = ? AND tabla = ? AND seq > ? AND seq <= ? "
+                "ORDER BY seq LIMIT ?",
+                (tenant, tabla, desde, seq_inicial, limite + 1)
+            ).fetchall()
+
+        hay_mas = len(nuevas) > limite
+        nuevas = nuevas[:limite]
+        actualizadas = [json.loads(datos) for _, datos, _, borrada in nuevas if not borrada]
+        eliminadas = [dict(zip(columnas_clave, json.loads(clave))) for clave, _, _, borrada in nuevas if borrada]
+        return {
+            'tabla': tabla,
+            'clave': list(columnas_clave),
+            # Con `hay_mas`, el cursor avanza solo hasta lo entregado
+            'seq': nuevas[-1][2] if hay_mas else seq,
+            'hay_mas': hay_mas,
+            'reiniciar': reiniciar,
+            'aplicadas': seq - seq_inicial,
+            'filas': filas_a_columnas(actualizadas),
+            'borradas': filas_a_columnas(eliminadas),
+        }
+
+    def leer_tabla(self, tenant: str, tabla: str) -> pd.DataFrame:
+        """Estado actual (sin lápidas) de una tabla del tenant, para usarlo desde Python."""
+        filas = self._conexion.execute(
+            "SELECT datos FROM filas WHERE tenant = ? AND tabla = ? AND borrada = 0 ORDER BY seq", (tenant, tabla)
+        ).fetchall()
+        return pd.DataFrame([json.loads(datos) for (datos,) in filas])
+
+    def cerrar(self):
+        self._conexion.close()
+
+
+def parsear_peticion(cuerpo: Dict) -> Tuple[int, Dict[str, list], Dict[str, list]]:
+    """Valida el cuerpo de una petición de sincronización."""
+    if not isinstance(cuerpo, dict):
+        raise ValueError("El cuerpo debe ser un objeto JSON")
+    desde = cuerpo.get('desde', 0)
+    if not isinstance(desde, int) or desde < 0:
+        raise ValueError("'desde' debe ser un entero >= 0")
+    cambios = cuerpo.get('filas') or {}
+    borradas = cuerpo.get('borradas') or {}
+    if not isinstance(cambios, dict) or not isinstance(borradas, dict):
+        raise ValueError("'filas' y 'borradas' van en formato columnar: {columna: [valores]}")
+    return desde, cambios, borradas
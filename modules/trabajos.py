@@ -0,0 +1,277 @@
+# modules/trabajos.py
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+import pandas as pd
+from modules.core_analysis import calcular_orden_optima_compartida, calcular_orden_optima_producto, iterar_productos, clasificar_abc
+from modules.matriz_compartida import liberar_matriz, publicar_matriz
+from modules.planificador import PlanificadorJusto, CLASE_INTERACTIVA, CLASE_LOTE
+
+# Directorio donde se persiste el estado de los trabajos (sobrevive reruns y reinicios)
+DIRECTORIO_DATOS = os.getenv("STOCK_ZERO_DATA_DIR", ".stock_zero")
+DIRECTORIO_TRABAJOS = os.path.join(DIRECTORIO_DATOS, "trabajos")
+
+ESTADO_PENDIENTE = 'pendiente'
+ESTADO_EN_CURSO = 'en_curso'
+ESTADO_COMPLETADO = 'completado'
+ESTADO_CANCELADO = 'cancelado'
+ESTADO_ERROR = 'error'
+ESTADO_INTERRUMPIDO = 'interrumpido'
+ESTADOS_FINALES = {ESTADO_COMPLETADO, ESTADO_CANCELADO, ESTADO_ERROR, ESTADO_INTERRUMPIDO}
+
+# Intervalo mínimo entre escrituras del progreso a disco mientras el trabajo avanza
+INTERVALO_PERSISTENCIA_S = 1.0
+# Los trabajos terminados se olvidan (en memoria y en disco) pasado este tiempo
+TTL_TRABAJOS_S = float(os.getenv("STOCK_ZERO_TRABAJOS_TTL_H", "24")) * 3600
+
+# ============================================
+# GESTOR DE TRABAJOS EN SEGUNDO PLANO
+# ============================================
+
+class GestorTrabajos:
+    """
+    Registro de trabajos de optimización que corren fuera del hilo del script de
+    Streamlit. Cada trabajo tiene un hilo coordinador que envía un producto por
+    unidad de trabajo al planificador justo (colas por tenant sobre un pool de
+    workers) y acumula resultados parciales a medida que terminan. Mientras
+    corre solo persiste en JSON los contadores de avance; los resultados se
+    escriben una vez, al terminar. Los trabajos terminados hace más de
+    `ttl_s` se eliminan de memoria y de disco.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = None,
+        usar_procesos: bool = False,
+        directorio: str = DIRECTORIO_TRABAJOS,
+        ttl_s: float = TTL_TRABAJOS_S
+    ):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.usar_procesos = usar_procesos
+        self.directorio = directorio
+        self.ttl_s = ttl_s
+        self._pool = None
+        self._planificador = None
+        self._trabajos: Dict[str, Dict] = {}
+        self._cancelados = set()
+        self._lock = threading.Lock()
+        self._cargar_persistidos()
+
+    def _obtener_pool(self):
+        if self._pool is None:
+            if self.usar_procesos:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="optimizacion")
+        return self._pool
+
+    @property
+    def planificador(self) -> PlanificadorJusto:
+        with self._lock:
+            if self._planificador is None:
+                self._planificador = PlanificadorJusto(self._obtener_pool(), self.max_workers)
+            return self._planificador
+
+    # --- Persistencia ---
+
+    def _ruta(self, trabajo_id: str) -> str:
+        return os.path.join(self.directorio, f"{trabajo_id}.json")
+
+    def _persistir(self, trabajo: Dict, forzar: bool = False):
+        """Progreso del trabajo; los resultados solo se escriben cuando termina."""
+        ahora = time.time()
+        if not forzar and ahora - trabajo.get('_persistido', 0) < INTERVALO_PERSISTENCIA_S:
+            return
+        trabajo['_persistido'] = ahora
+        incluir_resultados = trabajo['estado'] in ESTADOS_FINALES
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            ruta = self._ruta(trabajo['id'])
+            temporal = ruta + '.tmp'
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(
+                    {k: v for k, v in trabajo.items() if not k.startswith('_') and (incluir_resultados or k != 'resultados')},
+                    f, default=_a_json
+                )
+            os.replace(temporal, ruta)
+        except OSError:
+            # La persistencia es de mejor esfuerzo: el trabajo sigue en memoria
+            pass
+
+    def _vencido(self, trabajo: Dict, ahora: float) -> bool:
+        return trabajo.get('estado') in ESTADOS_FINALES and ahora - trabajo.get('actualizado', 0) > self.ttl_s
+
+    def _borrar(self, trabajo_id: str):
+        try:
+            os.remove(self._ruta(trabajo_id))
+        except OSError:
+            pass
+
+    def _cargar_persistidos(self):
+        if not os.path.isdir(self.directorio):
+            return
+        ahora = time.time()
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directorio, nombre), encoding='utf-8') as f:
+                    trabajo = json.load(f)
+            except (OSError, ValueError):
+                continue
+            # Un trabajo que no terminó pertenecía a un proceso que ya no existe (sus parciales no se guardaron)
+            if trabajo.get('estado') not in ESTADOS_FINALES:
+                trabajo['estado'] = ESTADO_INTERRUMPIDO
+            trabajo.setdefault('resultados', [])
+            if self._vencido(trabajo, ahora):
+                self._borrar(trabajo['id'])
+                continue
+            self._trabajos[trabajo['id']] = trabajo
+
+    def podar(self) -> int:
+        """Olvida los trabajos terminados hace más de `ttl_s` y borra sus archivos; devuelve cuántos."""
+        ahora = time.time()
+        with self._lock:
+            vencidos = [t for t, trabajo in self._trabajos.items() if self._vencido(trabajo, ahora)]
+            for trabajo_id in vencidos:
+                del self._trabajos[trabajo_id]
+        for trabajo_id in vencidos:
+            self._borrar(trabajo_id)
+        return len(vencidos)
+
+    # --- API pública ---
+
+    def enviar_optimizacion(
+        self,
+        df_ventas: pd.DataFrame,
+        tenant: str,
+        lead_time: int = 7,
+        stock_seguridad_dias: int = 3,
+        frecuencia_estacional: int = 7,
+        interactivo: bool = True
+    ) -> str:
+        """
+        Encola la optimización de todos los productos de `df_ventas` y devuelve su id.
+        Los trabajos interactivos (pedidos desde la app) pasan antes que los de lote.
+        Con procesos, la matriz de demanda del tenant se publica una vez y cada
+        unidad lleva solo su referencia.
+        """
+        if self.usar_procesos:
+            matriz = publicar_matriz(tenant, df_ventas, arrendar=True)
+            unidades = [(calcular_orden_optima_compartida, (tenant, matriz.version, producto)) for producto in matriz.productos]
+        else:
+            matriz = None
+            unidades = [(calcular_orden_optima_producto, (df_producto, producto)) for producto, df_producto in iterar_productos(df_ventas)]
+        trabajo = {
+            'id': uuid.uuid4().hex[:12],
+            'tipo': 'optimizacion',
+            'tenant': tenant,
+            'clase': CLASE_INTERACTIVA if interactivo else CLASE_LOTE,
+            'estado': ESTADO_PENDIENTE,
+            'parametros': {
+                'lead_time': lead_time,
+                'stock_seguridad_dias': stock_seguridad_dias,
+                'frecuencia_estacional': frecuencia_estacional,
+            },
+            'total': len(unidades),
+            'completados': 0,
+            'resultados': [],
+            'error': None,
+            'creado': time.time(),
+            'actualizado': time.time(),
+        }
+        self.podar()
+        with self._lock:
+            self._trabajos[trabajo['id']] = trabajo
+        self._persistir(trabajo, forzar=True)
+
+        hilo = threading.Thread(
+            target=self._ejecutar, args=(trabajo, unidades, matriz), name=f"trabajo-{trabajo['id']}", daemon=True
+        )
+        hilo.start()
+        return trabajo['id']
+
+    def estado(self, trabajo_id: str) -> Optional[Dict]:
+        """Copia del estado del trabajo (sin los resultados parciales)."""
+        trabajo = self._trabajos.get(trabajo_id)
+        if trabajo is None:
+            return None
+        return {k: v for k, v in trabajo.items() if k != 'resultados' and not k.startswith('_')}
+
+    def resultados(self, trabajo_id: str) -> pd.DataFrame:
+        """Resultados disponibles hasta el momento, con clasificación ABC si el trabajo terminó."""
+        trabajo = self._trabajos.get(trabajo_id)
+        if trabajo is None or not trabajo['resultados']:
+            return pd.DataFrame()
+        df = pd.DataFrame(list(trabajo['resultados']))
+        if trabajo['estado'] == ESTADO_COMPLETADO:
+            df = clasificar_abc(df)
+        return df
+
+    def cancelar(self, trabajo_id: str) -> bool:
+        """Solicita cancelar un trabajo; los productos ya calculados se conservan."""
+        trabajo = self._trabajos.get(trabajo_id)
+        if trabajo is None or trabajo['estado'] in ESTADOS_FINALES:
+            return False
+        self._cancelados.add(trabajo_id)
+        return True
+
+    def resumen_colas(self) -> pd.DataFrame:
+        """Profundidad de cola y esperas por tenant en el planificador."""
+        return pd.DataFrame(self.planificador.resumen())
+
+    def trabajos_de(self, tenant: str) -> List[Dict]:
+        """Trabajos del tenant, del más reciente al más antiguo."""
+        self.podar()
+        trabajos = [self.estado(t['id']) for t in list(self._trabajos.values()) if t.get('tenant') == tenant]
+        return sorted((t for t in trabajos if t is not None), key=lambda t: -t['creado'])
+
+    # --- Ejecución ---
+
+    def _ejecutar(self, trabajo: Dict, unidades: List, matriz=None):
+        parametros = trabajo['parametros']
+        trabajo['estado'] = ESTADO_EN_CURSO
+        self._persistir(trabajo, forzar=True)
+        try:
+            planificador = self.planificador
+            futuros = [
+                planificador.enviar(
+                    trabajo['tenant'], funcion, *argumentos,
+                    parametros['lead_time'], parametros['stock_seguridad_dias'], parametros['frecuencia_estacional'],
+                    interactivo=trabajo['clase'] == CLASE_INTERACTIVA
+                )
+                for funcion, argumentos in unidades
+            ]
+            for futuro in as_completed(futuros):
+                if trabajo['id'] in self._cancelados:
+                    for pendiente in futuros:
+                        pendiente.cancel()
+                    trabajo['estado'] = ESTADO_CANCELADO
+                    break
+                trabajo['resultados'].append(futuro.result())
+                trabajo['completados'] += 1
+                trabajo['actualizado'] = time.time()
+                self._persistir(trabajo)
+            else:
+                trabajo['estado'] = ESTADO_COMPLETADO
+        except Exception as e:
+            trabajo['estado'] = ESTADO_ERROR
+            trabajo['error'] = str(e)
+        finally:
+            # La versión de la matriz ya no hace falta: otras publicaciones pueden podarla
+            liberar_matriz(matriz)
+            self._cancelados.discard(trabajo['id'])
+            trabajo['actualizado'] = time.time()
+            self._persistir(trabajo, forzar=True)
+
+
+def _a_json(valor):
+    """Serializa tipos numpy/pandas que json no conoce."""
+    if hasattr(valor, 'item'):
+        return valor.item()
+    return str(valor)
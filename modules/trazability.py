@@ -3,8 +3,13 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, Union
+from typing import Dict, Optional, Union
+from modules.instrumentacion import medir
+from modules.metricas import SIMULACION_SEGUNDOS, cronometrar
+from modules.libro_movimientos import LibroMovimientos, construir_libro
 
+@medir('trazabilidad.simulacion')
+@cronometrar(SIMULACION_SEGUNDOS)
 def calcular_trazabilidad_inventario(
     df_ventas: pd.DataFrame, 
     df_entradas: pd.DataFrame, 
@@ -13,16 +18,26 @@ def calcular_trazabilidad_inventario(
     punto_reorden: float,
     cantidad_a_ordenar: float,
     pronostico_diario_promedio: float,
-    lead_time: int
+    lead_time: int,
+    ventas_diarias: Optional[pd.Series] = None,
+    libro: Optional[LibroMovimientos] = None
 ) -> Union[pd.DataFrame, None]:
     """
     Calcula la trazabilidad histórica del stock y la proyecta al futuro,
-    simulando órdenes de compra al tocar el PR.
+    simulando órdenes de compra al tocar el PR. Con `ventas_diarias` (la serie
+    del producto en la matriz compartida) no se filtra `df_ventas`.
+
+    El stock histórico es el del libro de movimientos (`libro`, o uno del
+    producto que abre con `stock_actual_manual` en su primer movimiento); la
+    proyección parte del saldo de hoy.
     """
     
     # --- 1. PREPARACIÓN DE DATOS DIARIOS ---
     
-    ventas_prod = df_ventas[df_ventas['producto'] == nombre_producto][['fecha', 'cantidad_vendida']].copy()
+    if ventas_diarias is not None:
+        ventas_prod = ventas_diarias.rename('cantidad_vendida').rename_axis('fecha').reset_index()
+    else:
+        ventas_prod = df_ventas[df_ventas['producto'] == nombre_producto][['fecha', 'cantidad_vendida']].copy()
     entradas_prod = df_entradas[df_entradas['producto'] == nombre_producto][['fecha', 'cantidad_recibida']].copy()
     
     if ventas_prod.empty and entradas_prod.empty:
@@ -65,52 +80,33 @@ def calcular_trazabilidad_inventario(
         entradas_diarias = pd.Series(entradas_diarias).fillna(0)
         df_diario.loc[df_diario.index.intersection(entradas_diarias.index), 'Entradas'] = entradas_diarias
 
-    # --- 2. CÁLCULO DE INVENTARIO (Simulación de PR) ---
-    
+    # --- 2. CÁLCULO DE INVENTARIO ---
+
     df_diario['Stock'] = 0.0
     df_diario['Simulacion_Entradas'] = 0.0
-    
     df_diario['Tipo'] = np.where(df_diario.index.date <= fecha_actual_dt.date(), 'Histórico', 'Proyectado')
-    
-    stock_t = stock_actual_manual
-    
-    # Iterar día a día
-    for i, date_ts in enumerate(df_diario.index):
-        if i == 0:
-            df_diario.loc[date_ts, 'Stock'] = stock_t
-            continue
-            
-        idx_anterior = df_diario.index[i - 1]
-        
-        # 1. Stock del inicio del día = Stock del día anterior
-        stock_t = df_diario.loc[idx_anterior, 'Stock']
-        
-        # 2. Determinar la Demanda y Entradas
-        is_historico = df_diario.loc[date_ts, 'Tipo'] == 'Histórico'
-        
-        demanda_t = df_diario.loc[date_ts, 'Ventas'] if is_historico else pronostico_diario_promedio
-        entradas_reales_t = df_diario.loc[date_ts, 'Entradas'] if is_historico else 0
-        
-        simulacion_entrada_t = 0.0
-        
-        # 3. Simular Orden de Compra (Solo en la proyección)
-        if not is_historico:
-            # Comprobamos el PR ANTES de consumir la demanda del día
-            if stock_t <= punto_reorden:
-                fecha_llegada = date_ts + timedelta(days=lead_time)
-                
-                # Agregamos la orden de compra en la fecha de llegada
-                if fecha_llegada in df_diario.index:
-                    df_diario.loc[fecha_llegada, 'Simulacion_Entradas'] += cantidad_a_ordenar
-                    
-            # Si hoy llegó una orden simulada, la agregamos al stock
-            simulacion_entrada_t = df_diario.loc[date_ts, 'Simulacion_Entradas']
+    historico = (df_diario['Tipo'] == 'Histórico').to_numpy()
 
-        # 4. Cálculo del Stock Final del Día
-        stock_final = stock_t - demanda_t + entradas_reales_t + simulacion_entrada_t
-        stock_final = max(0, stock_final)
-        
-        # 5. Guardar Stock para el día actual
-        df_diario.loc[date_ts, 'Stock'] = stock_final
-        
+    # Histórico: stock al cierre de cada día según el libro (sumas prefijas, sin recorrer días)
+    if libro is None:
+        libro = construir_libro(
+            ventas_prod.assign(producto=nombre_producto), entradas_prod.assign(producto=nombre_producto),
+            stock_inicial=stock_actual_manual
+        )
+    stock = np.zeros(len(df_diario))
+    stock[historico] = libro.historial(nombre_producto, df_diario.index[historico])
+
+    # Proyección: parte del saldo de hoy y simula órdenes de compra al tocar el PR
+    llegadas = np.zeros(len(df_diario))
+    n_historico = int(historico.sum())
+    stock_t = max(0.0, stock[n_historico - 1]) if n_historico else max(0.0, libro.saldo(nombre_producto))
+    for i in range(n_historico, len(df_diario)):
+        # Comprobamos el PR ANTES de consumir la demanda del día
+        if stock_t <= punto_reorden and i + lead_time < len(df_diario):
+            llegadas[i + lead_time] += cantidad_a_ordenar
+        stock_t = max(0.0, stock_t - pronostico_diario_promedio + llegadas[i])
+        stock[i] = stock_t
+
+    df_diario['Stock'] = stock
+    df_diario['Simulacion_Entradas'] = llegadas
     return df_diario.reset_index()
@@ -5,8 +5,6 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import warnings
-from modules.core_analysis import procesar_multiple_productos
-from modules.analytics import analytics_app
 from modules.dashboard_analytics import (
     calcular_indicadores_ventas,
     calcular_indicadores_inventario,
@@ -14,6 +12,10 @@ from modules.dashboard_analytics import (
     generar_recomendaciones,
     calcular_kpi_tendencias
 )
+from modules.estados_producto import clasificar_estados_producto, contar_estados
+from modules.reduccion_series import reducir_dataframe, scatter_trace
+from modules.instrumentacion import medir, tramo
+from modules.fusion_cargas import rango_fechas
 
 warnings.filterwarnings('ignore')
 
@@ -110,6 +112,7 @@ def crear_kpi_cards_enhanced(kpis):
             delta_color="normal"
         )
 
+@medir('dashboard.grafico_ventas')
 def crear_grafico_ventas_tendencia_enhanced(df_ventas):
     """
     Crea gráfico de tendencia de ventas mejorado
@@ -124,13 +127,19 @@ def crear_grafico_ventas_tendencia_enhanced(df_ventas):
     ventas_diarias['media_movil_7d'] = ventas_diarias['cantidad_vendida'].rolling(window=7, min_periods=1).mean()
     ventas_diarias['media_movil_30d'] = ventas_diarias['cantidad_vendida'].rolling(window=30, min_periods=1).mean()
     
+    # Reducción LTTB por serie antes de enviar los puntos al navegador
+    diarias = reducir_dataframe(ventas_diarias, 'fecha', 'cantidad_vendida')
+    media_7d = reducir_dataframe(ventas_diarias, 'fecha', 'media_movil_7d')
+    media_30d = reducir_dataframe(ventas_diarias, 'fecha', 'media_movil_30d')
+    
     fig = go.Figure()
     
     # Ventas diarias
-    fig.add_trace(go.Scatter(
-        x=ventas_diarias['fecha'],
-        y=ventas_diarias['cantidad_vendida'],
-        mode='lines+markers',
+    fig.add_trace(scatter_trace(
+        x=diarias['fecha'],
+        y=diarias['cantidad_vendida'],
+        n_original=len(ventas_diarias),
+        mode='lines+markers' if len(diarias) == len(ventas_diarias) else 'lines',
         name='Ventas Diarias',
         line=dict(color=COLOR_VENTAS, width=1),
         opacity=0.6,
@@ -138,9 +147,10 @@ def crear_grafico_ventas_tendencia_enhanced(df_ventas):
     ))
     
     # Media móvil 7 días
-    fig.add_trace(go.Scatter(
-        x=ventas_diarias['fecha'],
-        y=ventas_diarias['media_movil_7d'],
+    fig.add_trace(scatter_trace(
+        x=media_7d['fecha'],
+        y=media_7d['media_movil_7d'],
+        n_original=len(ventas_diarias),
         mode='lines',
         name='Tendencia (7d)',
         line=dict(color=COLOR_PREDICCION, width=3),
@@ -148,9 +158,10 @@ def crear_grafico_ventas_tendencia_enhanced(df_ventas):
     ))
     
     # Media móvil 30 días
-    fig.add_trace(go.Scatter(
-        x=ventas_diarias['fecha'],
-        y=ventas_diarias['media_movil_30d'],
+    fig.add_trace(scatter_trace(
+        x=media_30d['fecha'],
+        y=media_30d['media_movil_30d'],
+        n_original=len(ventas_diarias),
         mode='lines',
         name='Tendencia (30d)',
         line=dict(color=COLOR_STOCK_FUT, width=2, dash='dash'),
@@ -175,6 +186,7 @@ def crear_grafico_ventas_tendencia_enhanced(df_ventas):
     
     return fig
 
+@medir('dashboard.grafico_composicion')
 def crear_grafico_composicion_stock(inventario_df, df_resultados):
     """
     Crea gráfico de composición de stock por estado
@@ -185,23 +197,10 @@ def crear_grafico_composicion_stock(inventario_df, df_resultados):
     if df_resultados is None or df_resultados.empty:
         # Sin datos de optimización
         estados = {'Sin optimización': len(inventario_df)}
-        colors = ['gray']
+        colors = {}
     else:
-        # Combinar datos para determinar estados
-        df_combinado = pd.merge(inventario_df, df_resultados, left_on='Producto', right_on='producto', how='left')
-        
-        estados = {}
-        for _, row in df_combinado.iterrows():
-            if pd.isna(row['punto_reorden']):
-                estado = 'Sin optimización'
-            elif row['Stock Actual'] <= row['punto_reorden']:
-                estado = '🔴 Crítico'
-            elif row['Stock Actual'] <= row['punto_reorden'] * 1.5:
-                estado = '🟡 Advertencia'
-            else:
-                estado = '🟢 Óptimo'
-            
-            estados[estado] = estados.get(estado, 0) + 1
+        # Conteo vectorizado de estados para todo el catálogo
+        estados = contar_estados(clasificar_estados_producto(inventario_df, df_resultados))
         
         colors = {
             '🔴 Crítico': COLOR_PR,
@@ -288,6 +287,7 @@ def crear_tablero_control_eficiencia(kpis):
         fig_eficiencia.update_layout(height=300, template="plotly_white")
         st.plotly_chart(fig_eficiencia, width="stretch")
 
+@medir('dashboard.tabla_estados')
 def crear_tabla_estados_producto_enhanced(inventario_df, df_resultados):
     """
     Crea tabla mejorada con estado actual de todos los productos
@@ -295,51 +295,18 @@ def crear_tabla_estados_producto_enhanced(inventario_df, df_resultados):
     if inventario_df is None or inventario_df.empty:
         return pd.DataFrame()
     
-    df_trabajo = inventario_df.copy()
-    
-    if df_resultados is None or df_resultados.empty:
-        df_trabajo['Estado'] = 'Sin optimización'
-        df_trabajo['ABC'] = 'N/A'
-        df_trabajo['Punto Reorden'] = 0
-        df_trabajo['Cantidad a Ordenar'] = 0
-        df_trabajo['Días de Inventario'] = 0
-    else:
-        # Combinar datos
-        df_trabajo = pd.merge(df_trabajo, df_resultados, left_on='Producto', right_on='producto', how='left')
-        
-        # Determinar estado
-        def determinar_estado(row):
-            if pd.isna(row['punto_reorden']):
-                return '🔴 Sin optimización'
-            elif row['Stock Actual'] <= row['punto_reorden']:
-                return '🔴 Crítico'
-            elif row['Stock Actual'] <= row['punto_reorden'] * 1.5:
-                return '🟡 Advertencia'
-            else:
-                return '🟢 Óptimo'
-        
-        # Calcular días de inventario estimados
-        def calcular_dias_inventario(row):
-            if pd.isna(row['pronostico_diario_promedio']) or row['pronostico_diario_promedio'] == 0:
-                return 0
-            return row['Stock Actual'] / row['pronostico_diario_promedio']
-        
-        df_trabajo['Estado'] = df_trabajo.apply(determinar_estado, axis=1)
-        df_trabajo['ABC'] = df_trabajo['clasificacion_abc'].fillna('N/A')
-        df_trabajo['Punto Reorden'] = df_trabajo['punto_reorden'].fillna(0).round(0)
-        df_trabajo['Cantidad a Ordenar'] = df_trabajo['cantidad_a_ordenar'].fillna(0).round(0)
-        df_trabajo['Días de Inventario'] = df_trabajo.apply(calcular_dias_inventario, axis=1).round(1)
+    # Estado, ABC y días de cobertura calculados de forma vectorizada
+    df_trabajo = clasificar_estados_producto(inventario_df, df_resultados)
     
     # Ordenar por urgencia
-    orden_estados = {'🔴 Crítico': 0, '🔴 Sin optimización': 1, '🟡 Advertencia': 2, '🟢 Óptimo': 3}
-    df_trabajo['Prioridad'] = df_trabajo['Estado'].map(orden_estados).fillna(4)
-    df_trabajo = df_trabajo.sort_values('Prioridad').drop('Prioridad', axis=1)
+    df_trabajo = df_trabajo.sort_values('Prioridad', kind='stable').drop('Prioridad', axis=1)
     
     return df_trabajo[[
         'Producto', 'Stock Actual', 'Estado', 'ABC', 'Punto Reorden', 
         'Cantidad a Ordenar', 'Días de Inventario'
     ]]
 
+@medir('dashboard')
 def dashboard_enhanced_app():
     """
     Aplicación principal del dashboard mejorado
@@ -401,7 +368,7 @@ def dashboard_enhanced_app():
         }
         dias = dias_map[periodo_filtro]
         fecha_limite = df_ventas['fecha'].max() - timedelta(days=dias)
-        df_ventas_filtrado = df_ventas[df_ventas['fecha'] >= fecha_limite]
+        df_ventas_filtrado = rango_fechas(df_ventas, desde=fecha_limite)
     
     # Filtrar por ABC si es necesario
     if abc_filtro != 'Todas' and df_resultados is not None and not df_resultados.empty:
@@ -409,7 +376,7 @@ def dashboard_enhanced_app():
         df_ventas_filtrado = df_ventas_filtrado[df_ventas_filtrado['producto'].isin(productos_abc)]
     
     # Calcular KPIs con spinner mejorado
-    with st.spinner("🔄 Analizando datos y calculando KPIs inteligentes..."):
+    with st.spinner("🔄 Analizando datos y calculando KPIs inteligentes..."), tramo('dashboard.kpis'):
         try:
             kpis_ventas = calcular_indicadores_ventas(df_ventas_filtrado)
             kpis_inventario = calcular_indicadores_inventario(inventario_df, df_resultados)
@@ -0,0 +1,36 @@
+# stock_zero_api.py
+"""
+API HTTP local para la web estática (web_app): expone la optimización y la
+trazabilidad de Python como endpoints JSON por lotes, con cache y gzip.
+
+    python stock_zero_api.py                    # http://127.0.0.1:8502
+    python stock_zero_api.py --host 0.0.0.0 --puerto 9000
+
+    POST /optimizar                  {"ventas": [...], "lead_time": 7, "modelo": "global", "inventario": [...]}
+    POST /trazabilidad               {"ventas": [...], "stock": [...], "stock_inicial": 0, "productos": [...]}
+    GET  /tenants/<user_id>/resultados   resultados de stock_zero_batch.py
+    GET  /salud, /metrics
+
+Toda ruta salvo /salud y /metrics exige `Authorization: Bearer <token>`.
+STOCK_ZERO_API_TOKENS asigna un token a cada tenant (`<user_id>:<token>,...`)
+y las rutas de un tenant solo aceptan el suyo. STOCK_ZERO_API_ORIGEN es el
+origen CORS permitido (por defecto http://localhost:8080).
+"""
+import argparse
+import sys
+from dotenv import load_dotenv
+from modules.api_lotes import PUERTO_API, servir
+
+
+def main(argv=None) -> int:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="API de optimización de Stock Zero para web_app")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=PUERTO_API)
+    args = parser.parse_args(argv)
+    servir(args.host, args.puerto)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
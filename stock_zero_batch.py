@@ -0,0 +1,127 @@
+# stock_zero_batch.py
+"""
+Optimización nocturna sin Streamlit: descarga los datos de cada tenant, calcula
+puntos de reorden, cantidades a ordenar y la trazabilidad proyectada de cada
+producto, y guarda el resultado para que la app lo abra ya calculado.
+
+    python stock_zero_batch.py                      # todos los tenants de `clients`
+    python stock_zero_batch.py --tenant <user_id>   # solo algunos tenants
+    python stock_zero_batch.py --modelo global      # un modelo para todo el catálogo
+
+Requiere SUPABASE_URL y SUPABASE_SERVICE_KEY (o SUPABASE_KEY) en el entorno o en .env.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dotenv import load_dotenv
+from modules.datos_async import descargar_tablas, listar_ids
+from modules.datos_supabase import TABLAS_TENANT
+from modules.planificador import PlanificadorJusto
+from modules.precalculo import (
+    DIRECTORIO_PRECALCULO,
+    MODELO_POR_PRODUCTO,
+    MODELOS_PRONOSTICO,
+    calcular_tenant,
+    guardar_backtesting,
+    guardar_precalculo,
+    huella_datos
+)
+
+# Tenants que se descargan y calculan a la vez cuando hay varios workers
+TENANTS_SIMULTANEOS = 4
+
+
+def procesar_tenant(rest_url: str, key: str, tenant_id: str, args, planificador=None) -> str:
+    """Descarga, calcula y guarda un tenant; devuelve un resumen de una línea."""
+    inicio = time.perf_counter()
+    datos = descargar_tablas(rest_url, key, tenant_id, list(TABLAS_TENANT))
+    df_ventas = datos['ventas']
+    if df_ventas is None:
+        return "sin ventas, omitido"
+
+    calculo = calcular_tenant(
+        df_ventas, datos['stock'],
+        lead_time=args.lead_time,
+        stock_seguridad_dias=args.stock_seguridad,
+        frecuencia_estacional=args.frecuencia,
+        stock_inicial=args.stock_inicial,
+        planificador=planificador,
+        tenant=tenant_id,
+        modelo=args.modelo
+    )
+    meta = {
+        'huella_datos': huella_datos(df_ventas, datos['stock']),
+        'filas_ventas': len(df_ventas),
+        'filas_stock': 0 if datos['stock'] is None else len(datos['stock']),
+        'lead_time': args.lead_time,
+        'stock_seguridad_dias': args.stock_seguridad,
+        'frecuencia_estacional': args.frecuencia,
+        'modelo': args.modelo,
+    }
+    guardar_precalculo(tenant_id, calculo, meta, args.directorio)
+    errores = int(calculo['resultados']['error'].notna().sum())
+    resumen = f"{len(calculo['resultados'])} productos ({errores} con error)"
+
+    if args.backtest:
+        from modules.backtesting import ejecutar_backtesting
+
+        backtesting = ejecutar_backtesting(
+            df_ventas, n_origenes=args.backtest, horizonte=args.lead_time,
+            frecuencia=args.frecuencia, workers=max(args.workers, 1)
+        )
+        guardar_backtesting(tenant_id, backtesting, args.directorio)
+        resumen += f", backtesting de {args.backtest} orígenes"
+    return f"{resumen} en {time.perf_counter() - inicio:.1f} s"
+
+
+def main(argv=None) -> int:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Optimización batch de Stock Zero (sin Streamlit)")
+    parser.add_argument('--tenant', action='append', help="user_id a procesar (repetible); por defecto, todos")
+    parser.add_argument('--lead-time', type=int, default=7)
+    parser.add_argument('--stock-seguridad', type=int, default=3, help="días de stock de seguridad")
+    parser.add_argument('--frecuencia', type=int, default=7, help="periodo estacional en días")
+    parser.add_argument('--stock-inicial', type=float, default=0.0, help="stock al inicio del histórico para la trazabilidad")
+    parser.add_argument('--modelo', choices=MODELOS_PRONOSTICO, default=MODELO_POR_PRODUCTO,
+                        help="holt_winters: un modelo por producto; global: un modelo para todo el catálogo")
+    parser.add_argument('--workers', type=int, default=1, help="procesos para ajustar productos (compartidos por todos los tenants)")
+    parser.add_argument('--backtest', type=int, default=0, metavar='ORIGENES', help="evalúa el pronóstico con N orígenes móviles")
+    parser.add_argument('--directorio', default=DIRECTORIO_PRECALCULO, help="destino de los resultados")
+    args = parser.parse_args(argv)
+
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_KEY") or os.getenv("SUPABASE_KEY")
+    if not url or not key:
+        print("Faltan SUPABASE_URL y SUPABASE_SERVICE_KEY/SUPABASE_KEY", file=sys.stderr)
+        return 2
+    rest_url = f"{url.rstrip('/')}/rest/v1"
+
+    tenants = args.tenant or listar_ids(rest_url, key)
+
+    # Con varios workers, los tenants avanzan a la vez sobre un único pool de
+    # procesos y el planificador reparte los productos de forma justa entre ellos
+    planificador = None
+    if args.workers > 1:
+        planificador = PlanificadorJusto(ProcessPoolExecutor(max_workers=args.workers), args.workers)
+
+    def ejecutar(tenant_id: str) -> bool:
+        try:
+            print(f"{tenant_id}: {procesar_tenant(rest_url, key, tenant_id, args, planificador)}", flush=True)
+            return True
+        except Exception as e:
+            print(f"{tenant_id}: ERROR {e}", file=sys.stderr, flush=True)
+            return False
+
+    simultaneos = TENANTS_SIMULTANEOS if planificador is not None else 1
+    with ThreadPoolExecutor(max_workers=simultaneos) as hilos:
+        correctos = list(hilos.map(ejecutar, tenants))
+    if planificador is not None:
+        planificador.cerrar()
+        planificador.ejecutor.shutdown()
+    return 0 if all(correctos) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,9 +4,25 @@ import pandas as pd
 from datetime import datetime, timedelta
 import warnings
 import os
-from supabase import create_client
+import time
 from dotenv import load_dotenv
-from pages._0_Dashboard_Enhanced import dashboard_enhanced_app
+from modules.recursos import (
+    cliente_supabase,
+    iniciar_metricas,
+    cargar_datos_compartidos,
+    datos_compartidos_vigentes,
+    invalidar_datos_tenant,
+    liberar_datos_sesion,
+    gobernar_memoria_sesion
+)
+from modules.instrumentacion import tramo
+from modules.metricas import SUPABASE_SEGUNDOS, cronometro, registrar_carga
+from modules.precalculo import MODELO_POR_PRODUCTO, cargar_precalculo, huella_datos
+from modules.inventario_store import sellar_resultados
+from modules.fusion_cargas import fusionar_carga
+from modules.carga_archivos import EXTENSIONES_CARGA, leer_archivo_carga, limpiar_movimientos
+from modules.datos_supabase import escribir_cambios
+from modules.panel_perfil import controles_perfil, comenzar_perfil_rerun, panel_perfil
 
 # Cargar .env
 load_dotenv()
@@ -19,9 +35,15 @@ if not SUPABASE_URL or not SUPABASE_KEY:
     st.error("Faltan claves de Supabase. Revisa .env")
     st.stop()
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Un cliente por sesión (no por rerun) sobre el pool HTTP keep-alive del proceso
+supabase = cliente_supabase(SUPABASE_URL, SUPABASE_KEY)
+iniciar_metricas()
+# Antes de que cualquier página lea st.session_state: recarga frames bajados a disco
+gobernar_memoria_sesion()
 
 # --- MÓDULOS ---
+# statsmodels, matplotlib y plotly se importan de forma diferida dentro de cada
+# página/función que los usa, para no pagarlos antes de mostrar el login.
 from modules.core_analysis import procesar_multiple_productos
 from modules.trazability import calcular_trazabilidad_inventario
 from modules.components import (
@@ -142,6 +164,7 @@ with st.sidebar:
     
     if st.button("🚪 Cerrar Sesión", type="secondary", width="stretch"):
         supabase.auth.sign_out()
+        liberar_datos_sesion(st.session_state.user.id)
         st.session_state.user = None
         st.session_state.show_login = True
         # Limpiar otros estados
@@ -150,6 +173,10 @@ with st.sidebar:
                 del st.session_state[key]
         st.rerun()
 
+# Perfilado opcional del rerun (solo admins, ver STOCK_ZERO_ADMINS)
+controles_perfil()
+comenzar_perfil_rerun()
+
 # ============================================
 # CONFIGURACIÓN DE VARIABLES
 # ============================================
@@ -215,44 +242,42 @@ def upload_modal():
             st.download_button("⬇️ Descargar Stock", ejemplo_stock.to_csv(index=False), "stock.csv", "text/csv")
 
     st.markdown("---")
-    uploaded_ventas = st.file_uploader("📊 Ventas (CSV)", type="csv", key="modal_ventas")
-    uploaded_stock = st.file_uploader("📦 Stock (Opcional)", type="csv", key="modal_stock")
+    st.caption("CSV, Parquet, Feather o Arrow. Los formatos columnares se cargan con sus tipos, sin conversión a texto.")
+    uploaded_ventas = st.file_uploader("📊 Ventas", type=list(EXTENSIONES_CARGA), key="modal_ventas")
+    uploaded_stock = st.file_uploader("📦 Stock (Opcional)", type=list(EXTENSIONES_CARGA), key="modal_stock")
 
     user_id = st.session_state.user.id
 
     # Procesar ventas
     if uploaded_ventas:
         try:
-            df_raw = pd.read_csv(uploaded_ventas)
-            
-            # Detectar formato y convertir
-            if 'producto' not in df_raw.columns and len(df_raw.columns) > 2:
-                df_ventas = df_raw.melt(id_vars='fecha', var_name='producto', value_name='cantidad_vendida')
-            else:
-                df_ventas = df_raw[['fecha', 'producto', 'cantidad_vendida']].copy()
-
-            # Limpiar datos - MANTENER COMO DATETIME
-            df_ventas['fecha'] = pd.to_datetime(df_ventas['fecha'], errors='coerce')
-            df_ventas = df_ventas.dropna(subset=['fecha'])
-            df_ventas['cantidad_vendida'] = pd.to_numeric(df_ventas['cantidad_vendida'], errors='coerce').fillna(0)
-            df_ventas = df_ventas[df_ventas['cantidad_vendida'] > 0]  # Filtrar valores válidos
-            df_ventas['user_id'] = user_id
-
-            # Guardar con datetime para el análisis
-            st.session_state.df_ventas_trazabilidad = df_ventas.copy()
-            st.success(f"✅ {len(df_ventas)} registros de ventas procesados")
-
-            # Guardar en Supabase
-            try:
-                # Crear copia con fechas como string para Supabase
-                df_supabase = df_ventas.copy()
-                df_supabase['fecha'] = df_supabase['fecha'].dt.strftime('%Y-%m-%d')
-                
-                data = df_supabase[['user_id', 'fecha', 'producto', 'cantidad_vendida']].to_dict('records')
-                result = supabase.table("ventas").insert(data).execute()
-                st.success(f"✅ Guardado en Supabase: {len(result.data)} registros")
-            except Exception as e:
-                st.error(f"❌ Error al guardar en Supabase: {str(e)}")
+            inicio_carga = time.perf_counter()
+            df_raw = leer_archivo_carga(uploaded_ventas, 'cantidad_vendida')
+
+            # Formato largo o ancho, fechas como datetime y solo cantidades válidas
+            df_ventas = limpiar_movimientos(df_raw, 'cantidad_vendida', user_id)
+
+            # Fusión incremental con lo ya cargado: exports solapados no duplican historia
+            df_fusionado, cambios, conteos = fusionar_carga(
+                st.session_state.get('df_ventas_trazabilidad'), df_ventas, 'cantidad_vendida'
+            )
+            st.session_state.df_ventas_trazabilidad = df_fusionado
+            st.success(
+                f"✅ {len(df_ventas)} registros de ventas procesados: {conteos['insertadas']} nuevos, "
+                f"{conteos['actualizadas']} actualizados, {conteos['omitidas']} sin cambios"
+            )
+
+            # Guardar en Supabase solo lo nuevo o modificado
+            if conteos['insertadas'] or conteos['actualizadas']:
+                try:
+                    with cronometro(SUPABASE_SEGUNDOS, operacion='upsert', tabla='ventas'):
+                        escritas = escribir_cambios(supabase, 'ventas', cambios, 'cantidad_vendida')
+                    registrar_carga('ventas', escritas, time.perf_counter() - inicio_carga)
+                    st.success(f"✅ Guardado en Supabase: {escritas} registros")
+                    # Las demás sesiones del tenant recargan el dataset compartido
+                    invalidar_datos_tenant(user_id)
+                except Exception as e:
+                    st.error(f"❌ Error al guardar en Supabase: {str(e)}")
 
         except Exception as e:
             st.error(f"❌ Error al procesar ventas: {str(e)}")
@@ -260,30 +285,28 @@ def upload_modal():
     # Procesar stock
     if uploaded_stock:
         try:
-            df_stock = pd.read_csv(uploaded_stock)
-            
-            # Limpiar datos - MANTENER COMO DATETIME
-            df_stock['fecha'] = pd.to_datetime(df_stock['fecha'], errors='coerce')
-            df_stock = df_stock.dropna(subset=['fecha'])
-            df_stock['cantidad_recibida'] = pd.to_numeric(df_stock['cantidad_recibida'], errors='coerce').fillna(0)
-            df_stock = df_stock[df_stock['cantidad_recibida'] > 0]
-            df_stock['user_id'] = user_id
-
-            # Guardar con datetime para el análisis
-            st.session_state.df_stock_trazabilidad = df_stock.copy()
-            st.success(f"✅ {len(df_stock)} registros de stock procesados")
-
-            # Guardar en Supabase
-            try:
-                # Crear copia con fechas como string para Supabase
-                df_supabase = df_stock.copy()
-                df_supabase['fecha'] = df_supabase['fecha'].dt.strftime('%Y-%m-%d')
-                
-                data = df_supabase[['user_id', 'fecha', 'producto', 'cantidad_recibida']].to_dict('records')
-                result = supabase.table("stock").insert(data).execute()
-                st.success(f"✅ Guardado en Supabase: {len(result.data)} registros")
-            except Exception as e:
-                st.error(f"❌ Error al guardar en Supabase: {str(e)}")
+            inicio_carga = time.perf_counter()
+            df_raw = leer_archivo_carga(uploaded_stock, 'cantidad_recibida')
+            df_stock = limpiar_movimientos(df_raw, 'cantidad_recibida', user_id)
+
+            df_fusionado, cambios, conteos = fusionar_carga(
+                st.session_state.get('df_stock_trazabilidad'), df_stock, 'cantidad_recibida'
+            )
+            st.session_state.df_stock_trazabilidad = df_fusionado
+            st.success(
+                f"✅ {len(df_stock)} registros de stock procesados: {conteos['insertadas']} nuevos, "
+                f"{conteos['actualizadas']} actualizados, {conteos['omitidas']} sin cambios"
+            )
+
+            if conteos['insertadas'] or conteos['actualizadas']:
+                try:
+                    with cronometro(SUPABASE_SEGUNDOS, operacion='upsert', tabla='stock'):
+                        escritas = escribir_cambios(supabase, 'stock', cambios, 'cantidad_recibida')
+                    registrar_carga('stock', escritas, time.perf_counter() - inicio_carga)
+                    st.success(f"✅ Guardado en Supabase: {escritas} registros")
+                    invalidar_datos_tenant(user_id)
+                except Exception as e:
+                    st.error(f"❌ Error al guardar en Supabase: {str(e)}")
 
         except Exception as e:
             st.error(f"❌ Error al procesar stock: {str(e)}")
@@ -337,25 +360,36 @@ if 'inventario_df' not in st.session_state:
 if 'datos_cargados' not in st.session_state:
     st.session_state.datos_cargados = False
 
-if not st.session_state.datos_cargados and st.session_state.user:
+# Los datasets del tenant viven en una cache de proceso compartida entre sesiones;
+# se recargan cuando otra sesión sube datos (versión) o cuando vence el TTL.
+if st.session_state.user and (not st.session_state.datos_cargados or not datos_compartidos_vigentes(st.session_state.user.id)):
     try:
         user_id = st.session_state.user.id
+        with tramo('supabase.carga'):
+            datos = cargar_datos_compartidos(supabase, user_id)
         
-        # Cargar ventas
-        response_ventas = supabase.table("ventas").select("*").eq("user_id", user_id).execute()
-        if response_ventas.data:
-            df_ventas = pd.DataFrame(response_ventas.data)
-            df_ventas['fecha'] = pd.to_datetime(df_ventas['fecha'])
-            st.session_state.df_ventas_trazabilidad = df_ventas
-        
-        # Cargar stock
-        response_stock = supabase.table("stock").select("*").eq("user_id", user_id).execute()
-        if response_stock.data:
-            df_stock = pd.DataFrame(response_stock.data)
-            df_stock['fecha'] = pd.to_datetime(df_stock['fecha'])
-            st.session_state.df_stock_trazabilidad = df_stock
+        if datos['ventas'] is not None:
+            st.session_state.df_ventas_trazabilidad = datos['ventas']
+        if datos['stock'] is not None:
+            st.session_state.df_stock_trazabilidad = datos['stock']
         
         st.session_state.datos_cargados = True
+
+        # Resultados del batch nocturno (stock_zero_batch.py), si corresponden a los datos actuales
+        if st.session_state.get('df_resultados') is None and datos['ventas'] is not None:
+            precalculo = cargar_precalculo(
+                user_id,
+                huella=huella_datos(datos['ventas'], datos['stock']),
+                parametros={
+                    'lead_time': lead_time,
+                    'frecuencia_estacional': frecuencia,
+                    'modelo': st.session_state.get('modo_pronostico', MODELO_POR_PRODUCTO),
+                }
+            )
+            if precalculo is not None:
+                st.session_state['df_resultados'] = sellar_resultados(
+                    precalculo['resultados'], generado=datetime.fromisoformat(precalculo['meta']['generado']).timestamp()
+                )
         
     except Exception as e:
         st.warning(f"No se pudieron cargar datos previos: {str(e)}")
@@ -368,17 +402,16 @@ pagina = st.session_state.get("pagina_actual", "Dashboard Inteligente")
 
 if pagina == "Dashboard Inteligente":
     try:
+        from pages._0_Dashboard_Enhanced import dashboard_enhanced_app
         dashboard_enhanced_app()
     except Exception as e:
         st.error(f"Error al cargar dashboard: {str(e)}")
 
 elif pagina == "Optimización de Inventario":
-    st.header("🎯 Optimización de Inventario")
-    if not st.session_state.df_ventas_trazabilidad.empty:
-        st.success("✅ Datos listos para optimización")
-        # Tu código de optimización aquí
-    else:
-        st.info("📤 Sube archivos desde el botón superior para comenzar.")
+    from modules.optimizacion import optimizacion_app
+    optimizacion_app(lead_time, stock_seguridad, frecuencia)
 
 elif pagina == "Control de Inventario Básico":
-    inventario_basico_app()
+    inventario_basico_app(lead_time)
+
+panel_perfil()
@@ -0,0 +1,62 @@
+# tests/test_api_lotes.py
+
+import gzip
+import http.client
+import json
+import threading
+import pytest
+from modules.api_lotes import crear_servidor, descomprimir_gzip
+
+TENANT = '00000000-0000-0000-0000-000000000001'
+TOKEN = 'secreto'
+
+
+@pytest.fixture
+def servidor(tmp_path):
+    servidor = crear_servidor(puerto=0, ruta_sincronizacion=str(tmp_path / 'sync.db'), tokens={TOKEN: TENANT})
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield servidor.server_address[1]
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _post(puerto, ruta, cuerpo: bytes, gzip_cuerpo=False):
+    conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=10)
+    cabeceras = {'Authorization': f'Bearer {TOKEN}', 'Content-Type': 'application/json'}
+    if gzip_cuerpo:
+        cabeceras['Content-Encoding'] = 'gzip'
+    conexion.request('POST', ruta, body=cuerpo, headers=cabeceras)
+    respuesta = conexion.getresponse()
+    estado, datos = respuesta.status, json.loads(respuesta.read() or b'{}')
+    conexion.close()
+    return estado, datos
+
+
+def test_gzip_mal_formado_responde_400(servidor):
+    estado, datos = _post(servidor, '/optimizar', b'\x1f\x8bnoesgzip', gzip_cuerpo=True)
+    assert estado == 400
+    assert 'gzip' in datos['error']
+
+
+def test_bomba_gzip_responde_413(servidor, monkeypatch):
+    monkeypatch.setattr('modules.api_lotes.MAX_CUERPO_BYTES', 1024)
+    bomba = gzip.compress(b'{"ventas": "' + b' ' * 10_000 + b'"}')
+    assert len(bomba) < 1024
+    estado, datos = _post(servidor, '/optimizar', bomba, gzip_cuerpo=True)
+    assert estado == 413
+    assert descomprimir_gzip(bomba, limite=1024) is None
+
+
+@pytest.mark.parametrize('ruta', ['/optimizar', f'/sync/{TENANT}/clients'])
+def test_cuerpo_que_no_es_objeto_responde_400(servidor, ruta):
+    estado, datos = _post(servidor, ruta, b'[1, 2]')
+    assert estado == 400
+    assert 'objeto' in datos['error']
+
+
+def test_descomprimir_gzip_varios_miembros():
+    crudo = gzip.compress(b'{"a": ') + gzip.compress(b'1}')
+    assert descomprimir_gzip(crudo) == b'{"a": 1}'
+    with pytest.raises(ValueError):
+        descomprimir_gzip(gzip.compress(b'{"a": 1}')[:-6])
@@ -0,0 +1,51 @@
+# tests/test_carga_archivos.py
+
+import io
+import pandas as pd
+import pytest
+from modules.carga_archivos import TIPO_FECHA, leer_archivo_carga, limpiar_movimientos
+from modules.fusion_cargas import fusionar_carga
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def _parquet(tabla) -> io.BytesIO:
+    buffer = io.BytesIO()
+    pq.write_table(tabla, buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def test_parquet_ancho_con_fecha_como_indice():
+    ancho = pd.DataFrame({
+        'fecha': pd.to_datetime(['2026-01-01', '2026-01-02']),
+        'Pan': [3.0, 0.0],
+        'Leche': [1.0, 2.0],
+    }).set_index('fecha')
+    buffer = io.BytesIO()
+    ancho.to_parquet(buffer)
+    buffer.seek(0)
+
+    df = limpiar_movimientos(leer_archivo_carga(buffer, 'cantidad_vendida', 'ventas.parquet'), 'cantidad_vendida', 'u1')
+    assert sorted(zip(df['fecha'].dt.day, df['producto'], df['cantidad_vendida'])) == [
+        (1, 'Leche', 1.0), (1, 'Pan', 3.0), (2, 'Leche', 2.0)
+    ]
+
+
+def test_date32_queda_en_la_unidad_del_csv_y_no_duplica():
+    csv = io.StringIO("fecha,producto,cantidad_vendida\n2026-01-01,Pan,3\n2026-01-02,Pan,4\n")
+    tabla = pa.table({
+        'fecha': pa.array(pd.to_datetime(['2026-01-01', '2026-01-02']).date, type=pa.date32()),
+        'producto': ['Pan', 'Pan'],
+        'cantidad_vendida': [3.0, 4.0],
+    })
+    desde_csv = limpiar_movimientos(leer_archivo_carga(csv, 'cantidad_vendida', 'ventas.csv'), 'cantidad_vendida', 'u1')
+    desde_parquet = limpiar_movimientos(
+        leer_archivo_carga(_parquet(tabla), 'cantidad_vendida', 'ventas.parquet'), 'cantidad_vendida', 'u1'
+    )
+
+    assert desde_parquet['fecha'].dtype == TIPO_FECHA == desde_csv['fecha'].dtype
+    fusionado, _, conteos = fusionar_carga(desde_csv, desde_parquet, 'cantidad_vendida')
+    assert conteos == {'insertadas': 0, 'actualizadas': 0, 'omitidas': 2}
+    assert len(fusionado) == 2
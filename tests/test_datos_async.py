@@ -0,0 +1,80 @@
+# tests/test_datos_async.py
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pytest
+from modules.datos_async import descargar_tablas, listar_ids
+
+FILAS = [
+    {'fecha': f'2024-01-{1 + i % 28:02d}', 'producto': f'P{i:04d}', 'cantidad_vendida': i, 'user_id': 'u1'}
+    for i in range(2345)
+]
+
+
+class StubPostgrest(BaseHTTPRequestHandler):
+    """PostgREST mínimo: Range por ítems, `max-rows` y Content-Range con o sin conteo."""
+    max_filas = 1000
+    contar = True
+    peticiones = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        tabla = url.path.rsplit('/', 1)[-1]
+        filtro = parse_qs(url.query).get('user_id', [None])[0]
+        filas = FILAS if tabla == 'ventas' else [{'id': f.get('producto')} for f in FILAS]
+        if filtro is not None:
+            filas = [f for f in filas if f'eq.{f["user_id"]}' == filtro]
+        desde, hasta = (int(v) for v in self.headers['Range'].split('-'))
+        pagina = filas[desde:min(hasta + 1, desde + self.max_filas)]
+        self.peticiones.append((desde, hasta))
+
+        total = str(len(filas)) if self.contar and 'count=exact' in (self.headers.get('Prefer') or '') else '*'
+        rango = f'{desde}-{desde + len(pagina) - 1}' if pagina else '*'
+        cuerpo = json.dumps(pagina).encode()
+        self.send_response(206 if pagina else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Range', f'{rango}/{total}')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    def iniciar(max_filas: int, contar: bool = True) -> str:
+        manejador = type('Stub', (StubPostgrest,), {'max_filas': max_filas, 'contar': contar, 'peticiones': []})
+        servidor = ThreadingHTTPServer(('127.0.0.1', 0), manejador)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        servidores.append(servidor)
+        return f'http://127.0.0.1:{servidor.server_address[1]}/rest/v1'
+
+    servidores = []
+    yield iniciar
+    for servidor in servidores:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+@pytest.mark.parametrize('max_filas', [1000, 300, 97])
+@pytest.mark.parametrize('contar', [True, False])
+def test_descarga_todas_las_filas_con_max_rows_corto(stub, max_filas, contar):
+    rest_url = stub(max_filas, contar)
+    df = descargar_tablas(rest_url, 'key', 'u1', ['ventas'])['ventas']
+
+    assert len(df) == len(FILAS)
+    assert df['producto'].is_unique
+    assert df['producto'].tolist() == [f['producto'] for f in FILAS]
+
+
+def test_tabla_vacia(stub):
+    rest_url = stub(300)
+    assert descargar_tablas(rest_url, 'key', 'otro', ['ventas'])['ventas'] is None
+
+
+def test_listar_ids_pagina_por_filas_recibidas(stub):
+    assert len(listar_ids(stub(250), 'key')) == len(FILAS)
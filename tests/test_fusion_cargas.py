@@ -0,0 +1,89 @@
+# tests/test_fusion_cargas.py
+
+import pandas as pd
+from modules.fusion_cargas import fusionar_carga, rango_fechas
+
+USUARIO = '00000000-0000-0000-0000-000000000001'
+
+
+def _ventas(filas):
+    return pd.DataFrame(
+        [{'user_id': USUARIO, 'fecha': pd.Timestamp(f), 'producto': p, 'cantidad_vendida': c} for f, p, c in filas]
+    )
+
+
+def test_primera_carga_inserta_todo_ordenado():
+    nuevo = _ventas([('2026-01-02', 'Pan', 3), ('2026-01-01', 'Pan', 2), ('2026-01-01', 'Leche', 1)])
+    fusionado, cambios, conteos = fusionar_carga(None, nuevo, 'cantidad_vendida')
+
+    assert conteos == {'insertadas': 3, 'actualizadas': 0, 'omitidas': 0}
+    assert fusionado[['fecha', 'producto']].astype(str).values.tolist() == [
+        ['2026-01-01', 'Leche'], ['2026-01-01', 'Pan'], ['2026-01-02', 'Pan']
+    ]
+    assert len(cambios['insertar']) == 3 and cambios['actualizar'].empty
+
+
+def test_fusion_inserta_actualiza_y_omite():
+    actual = _ventas([('2026-01-01', 'Pan', 2), ('2026-01-02', 'Pan', 3)])
+    nuevo = _ventas([('2026-01-01', 'Pan', 2), ('2026-01-02', 'Pan', 5), ('2026-01-03', 'Pan', 4)])
+    fusionado, cambios, conteos = fusionar_carga(actual, nuevo, 'cantidad_vendida')
+
+    assert conteos == {'insertadas': 1, 'actualizadas': 1, 'omitidas': 1}
+    assert fusionado['cantidad_vendida'].tolist() == [2, 5, 4]
+    assert cambios['actualizar']['cantidad_vendida'].tolist() == [5]
+    assert cambios['insertar']['fecha'].tolist() == [pd.Timestamp('2026-01-03')]
+    # El histórico de la sesión no se modifica
+    assert actual['cantidad_vendida'].tolist() == [2, 3]
+
+
+def test_claves_repetidas_en_la_carga_se_suman():
+    actual = _ventas([('2026-01-01', 'Pan', 2)])
+    nuevo = _ventas([('2026-01-01 09:30', 'Pan', 1), ('2026-01-01 18:00', 'Pan', 4)])
+    fusionado, cambios, conteos = fusionar_carga(actual, nuevo, 'cantidad_vendida')
+
+    assert conteos == {'insertadas': 0, 'actualizadas': 1, 'omitidas': 0}
+    assert fusionado['cantidad_vendida'].tolist() == [5]
+    assert cambios['actualizar']['fecha'].tolist() == [pd.Timestamp('2026-01-01')]
+
+
+def test_insercion_anterior_reordena_el_resultado():
+    actual = _ventas([('2026-01-02', 'Pan', 2), ('2026-01-03', 'Pan', 3)])
+    nuevo = _ventas([('2026-01-01', 'Pan', 1)])
+    fusionado, _, _ = fusionar_carga(actual, nuevo, 'cantidad_vendida')
+
+    assert fusionado['fecha'].is_monotonic_increasing
+    assert fusionado['cantidad_vendida'].tolist() == [1, 2, 3]
+
+
+def test_rango_fechas_ordenado_y_desordenado():
+    df = _ventas([(f'2026-01-0{d}', 'Pan', d) for d in range(1, 8)])
+    assert rango_fechas(df, '2026-01-03', '2026-01-05')['cantidad_vendida'].tolist() == [3, 4, 5]
+    assert rango_fechas(df, desde='2026-01-06')['cantidad_vendida'].tolist() == [6, 7]
+
+    desordenado = df.iloc[::-1]
+    assert sorted(rango_fechas(desordenado, '2026-01-03', '2026-01-05')['cantidad_vendida']) == [3, 4, 5]
+
+
+def test_misma_fecha_en_otra_resolucion_no_duplica():
+    # CSV llega en us/ns; Parquet o Feather con date32 en ms
+    actual = _ventas([('2026-01-01', 'Pan', 2), ('2026-01-02', 'Pan', 3)])
+    nuevo = actual.assign(fecha=actual['fecha'].astype('datetime64[ms]'))
+    fusionado, _, conteos = fusionar_carga(actual.assign(fecha=actual['fecha'].astype('datetime64[us]')), nuevo, 'cantidad_vendida')
+
+    assert conteos == {'insertadas': 0, 'actualizadas': 0, 'omitidas': 2}
+    assert len(fusionado) == 2
+
+
+def test_claves_repetidas_en_el_historico_se_suman():
+    actual = _ventas([('2026-01-01', 'Pan', 2), ('2026-01-01', 'Pan', 3), ('2026-01-02', 'Pan', 1)]).assign(id=[7, 8, 9])
+    nuevo = _ventas([('2026-01-01', 'Pan', 6)])
+    fusionado, cambios, conteos = fusionar_carga(actual, nuevo, 'cantidad_vendida')
+
+    assert conteos == {'insertadas': 0, 'actualizadas': 1, 'omitidas': 0}
+    assert fusionado['cantidad_vendida'].tolist() == [6, 1]
+    assert fusionado['id'].tolist() == [7, 9]
+    assert cambios['actualizar']['cantidad_vendida'].tolist() == [6]
+
+    # Si la suma repetida ya coincide con la carga no hay nada que escribir
+    _, _, conteos = fusionar_carga(actual, _ventas([('2026-01-01', 'Pan', 5)]), 'cantidad_vendida')
+    assert conteos == {'insertadas': 0, 'actualizadas': 0, 'omitidas': 1}
@@ -0,0 +1,38 @@
+# tests/test_instrumentacion.py
+
+import gc
+import threading
+import tracemalloc
+from modules import instrumentacion
+
+
+def _en_hilo(funcion):
+    hilo = threading.Thread(target=funcion)
+    hilo.start()
+    hilo.join()
+    gc.collect()
+
+
+def test_rerun_cortado_se_libera_al_terminar_el_hilo():
+    def cortado():
+        instrumentacion.iniciar_rerun(medir_memoria=True)
+        # Como st.stop o una excepción de la página: el hilo termina sin finalizar_rerun
+
+    _en_hilo(cortado)
+    assert instrumentacion._hilos_activos == 0
+    assert not tracemalloc.is_tracing()
+
+
+def test_finalizar_no_descuenta_dos_veces():
+    arboles = []
+
+    def completo():
+        instrumentacion.iniciar_rerun(medir_memoria=True)
+        instrumentacion.iniciar_rerun()
+        arboles.append(instrumentacion.finalizar_rerun())
+        arboles.append(instrumentacion.finalizar_rerun())
+
+    _en_hilo(completo)
+    assert arboles[0] is not None and arboles[1] is None
+    assert instrumentacion._hilos_activos == 0
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,76 @@
+# tests/test_inventario_store.py
+
+import pandas as pd
+from modules.inventario_store import AlmacenInventario
+
+
+def _almacen() -> AlmacenInventario:
+    return AlmacenInventario(pd.DataFrame({
+        'Producto': ['Harina', 'Azúcar', 'Leche'],
+        'Categoría': ['Insumo', 'Insumo', 'Bebida'],
+        'Unidad': ['KG', 'KG', 'LT'],
+        'Stock Actual': [10, '5', 0],
+        'Punto de Reorden (PR)': [4, 8, 2],
+        'Cantidad a Ordenar': [20, 10, 6],
+        'Costo Unitario': [2.0, 3.0, 1.5],
+    }))
+
+
+def test_edicion_recalcula_derivadas_de_la_fila():
+    almacen = _almacen()
+    stocks = []
+    # La página muestra Leche y Azúcar (filas relativas a la página)
+    conteos = almacen.aplicar_cambios(
+        ['Leche', 'Azúcar'], {'edited_rows': {1: {'Stock Actual': 12, 'Valor Total': 999}}},
+        al_cambiar_stock=lambda producto, stock: stocks.append((producto, stock))
+    )
+
+    assert conteos == {'editadas': 1, 'agregadas': 0, 'eliminadas': 0}
+    fila = almacen.filas(['Azúcar']).iloc[0]
+    assert fila['Stock Actual'] == 12.0
+    assert fila['Valor Total'] == 36.0
+    assert not fila['Faltante?']
+    assert stocks == [('Azúcar', 12.0)]
+    assert almacen.totales()['faltantes'] == 1
+
+
+def test_valores_iguales_no_cuentan_como_cambio():
+    almacen = _almacen()
+    version = almacen.version
+    conteos = almacen.aplicar_cambios(['Harina'], {'edited_rows': {0: {'Stock Actual': '10', 'Categoría': 'Insumo'}}})
+
+    assert conteos['editadas'] == 0
+    assert almacen.version == version
+
+
+def test_renombre_sigue_la_fila_y_rechaza_duplicados():
+    almacen = _almacen()
+    pagina = ['Harina', 'Azúcar']
+    almacen.aplicar_cambios(pagina, {'edited_rows': {0: {'Producto': 'Harina 000', 'Stock Actual': 7}, 1: {'Producto': 'Leche'}}})
+
+    assert pagina == ['Harina 000', 'Azúcar']
+    assert almacen.df['Producto'].tolist() == ['Harina 000', 'Azúcar', 'Leche']
+    assert almacen.filas(['Harina 000'])['Stock Actual'].tolist() == [7.0]
+    assert almacen.buscar('000').tolist() == [0]
+
+
+def test_altas_y_bajas_reconstruyen_el_indice():
+    almacen = _almacen()
+    stocks = []
+    conteos = almacen.aplicar_cambios(
+        ['Harina', 'Azúcar'],
+        {
+            'deleted_rows': [0],
+            'added_rows': [{'Producto': 'Sal', 'Stock Actual': '3', 'Costo Unitario': 1}, {'Producto': 'Leche'}, {'Producto': ' '}],
+        },
+        al_cambiar_stock=lambda producto, stock: stocks.append((producto, stock))
+    )
+
+    assert conteos == {'editadas': 0, 'agregadas': 1, 'eliminadas': 1}
+    assert almacen.df['Producto'].tolist() == ['Azúcar', 'Leche', 'Sal']
+    sal = almacen.filas(['Sal']).iloc[0]
+    assert sal['Categoría'] == 'Insumo' and sal['Unidad'] == 'UNI'
+    assert sal['Valor Total'] == 3.0
+    assert stocks == [('Sal', 3.0)]
+    assert almacen.estructura == 1
+    assert len(almacen.filas(['Harina'])) == 0
@@ -0,0 +1,93 @@
+# tests/test_libro_movimientos.py
+
+import numpy as np
+import pandas as pd
+from modules.libro_movimientos import construir_libro
+from modules.trazability import calcular_trazabilidad_inventario
+
+STOCK_INICIAL = 50.0
+
+
+def _movimientos():
+    ventas = pd.DataFrame({
+        'fecha': pd.to_datetime(['2026-01-01', '2026-01-02', '2026-01-02', '2026-01-04', '2026-01-07', '2026-01-03', '2026-01-05']),
+        'producto': ['Harina', 'Harina', 'Harina', 'Harina', 'Harina', 'Azúcar', 'Azúcar'],
+        'cantidad_vendida': [4.0, 3.0, 2.0, 10.0, 6.0, 5.0, 8.0],
+    })
+    entradas = pd.DataFrame({
+        'fecha': pd.to_datetime(['2026-01-01', '2026-01-05', '2026-01-04']),
+        'producto': ['Harina', 'Harina', 'Azúcar'],
+        'cantidad_recibida': [1.0, 20.0, 12.0],
+    })
+    return ventas, entradas
+
+
+def _trazabilidad_anterior(ventas, entradas, producto, stock_inicial, fechas):
+    """Stock histórico como lo calculaba la trazabilidad día a día previa al libro."""
+    ventas = ventas[ventas['producto'] == producto].groupby('fecha')['cantidad_vendida'].sum()
+    entradas = entradas[entradas['producto'] == producto].groupby('fecha')['cantidad_recibida'].sum()
+    stock = [stock_inicial]
+    for fecha in fechas[1:]:
+        stock.append(max(0, stock[-1] - ventas.get(fecha, 0.0) + entradas.get(fecha, 0.0)))
+    return np.array(stock)
+
+
+def _neto_primer_dia(ventas, entradas, producto, fecha):
+    vendido = ventas.loc[(ventas['producto'] == producto) & (ventas['fecha'] == fecha), 'cantidad_vendida'].sum()
+    recibido = entradas.loc[(entradas['producto'] == producto) & (entradas['fecha'] == fecha), 'cantidad_recibida'].sum()
+    return recibido - vendido
+
+
+def test_historial_coincide_con_la_trazabilidad_anterior_mas_el_primer_dia():
+    ventas, entradas = _movimientos()
+    libro = construir_libro(ventas, entradas, stock_inicial=STOCK_INICIAL)
+
+    for producto in ('Harina', 'Azúcar'):
+        primero = min(ventas.loc[ventas['producto'] == producto, 'fecha'].min(), entradas.loc[entradas['producto'] == producto, 'fecha'].min())
+        fechas = pd.date_range(primero, '2026-01-10')
+        anterior = _trazabilidad_anterior(ventas, entradas, producto, STOCK_INICIAL, fechas)
+        # Única diferencia sin quiebres: los movimientos del día de apertura ahora cuentan
+        esperado = anterior + _neto_primer_dia(ventas, entradas, producto, primero)
+        np.testing.assert_allclose(libro.historial(producto, fechas), esperado)
+
+
+def test_saldos_al_coincide_con_historial():
+    ventas, entradas = _movimientos()
+    libro = construir_libro(ventas, entradas, stock_inicial=STOCK_INICIAL)
+
+    saldos = libro.saldos_al('2026-01-04')
+    assert saldos['Harina'] == 50 - 4 + 1 - 3 - 2 - 10
+    assert saldos['Azúcar'] == 50 - 5 + 12
+    # Antes del primer movimiento no hay stock; tras el último, el saldo actual
+    assert libro.saldos_al('2025-12-31').tolist() == [0.0, 0.0]
+    assert libro.saldos_al('2026-02-01').equals(libro.saldos())
+
+
+def test_historial_no_recorta_en_cero():
+    ventas = pd.DataFrame({
+        'fecha': pd.to_datetime(['2026-01-01', '2026-01-02', '2026-01-03']),
+        'producto': ['Leche'] * 3,
+        'cantidad_vendida': [1.0, 8.0, 4.0],
+    })
+    entradas = pd.DataFrame({'fecha': pd.to_datetime(['2026-01-03']), 'producto': ['Leche'], 'cantidad_recibida': [6.0]})
+    fechas = pd.date_range('2026-01-01', '2026-01-03')
+    libro = construir_libro(ventas, entradas, stock_inicial=5.0)
+
+    # La trazabilidad anterior recortaba el quiebre a 0 y perdía las unidades faltantes
+    assert _trazabilidad_anterior(ventas, entradas, 'Leche', 5.0, fechas).tolist() == [5.0, 0.0, 2.0]
+    assert libro.historial('Leche', fechas).tolist() == [4.0, -4.0, -2.0]
+
+
+def test_trazabilidad_usa_el_historial_del_libro():
+    ventas, entradas = _movimientos()
+    libro = construir_libro(ventas, entradas, stock_inicial=STOCK_INICIAL)
+    df = calcular_trazabilidad_inventario(
+        ventas, entradas, 'Harina', STOCK_INICIAL, punto_reorden=10, cantidad_a_ordenar=30,
+        pronostico_diario_promedio=2, lead_time=3
+    )
+
+    historico = df[df['Tipo'] == 'Histórico']
+    np.testing.assert_allclose(historico['Stock'].to_numpy(), libro.historial('Harina', pd.DatetimeIndex(historico['Fecha'])))
+    assert historico['Stock'].iloc[-1] == libro.saldo('Harina')
+    # La proyección parte del saldo de hoy y no baja de 0
+    assert (df.loc[df['Tipo'] == 'Proyectado', 'Stock'] >= 0).all()
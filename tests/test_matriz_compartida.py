@@ -0,0 +1,36 @@
+# tests/test_matriz_compartida.py
+
+import os
+import pandas as pd
+from modules.matriz_compartida import adjuntar_matriz, liberar_matriz, publicar_matriz
+
+
+def _ventas(semilla: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        'fecha': pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-03']),
+        'producto': ['A', 'B', 'A'],
+        'cantidad_vendida': [1.0 + semilla, 2.0, 3.0],
+    })
+
+
+def test_version_arrendada_sobrevive_a_publicaciones(tmp_path):
+    directorio = str(tmp_path)
+    arrendada = publicar_matriz('t', _ventas(0), directorio=directorio, arrendar=True)
+    carpeta = tmp_path / 't' / arrendada.version
+
+    for semilla in range(1, 4):
+        publicar_matriz('t', _ventas(semilla), directorio=directorio)
+    assert carpeta.is_dir()
+    assert adjuntar_matriz('t', arrendada.version, directorio) is not None
+
+    liberar_matriz(arrendada)
+    assert arrendada.arriendo is None
+    publicar_matriz('t', _ventas(4), directorio=directorio)
+    assert not carpeta.exists()
+
+
+def test_sin_arriendo_se_conservan_max_versiones(tmp_path):
+    directorio = str(tmp_path)
+    versiones = [publicar_matriz('t', _ventas(s), directorio=directorio).version for s in range(4)]
+    presentes = {n for n in os.listdir(tmp_path / 't') if n != 'actual.json'}
+    assert presentes == set(versiones[-2:])
@@ -0,0 +1,69 @@
+# tests/test_memoria_sesiones.py
+
+import numpy as np
+import pandas as pd
+from modules.inventario_store import AlmacenInventario
+from modules.libro_movimientos import LibroMovimientos
+from modules.memoria_sesiones import FrameEnDisco, GestorMemoriaSesiones
+
+
+class EstadoSesion(dict):
+    """Lo mínimo del estado de sesión de Streamlit que usa el gestor."""
+
+    @property
+    def filtered_state(self):
+        return dict(self)
+
+
+def _inventario(n: int = 2000) -> pd.DataFrame:
+    return pd.DataFrame({
+        'Producto': [f'P{i}' for i in range(n)],
+        'Stock Actual': np.arange(n, dtype=float),
+        'Punto de Reorden (PR)': 10.0,
+        'Cantidad a Ordenar': 5.0,
+        'Costo Unitario': 1.5,
+    })
+
+
+def _sesion_con_almacen() -> EstadoSesion:
+    almacen = AlmacenInventario(_inventario())
+    libro = LibroMovimientos()
+    libro.registrar(['P1', 'P2'], pd.to_datetime(['2024-01-01', '2024-01-02']), [3.0, 4.0], 'entrada')
+    return EstadoSesion(
+        inventario_store=almacen,
+        inventario_df=almacen.df,
+        libro_movimientos=libro,
+        evaluacion_reorden={'alertas': _inventario(100)},
+        pagina='inicio',
+    )
+
+
+def test_frame_del_almacen_se_cuenta_una_vez(tmp_path):
+    gestor = GestorMemoriaSesiones(presupuesto_bytes=1e12, directorio=str(tmp_path))
+    estado = _sesion_con_almacen()
+    gestor.acceder('a', estado)
+
+    sesion = gestor._sesiones['a']
+    assert set(sesion['claves']) == {'inventario_store', 'inventario_df', 'libro_movimientos', 'evaluacion_reorden'}
+    assert id(estado['inventario_df']) in sesion['bloques']
+    assert sesion['claves']['inventario_df'] == 0
+    assert gestor._total_en_memoria() == sum(sesion['claves'].values())
+
+
+def test_desborde_conserva_referencias_compartidas(tmp_path):
+    gestor = GestorMemoriaSesiones(presupuesto_bytes=1, inactividad_s=0, directorio=str(tmp_path))
+    estado = _sesion_con_almacen()
+    almacen = estado['inventario_store']
+    almacen.actualizados = {'P1'}
+    gestor.acceder('inactiva', estado)
+    gestor.acceder('otra', EstadoSesion())
+
+    assert all(isinstance(estado[c], FrameEnDisco) for c in ('inventario_store', 'inventario_df', 'libro_movimientos', 'evaluacion_reorden'))
+    assert estado['pagina'] == 'inicio'
+    assert gestor._total_en_memoria() == 0
+
+    gestor.acceder('inactiva', estado)
+    assert estado['inventario_store'].df is estado['inventario_df']
+    assert estado['inventario_store'].actualizados == {'P1'}
+    assert estado['libro_movimientos'].saldo('P2') == 4.0
+    assert not any(tmp_path.rglob('*.pkl'))
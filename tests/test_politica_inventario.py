@@ -0,0 +1,14 @@
+# tests/test_politica_inventario.py
+
+import numpy as np
+from modules.politica_inventario import politica_optima
+
+
+def test_stock_de_seguridad_por_nivel_de_servicio():
+    mu = np.array([10.0, 10.0, 10.0])
+    sigma = np.array([3.0, 3.0, 0.0])
+    politica = politica_optima(mu, sigma, np.ones(3), lead_time=4, nivel_servicio=np.array([0.95, 0.98, 0.95]))
+
+    # z(95%) = 1.645, z(98%) = 2.054; σ_LT = sqrt(4 · 9) = 6
+    np.testing.assert_allclose(politica['stock_seguridad'], [1.6449 * 6, 2.0537 * 6, 0.0], atol=1e-3)
+    np.testing.assert_allclose(politica['punto_reorden'], 40 + politica['stock_seguridad'])
@@ -0,0 +1,41 @@
+# tests/test_recetas_store.py
+
+import pandas as pd
+from modules.recetas_store import COLUMNAS_INGREDIENTES, COLUMNAS_RECETAS, RepositorioRecetas
+
+
+def _repo() -> RepositorioRecetas:
+    recetas = pd.DataFrame([
+        {'Producto Final': 'Pizza', 'Categoría': 'Comida', 'Precio Venta': 100.0},
+        {'Producto Final': 'Pasta', 'Categoría': 'Comida', 'Precio Venta': 80.0},
+    ], columns=COLUMNAS_RECETAS)
+    ingredientes = pd.DataFrame([
+        {'Producto Final': 'Pizza', 'Ingrediente': 'Harina', 'Cantidad Requerida': 0.3},
+        {'Producto Final': 'Pasta', 'Ingrediente': 'Sémola', 'Cantidad Requerida': 0.2},
+    ], columns=COLUMNAS_INGREDIENTES)
+    return RepositorioRecetas.desde_dataframes(recetas, ingredientes)
+
+
+def test_renombre_a_nombre_libre():
+    repo = _repo()
+    editado = repo.recetas_df().copy()
+    editado.loc[0, 'Producto Final'] = 'Pizza Napolitana'
+
+    assert repo.renombres_en_conflicto(editado) == []
+    assert repo.aplicar_edicion_recetas(editado)
+    assert repo.nombres_recetas() == ['Pizza Napolitana', 'Pasta']
+    assert repo.ingredientes_de('Pizza Napolitana')['Ingrediente'].tolist() == ['Harina']
+
+
+def test_renombre_a_nombre_existente_se_rechaza():
+    repo = _repo()
+    editado = repo.recetas_df().copy()
+    editado.loc[0, 'Producto Final'] = 'Pasta'
+    editado.loc[0, 'Precio Venta'] = 999.0
+
+    assert repo.renombres_en_conflicto(editado) == [('Pizza', 'Pasta')]
+    assert not repo.aplicar_edicion_recetas(editado)
+    recetas = repo.recetas_df().set_index('Producto Final')
+    assert recetas.loc['Pasta', 'Precio Venta'] == 80.0
+    assert recetas.loc['Pizza', 'Precio Venta'] == 100.0
+    assert repo.ingredientes_de('Pizza')['Ingrediente'].tolist() == ['Harina']
@@ -0,0 +1,22 @@
+# tests/test_reduccion_series.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from modules.reduccion_series import UMBRAL_WEBGL, reducir_serie, scatter_trace
+
+go = pytest.importorskip('plotly.graph_objects')
+
+
+def test_serie_reducida_larga_usa_webgl():
+    serie = pd.Series(np.sin(np.arange(5000) / 50), index=pd.date_range('2020-01-01', periods=5000))
+    reducida = reducir_serie(serie)
+
+    assert len(reducida) <= UMBRAL_WEBGL
+    assert isinstance(scatter_trace(reducida.index, reducida.values, n_original=len(serie)), go.Scattergl)
+    assert isinstance(scatter_trace(reducida.index, reducida.values), go.Scatter)
+
+
+def test_serie_corta_usa_svg():
+    serie = pd.Series(np.arange(30.0), index=pd.date_range('2026-01-01', periods=30))
+    assert isinstance(scatter_trace(serie.index, serie.values, n_original=len(serie)), go.Scatter)
@@ -0,0 +1,64 @@
+# tests/test_trabajos.py
+
+import json
+import time
+import numpy as np
+import pandas as pd
+from modules.trabajos import ESTADO_COMPLETADO, ESTADOS_FINALES, GestorTrabajos
+
+
+def _ventas(productos: int = 3, dias: int = 60) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    fechas = pd.date_range('2024-01-01', periods=dias)
+    return pd.DataFrame({
+        'fecha': np.tile(fechas, productos),
+        'producto': np.repeat([f'P{i}' for i in range(productos)], dias),
+        'cantidad_vendida': rng.poisson(5, productos * dias).astype(float),
+    })
+
+
+def _esperar(gestor: GestorTrabajos, trabajo_id: str, limite_s: float = 60):
+    inicio = time.time()
+    while gestor.estado(trabajo_id)['estado'] not in ESTADOS_FINALES:
+        assert time.time() - inicio < limite_s
+        time.sleep(0.05)
+
+
+def test_resultados_se_persisten_al_terminar(tmp_path):
+    gestor = GestorTrabajos(max_workers=2, directorio=str(tmp_path))
+    trabajo_id = gestor.enviar_optimizacion(_ventas(), 'tenant')
+    _esperar(gestor, trabajo_id)
+
+    with open(tmp_path / f'{trabajo_id}.json', encoding='utf-8') as f:
+        persistido = json.load(f)
+    assert persistido['estado'] == ESTADO_COMPLETADO
+    assert len(persistido['resultados']) == 3
+
+    recargado = GestorTrabajos(directorio=str(tmp_path))
+    assert len(recargado.resultados(trabajo_id)) == 3
+
+
+def test_progreso_no_reescribe_resultados(tmp_path):
+    gestor = GestorTrabajos(directorio=str(tmp_path))
+    trabajo = {'id': 'abc', 'estado': 'en_curso', 'resultados': [{'producto': 'P0'}], 'completados': 1, 'actualizado': time.time()}
+    gestor._persistir(trabajo, forzar=True)
+    with open(tmp_path / 'abc.json', encoding='utf-8') as f:
+        assert 'resultados' not in json.load(f)
+
+    # Un proceso nuevo lo ve interrumpido y sin parciales
+    recargado = GestorTrabajos(directorio=str(tmp_path))
+    assert recargado.estado('abc')['estado'] == 'interrumpido'
+    assert recargado.resultados('abc').empty
+
+
+def test_trabajos_vencidos_se_podan(tmp_path):
+    gestor = GestorTrabajos(directorio=str(tmp_path), ttl_s=60)
+    viejo = {'id': 'viejo', 'tenant': 't', 'estado': ESTADO_COMPLETADO, 'resultados': [], 'creado': 0, 'actualizado': time.time() - 120}
+    nuevo = dict(viejo, id='nuevo', actualizado=time.time())
+    for trabajo in (viejo, nuevo):
+        gestor._trabajos[trabajo['id']] = trabajo
+        gestor._persistir(trabajo, forzar=True)
+
+    assert [t['id'] for t in gestor.trabajos_de('t')] == ['nuevo']
+    assert not (tmp_path / 'viejo.json').exists()
+    assert GestorTrabajos(directorio=str(tmp_path), ttl_s=60).estado('nuevo') is not None
@@ -1,5 +1,36 @@
 // Stock Zero - Database Integration JavaScript Fixed Version
 
+// Columnas que identifican una fila en la sincronización por deltas (igual que en modules/sincronizacion.py)
+const SYNC_KEYS = {
+    ventas: ['fecha', 'producto'],
+    stock: ['fecha', 'producto'],
+    inventario: ['producto'],
+    clients: ['id']
+};
+const SYNC_MAX_ROUNDS = 100;
+
+// [{col: v1}, {col: v2}] -> {col: [v1, v2]}: el nombre de cada columna viaja una sola vez
+function toColumns(rows) {
+    const columns = {};
+    rows.forEach((row, i) => {
+        Object.keys(row).forEach(name => {
+            if (!columns[name]) columns[name] = new Array(rows.length).fill(null);
+            columns[name][i] = row[name];
+        });
+    });
+    return columns;
+}
+
+function fromColumns(columns) {
+    const names = Object.keys(columns || {});
+    if (names.length === 0) return [];
+    return columns[names[0]].map((_, i) => {
+        const row = {};
+        names.forEach(name => { row[name] = columns[name][i]; });
+        return row;
+    });
+}
+
 class DatabaseManager {
     constructor() {
         this.supabaseUrl = null;
@@ -141,6 +172,11 @@ class DatabaseManager {
 
     async _fetchData(table) {
         try {
+            // Con la API de Python configurada, traer solo lo que cambió desde la última sincronización
+            if (this._getSyncApiUrl()) {
+                await this.syncDelta(table);
+            }
+
             // Primero intentar obtener datos locales
             const localData = this._getLocalData(table);
             if (localData.length > 0) {
@@ -195,14 +231,19 @@ class DatabaseManager {
         try {
             const payload = Array.isArray(data) ? data : [data];
             
-            // Guardar localmente
-            this._saveLocalData(table, payload);
-            console.log(`✅ ${table} saved to local storage`);
-            
-            // Si está conectado a Supabase, intentar sincronizar
-            if (this.isConnected && this.supabase) {
+            // Guardar localmente y encolar solo las filas que cambiaron
+            const changed = this._mergeLocalData(table, payload);
+            this._queueChanges(table, changed);
+            console.log(`✅ ${table} saved to local storage (${changed.length} changed)`);
+
+            if (changed.length === 0) return true;
+
+            // Con la API de Python, enviar el delta; si no, Supabase como antes
+            if (this._getSyncApiUrl()) {
+                await this.syncDelta(table);
+            } else if (this.isConnected && this.supabase) {
                 try {
-                    const { error } = await this.supabase.from(table).insert(payload);
+                    const { error } = await this.supabase.from(table).insert(changed);
                     if (error) throw error;
                     console.log(`✅ ${table} synced to Supabase`);
                 } catch (syncError) {
@@ -218,6 +259,129 @@ class DatabaseManager {
         }
     }
 
+    // -------- DELTA SYNC -------- //
+    _getSyncApiUrl() {
+        const url = window.STOCK_ZERO_API_URL || localStorage.getItem('stockZeroApiUrl');
+        return url ? url.replace(/\/$/, '') : null;
+    }
+
+    _rowKey(row, keys) {
+        return JSON.stringify(keys.map(k => row[k] ?? null));
+    }
+
+    // Aplica filas sobre la copia local por clave y devuelve las que realmente cambiaron
+    _mergeLocalData(table, rows, keys = SYNC_KEYS[table] || ['id']) {
+        const local = this._getLocalData(table);
+        const index = new Map(local.map((row, i) => [this._rowKey(row, keys), i]));
+        const changed = [];
+        rows.forEach(row => {
+            const key = this._rowKey(row, keys);
+            const position = index.get(key);
+            if (position === undefined) {
+                index.set(key, local.length);
+                local.push(row);
+                changed.push(row);
+            } else if (JSON.stringify(local[position]) !== JSON.stringify(row)) {
+                local[position] = row;
+                changed.push(row);
+            }
+        });
+        if (changed.length > 0) this._saveLocalData(table, local);
+        return changed;
+    }
+
+    // Cola persistente de cambios sin enviar: la última versión de cada clave gana
+    _queueChanges(table, rows) {
+        const keys = SYNC_KEYS[table] || ['id'];
+        const pending = this._getPending(table);
+        rows.forEach(row => {
+            const key = this._rowKey(row, keys);
+            delete pending.borradas[key];
+            pending.filas[key] = row;
+        });
+        localStorage.setItem(`stockZero_${table}_pending`, JSON.stringify(pending));
+    }
+
+    _dequeueSent(table, sent) {
+        const pending = this._getPending(table);
+        ['filas', 'borradas'].forEach(kind => {
+            Object.entries(sent[kind]).forEach(([key, row]) => {
+                if (key in pending[kind] && JSON.stringify(pending[kind][key]) === JSON.stringify(row)) {
+                    delete pending[kind][key];
+                }
+            });
+        });
+        if (Object.keys(pending.filas).length === 0 && Object.keys(pending.borradas).length === 0) {
+            localStorage.removeItem(`stockZero_${table}_pending`);
+        } else {
+            localStorage.setItem(`stockZero_${table}_pending`, JSON.stringify(pending));
+        }
+    }
+
+    _getPending(table) {
+        const data = localStorage.getItem(`stockZero_${table}_pending`);
+        return data ? JSON.parse(data) : { filas: {}, borradas: {} };
+    }
+
+    /**
+     * Sincronización por deltas con la API de Python (POST /sync/<usuario>/<tabla>):
+     * envía los cambios pendientes en formato columnar junto con la última secuencia
+     * vista y recibe solo las filas y borrados posteriores, por páginas mientras `hay_mas`.
+     */
+    async syncDelta(table) {
+        const apiUrl = this._getSyncApiUrl();
+        if (!apiUrl || !this.user_id) return false;
+
+        const headers = { 'Content-Type': 'application/json' };
+        const token = localStorage.getItem('stockZeroApiToken');
+        if (token) headers['Authorization'] = `Bearer ${token}`;
+
+        const seqKey = `stockZero_${table}_seq`;
+        let pending = this._getPending(table);
+        let pushed = Object.values(pending.filas);
+
+        try {
+            for (let round = 0; round < SYNC_MAX_ROUNDS; round++) {
+                const response = await fetch(`${apiUrl}/sync/${encodeURIComponent(this.user_id)}/${encodeURIComponent(table)}`, {
+                    method: 'POST',
+                    headers,
+                    body: JSON.stringify({
+                        desde: parseInt(localStorage.getItem(seqKey) || '0', 10),
+                        filas: toColumns(Object.values(pending.filas)),
+                        borradas: toColumns(Object.values(pending.borradas))
+                    })
+                });
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                const delta = await response.json();
+
+                // Los cambios enviados ya están en el servidor: quitar de la cola solo esos,
+                // salvo que se hayan vuelto a modificar mientras la petición estaba en vuelo
+                this._dequeueSent(table, pending);
+                pending = { filas: {}, borradas: {} };
+
+                // El servidor no reconoce nuestra secuencia: quedarse con lo recibido y lo recién enviado
+                if (delta.reiniciar) this._saveLocalData(table, pushed);
+                pushed = [];
+
+                const keys = delta.clave;
+                this._mergeLocalData(table, fromColumns(delta.filas), keys);
+                const deleted = new Set(fromColumns(delta.borradas).map(row => this._rowKey(row, keys)));
+                if (deleted.size > 0) {
+                    this._saveLocalData(table, this._getLocalData(table).filter(row => !deleted.has(this._rowKey(row, keys))));
+                }
+
+                localStorage.setItem(seqKey, String(delta.seq));
+                if (!delta.hay_mas) break;
+            }
+            console.log(`✅ ${table} delta-synced with API`);
+            return true;
+        } catch (syncError) {
+            // Los cambios siguen en la cola para el próximo intento
+            console.warn(`⚠️ Delta sync of ${table} failed:`, syncError.message);
+            return false;
+        }
+    }
+
     // -------- LOCAL CACHE -------- //
     _saveLocalData(type, data) {
         localStorage.setItem(`stockZero_${type}`, JSON.stringify(data));
@@ -42,17 +42,62 @@ function runOptimization() {
         </div>
     `;
     
-    // Simulate optimization processing
-    setTimeout(() => {
-        const results = generateOptimizationResults(serviceLevel, leadTime, holdingCost, objectives);
-        displayOptimizationResults(results);
-        showNotification('Optimización completada exitosamente', 'success');
-    }, 3000);
+    // Motor de Python (stock_zero_api.py) si está configurado; si no, cálculo local
+    fetchOptimizationFromApi(leadTime, serviceLevel)
+        .then(apiResults => {
+            const results = generateOptimizationResults(serviceLevel, leadTime, holdingCost, objectives, apiResults);
+            displayOptimizationResults(results);
+            showNotification('Optimización completada exitosamente', 'success');
+        });
 }
 
-function generateOptimizationResults(serviceLevel, leadTime, holdingCost, objectives) {
+// API de optimización (Python): URL en window.STOCK_ZERO_API_URL o localStorage "stockZeroApiUrl"
+function getOptimizationApiUrl() {
+    return window.STOCK_ZERO_API_URL || localStorage.getItem('stockZeroApiUrl');
+}
+
+async function fetchOptimizationFromApi(leadTime, serviceLevel) {
+    const apiUrl = getOptimizationApiUrl();
+    if (!apiUrl || appState.data.sales.length === 0) return null;
+
+    const headers = { 'Content-Type': 'application/json' };
+    const token = localStorage.getItem('stockZeroApiToken');
+    if (token) headers['Authorization'] = `Bearer ${token}`;
+
+    try {
+        const response = await fetch(`${apiUrl.replace(/\/$/, '')}/optimizar`, {
+            method: 'POST',
+            headers,
+            body: JSON.stringify({
+                ventas: appState.data.sales.map(sale => ({ fecha: sale.fecha, producto: sale.producto, ventas: sale.ventas })),
+                lead_time: leadTime,
+                nivel_servicio: serviceLevel / 100,
+                modelo: 'global'
+            })
+        });
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const data = await response.json();
+        // Índice por producto para buscar cada resultado en O(1)
+        return new Map(data.resultados.filter(r => !r.error).map(r => [r.producto, r]));
+    } catch (error) {
+        console.warn('⚠️ API de optimización no disponible, cálculo local:', error.message);
+        return null;
+    }
+}
+
+// Agrupa las ventas por producto en una sola pasada (evita filtrar todo el arreglo por producto)
+function groupSalesByProduct(sales) {
+    const byProduct = new Map();
+    sales.forEach(sale => {
+        if (!byProduct.has(sale.producto)) byProduct.set(sale.producto, []);
+        byProduct.get(sale.producto).push(sale);
+    });
+    return byProduct;
+}
+
+function generateOptimizationResults(serviceLevel, leadTime, holdingCost, objectives, apiResults = null) {
     const inventory = appState.data.inventory;
-    const sales = appState.data.sales;
+    const salesByProduct = groupSalesByProduct(appState.data.sales);
     
     const results = {
         parameters: { serviceLevel, leadTime, holdingCost, objectives },
@@ -67,17 +112,28 @@ function generateOptimizationResults(serviceLevel, leadTime, holdingCost, object
         const minStock = parseInt(item.stock_minimo);
         const optimalStock = parseInt(item.stock_optimo);
         
-        // Calculate optimal order quantity using EOQ formula (simplified)
-        const demand = estimateDemand(sales, item.producto);
-        const orderCost = 50; // Fixed order cost
-        const eoq = Math.sqrt((2 * demand * orderCost) / (holdingCost / 100));
-        
-        // Calculate safety stock
-        const demandVariability = calculateDemandVariability(sales, item.producto);
-        const safetyStock = Math.ceil(demandVariability * serviceLevel / 100);
+        const productSales = salesByProduct.get(item.producto) || [];
+        const apiResult = apiResults && apiResults.get(item.producto);
+        let eoq, safetyStock, reorderPoint;
         
-        // Calculate reorder point
-        const reorderPoint = Math.ceil(demand / 30 * leadTime) + safetyStock;
+        if (apiResult) {
+            // Resultados del motor de Python: pronóstico, stock de seguridad y EOQ
+            eoq = apiResult.cantidad_a_ordenar;
+            safetyStock = Math.ceil(apiResult.stock_seguridad);
+            reorderPoint = Math.ceil(apiResult.punto_reorden);
+        } else {
+            // Calculate optimal order quantity using EOQ formula (simplified)
+            const demand = estimateDemand(productSales);
+            const orderCost = 50; // Fixed order cost
+            eoq = Math.sqrt((2 * demand * orderCost) / (holdingCost / 100));
+            
+            // Calculate safety stock
+            const demandVariability = calculateDemandVariability(productSales);
+            safetyStock = Math.ceil(demandVariability * serviceLevel / 100);
+            
+            // Calculate reorder point
+            reorderPoint = Math.ceil(demand / 30 * leadTime) + safetyStock;
+        }
         
         const recommendation = {
             product: item.producto,
@@ -118,8 +174,7 @@ function generateOptimizationResults(serviceLevel, leadTime, holdingCost, object
     return results;
 }
 
-function estimateDemand(sales, productName) {
-    const productSales = sales.filter(sale => sale.producto === productName);
+function estimateDemand(productSales) {
     if (productSales.length === 0) return 100; // Default demand
     
     // Calculate daily demand from last 30 days
@@ -129,8 +184,7 @@ function estimateDemand(sales, productName) {
     return recentSales.reduce((sum, sale) => sum + parseFloat(sale.ventas || 0), 0);
 }
 
-function calculateDemandVariability(sales, productName) {
-    const productSales = sales.filter(sale => sale.producto === productName);
+function calculateDemandVariability(productSales) {
     if (productSales.length < 2) return 10; // Default variability
     
     const values = productSales.map(sale => parseFloat(sale.ventas || 0));
@@ -158,8 +212,8 @@ function generateImplementationPlan(recommendations) {
         {
             phase: 'Fase 1: Acción Inmediata (Próximos 7 días)',
             tasks: highPriority.slice(0, 3).map(rec => ({
-                action: \`Reabastecer \${rec.producto}\`,
-                description: \`Ordenar \${rec.recommended.orderQuantity} unidades, punto de reorden: \${rec.recommended.reorderPoint}\`,
+                action: `Reabastecer ${rec.product}`,
+                description: `Ordenar ${rec.recommended.orderQuantity} unidades, punto de reorden: ${rec.recommended.reorderPoint}`,
                 priority: 'Alta',
                 estimatedImpact: formatCurrency(rec.estimatedSavings)
             }))
@@ -167,8 +221,8 @@ function generateImplementationPlan(recommendations) {
         {
             phase: 'Fase 2: Optimización Corto Plazo (Próximos 30 días)',
             tasks: mediumPriority.slice(0, 5).map(rec => ({
-                action: \`Optimizar \${rec.producto}\`,
-                description: \`Ajustar niveles de stock, implementar punto de reorden en \${rec.recommended.reorderPoint}\`,
+                action: `Optimizar ${rec.product}`,
+                description: `Ajustar niveles de stock, implementar punto de reorden en ${rec.recommended.reorderPoint}`,
                 priority: 'Media',
                 estimatedImpact: formatCurrency(rec.estimatedSavings)
             }))
@@ -176,8 +230,8 @@ function generateImplementationPlan(recommendations) {
         {
             phase: 'Fase 3: Mejora Continua (Próximos 90 días)',
             tasks: lowPriority.slice(0, 3).map(rec => ({
-                action: \`Monitorear \${rec.producto}\`,
-                description: \`Implementar sistema de monitoreo, ajustar según tendencias\`,
+                action: `Monitorear ${rec.product}`,
+                description: `Implementar sistema de monitoreo, ajustar según tendencias`,
                 priority: 'Baja',
                 estimatedImpact: formatCurrency(rec.estimatedSavings)
             }))